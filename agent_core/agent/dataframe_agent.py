@@ -1,12 +1,17 @@
+import asyncio
 import pandas as pd
 import traceback
 import json
 
+from types import MappingProxyType
 from typing import List, Optional, Union, Any
 from agent_core.agent.dataframe_state import AgentState
+from agent_core.agent.trace import ExecutionTrace, TraceRecorder, response_type_of, trace_stage
 from agent_core.llm.schema import Message
 from agent_core.config import Config
+from agent_core.memory.summarizer import MemorySummarizer
 from agent_core.sandbox import Sandbox
+from agent_core.skills.manager import SkillsManager
 from agent_core.prompts import (
     get_chat_prompt_for_sql,
     get_rephrase_query_prompt,
@@ -18,9 +23,12 @@ from agent_core.prompts import (
 from data_inteligence.dataframe import DataFrame, VirtualDataFrame
 from data_inteligence.code_core.code_generation import CodeGenerator
 from data_inteligence.code_core.code_execution import CodeExecutor
+from data_inteligence.code_core.code_execution.environment import get_base_environment
 from data_inteligence.data_loader.duck_db_connection_manager import DuckDBConnectionManager
-from data_inteligence.query_builders.sql_parser import SQLParser
+from data_inteligence.data_loader.federated_query import FederatedQueryPlanner
 from data_inteligence.code_core.response import ResponseParser, ErrorResponse
+from data_inteligence.code_core.response.base import BaseResponse
+from data_inteligence.query_builders.sampling import TableSampler
 from data_inteligence.exceptions import (
     CodeExecutionError,
     InvalidLLMOutputType,
@@ -54,8 +62,21 @@ class DataFrameAgent:
             system_message=system_message,
         )
         self._code_generator = CodeGenerator(self._state)
+        self._summarizer = MemorySummarizer(
+            getattr(self._state.config, "llm", None),
+            getattr(self._state.config, "memory_summary_tokens", 300),
+        )
+        self._compaction: Optional[asyncio.Task] = None
         self._response_parser = response_parser or ResponseParser()
         self._sandbox = sandbox
+        # 执行环境只构建一次，重试和缓存回放时每次执行只复制一份命名空间
+        self._environment = MappingProxyType(
+            {
+                **get_base_environment(),
+                **SkillsManager.get_functions(),
+                "execute_sql_query": self._execute_sql_query,
+            }
+        )
 
     def is_pd_dataframe(self, df: Union[DataFrame, VirtualDataFrame]) -> bool:
         """判断是否为pandas的DataFrame"""
@@ -142,10 +163,8 @@ class DataFrameAgent:
         """Execute the generated code."""
         self._state.logger.info(f"Executing code: {code}")
 
-        code_executor = CodeExecutor(self._state.config)
-        code_executor.add_to_env("execute_sql_query", self._execute_sql_query)
-        for skill in self._state.skills:
-            code_executor.add_to_env(skill.name, skill.func)
+        self._state.last_samples = {}
+        code_executor = CodeExecutor(self._state.config, base_environment=self._environment)
 
         if self._sandbox:
             return self._sandbox.execute(code, code_executor.environment)
@@ -165,26 +184,47 @@ class DataFrameAgent:
         if not self._state.dfs:
             raise ValueError("No DataFrames available to register for query execution.")
 
-        db_manager = DuckDBConnectionManager()
-
-        table_mapping = {}
-        df_executor = None
+        catalog = self._state.config.catalog
+        # 同名视图可能属于列结构相同的另一个数据集，只使用指向本次数据集文件的视图
+        catalog_views = (
+            catalog.dataset_views(
+                {
+                    df.schema.name: df.local_sources
+                    for df in self._state.dfs
+                    if hasattr(df, "query_builder")
+                }
+            )
+            if catalog
+            else frozenset()
+        )
+        db_manager = DuckDBConnectionManager(
+            connection=catalog.cursor() if catalog_views else None
+        )
 
+        datasets = {}
         for df in self._state.dfs:
             if hasattr(df, "query_builder"):
                 # df is a valid dataset with query builder, loader and execute_sql_query method
-                table_mapping[df.schema.name] = df.query_builder._get_table_expression()
-                df_executor = df.execute_sql_query
+                datasets[df.schema.name] = df
             else:
                 # dataset created from loading a csv, no query builder available
                 db_manager.register(df.schema.name, df)
 
-        final_query = SQLParser.replace_table_and_column_names(query, table_mapping)
-
-        if not df_executor:
-            return db_manager.sql(final_query).df()
-        else:
-            return df_executor(final_query)
+        # 按数据源拆分查询：单一数据源直接执行，混合数据源在DuckDB中完成JOIN
+        config = self._state.config
+        sampler = (
+            TableSampler(config.sample_percent, config.sample_rows)
+            if config.approximate
+            else None
+        )
+        planner = FederatedQueryPlanner(datasets, db_manager, catalog_views, sampler)
+        with trace_stage(self._state.trace, "sql", query=query) as event:
+            result = planner.execute(query)
+            event["rows"] = len(result)
+        self._state.last_samples.update(
+            {name: sample.to_dict() for name, sample in planner.samples.items()}
+        )
+        return result
 
     async def generate_code_with_retries(self, query: str) -> Any:
         """Execute the code with retry logic."""
@@ -219,8 +259,12 @@ class DataFrameAgent:
 
         while attempts <= max_retries:
             try:
-                result = self.execute_code(code)
-                return self._response_parser.parse(result)
+                with trace_stage(self._state.trace, "execute"):
+                    result = self.execute_code(code)
+                with trace_stage(self._state.trace, "parse") as event:
+                    response = self._response_parser.parse(result)
+                    event["response_type"] = response_type_of(response)
+                return self._annotate_approximation(response)
             except Exception as e:
                 attempts += 1
                 if attempts > max_retries:
@@ -233,12 +277,45 @@ class DataFrameAgent:
 
         return None
 
+    def _annotate_approximation(self, response: Any) -> Any:
+        """结果基于采样数据计算时，标记为近似值并附上各数据集的样本量"""
+        if not self._state.last_samples:
+            return response
+        annotation = {"approximate": True, "samples": dict(self._state.last_samples)}
+        if isinstance(response, dict):
+            response.update(annotation)
+        elif isinstance(response, BaseResponse):
+            response.approximate = annotation["approximate"]
+            response.samples = annotation["samples"]
+        return response
+
     def clear_memory(self):
         """
         清空对话历史记录
         """
+        if self._compaction is not None:
+            self._compaction.cancel()
+            self._compaction = None
         self._state.memory.clear()
 
+    async def wait_for_memory_compaction(self):
+        """等待后台的记忆摘要完成，失败时保留原始消息"""
+        if self._compaction is None:
+            return
+        try:
+            await self._compaction
+        except Exception as e:
+            self._state.logger.warning(f"Memory compaction failed: {e}")
+        finally:
+            self._compaction = None
+
+    def _compact_memory_in_background(self):
+        """压缩模式下，响应返回后在后台把放不进token预算的消息折叠为摘要"""
+        if not getattr(self._state.config, "memory_token_budget", None) or self._compaction is not None:
+            return
+        if self._state.memory.pending_messages():
+            self._compaction = asyncio.create_task(self._summarizer.compact(self._state.memory))
+
     def start_new_conversation(self):
         """
         开始新的对话，清空历史记录。
@@ -276,7 +353,14 @@ class DataFrameAgent:
         """
         self._state.logger.info(f"Question: {query}")
         self._state.logger.info(f"Running with {self._state.config.llm.type} LLM...")
+        # 上一轮的摘要在后台计算，使用记忆前等待其完成
+        await self.wait_for_memory_compaction()
         self._state.output_type = output_type
+        trace_directory = self._state.config.trace_directory
+        trace = self._state.trace = (
+            ExecutionTrace.for_datasets(query, output_type, self._state.dfs) if trace_directory else None
+        )
+        result = None
         try:
             self._state.assign_prompt_id()
             # 生成代码
@@ -287,7 +371,26 @@ class DataFrameAgent:
             # 生成并返回最终结果
             return result
         except CodeExecutionError:
-            return self._handle_exception(code)
+            result = self._handle_exception(code)
+            return result
+        except Exception as e:
+            if trace is not None:
+                trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if trace is not None:
+                self._save_trace(trace, trace_directory, result)
+            self._compact_memory_in_background()
+
+    def _save_trace(self, trace: ExecutionTrace, directory: str, result: Any) -> None:
+        """保存本轮的执行轨迹，写入失败不影响响应"""
+        trace.response_type = response_type_of(result)
+        if isinstance(result, ErrorResponse):
+            trace.error = result.error
+        try:
+            TraceRecorder(directory).save(trace)
+        except OSError as e:
+            self._state.logger.warning(f"Failed to save execution trace: {e}")
 
     async def _regenerate_code_after_error(self, code: str, error: Exception) -> str:
         """Generate a new code snippet based on the error."""
@@ -321,3 +424,7 @@ class DataFrameAgent:
     @property
     def last_prompt_used(self):
         return self._state.last_prompt_used
+
+    @property
+    def last_trace(self) -> Optional[ExecutionTrace]:
+        return self._state.trace
@@ -6,6 +6,7 @@ from data_inteligence.dataframe import DataFrame, VirtualDataFrame
 from agent_core.llm.base import BaseChatModel
 from agent_core.config import Config
 from agent_core.memory.memory import Memory
+from agent_core.agent.trace import ExecutionTrace
 from agent_core.skills.manager import SkillsManager
 from loguru import logger
 
@@ -24,6 +25,12 @@ class AgentState:
     last_prompt_id: str = None
     last_prompt_used: str = None
     output_type: Optional[str] = None
+    # 近似模式下最近一次代码执行中被采样的数据集
+    last_samples: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # 最近一次生成代码的分析结果（CodeAnalysis：清洗后的代码、SQL字符串、图表路径）
+    last_code_analysis: Optional[Any] = None
+    # 当前轮次的执行轨迹，未开启记录时为None
+    trace: Optional[ExecutionTrace] = None
     system_message: Optional[str] = None
 
     def __post_init__(self):
@@ -46,7 +53,11 @@ class AgentState:
         self.skills = SkillsManager.get_skills()
         if config:
             self.config.llm = self._get_llm(self.config.llm)
-        self.memory = Memory(memory_size, agent_description=description)
+        self.memory = Memory(
+            memory_size,
+            agent_description=description,
+            token_budget=getattr(self.config, "memory_token_budget", None),
+        )
         self.logger = logger.bind(name="agent")
 
     def _get_config(self, config: Union[Config, dict]) -> Config:
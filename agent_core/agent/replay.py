@@ -0,0 +1,126 @@
+"""
+在本地数据上重放录制的执行轨迹。
+
+LLM调用由 ReplayChatModel 按顺序返回录制的回复，代码清洗、SQL执行、代码执行和结果解析按当前代码
+真实运行，因此两次耗时的差异反映的是本地改动对各阶段的影响。数据集按表名从fixtures目录中读取
+（`<表名>.parquet` 或 `<表名>.csv`），找不到时按录制的列类型构造空表。
+"""
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+
+from agent_core.agent.trace import TRACE_STAGES, ExecutionTrace
+from agent_core.llm.replay import ReplayChatModel
+from agent_core.sandbox import Sandbox
+from data_inteligence.dataframe import DataFrame
+
+_EMPTY_DTYPES = {
+    "string": "object",
+    "integer": "Int64",
+    "float": "float64",
+    "datetime": "datetime64[ns]",
+    "boolean": "boolean",
+}
+
+
+@dataclass
+class StageTiming:
+    stage: str
+    recorded: float
+    replayed: float
+
+    @property
+    def diff(self) -> float:
+        return self.replayed - self.recorded
+
+
+@dataclass
+class ReplayResult:
+    """
+    一条轨迹的重放结果。
+
+    Attributes:
+        recorded (ExecutionTrace): 录制的轨迹
+        replayed (ExecutionTrace): 重放时记录的轨迹
+        missing_fixtures (list): 没有本地数据、以空表代替的数据集
+    """
+
+    recorded: ExecutionTrace
+    replayed: ExecutionTrace
+    missing_fixtures: List[str] = field(default_factory=list)
+
+    @property
+    def response_changed(self) -> bool:
+        return self.recorded.response_type != self.replayed.response_type
+
+    def timings(self) -> List[StageTiming]:
+        recorded, replayed = self.recorded.durations(), self.replayed.durations()
+        stages = [stage for stage in TRACE_STAGES if stage in recorded or stage in replayed]
+        stages += sorted((set(recorded) | set(replayed)) - set(TRACE_STAGES))
+        return [StageTiming(stage, recorded.get(stage, 0.0), replayed.get(stage, 0.0)) for stage in stages]
+
+
+def load_fixture(dataset: Dict[str, Any], fixtures: Optional[Path]) -> Optional[DataFrame]:
+    """读取数据集的本地数据，不存在时返回None"""
+    name = dataset["name"]
+    if fixtures is not None:
+        if (fixtures / f"{name}.parquet").exists():
+            return DataFrame(pd.read_parquet(fixtures / f"{name}.parquet"), table_name=name)
+        if (fixtures / f"{name}.csv").exists():
+            return DataFrame(pd.read_csv(fixtures / f"{name}.csv"), table_name=name)
+    return None
+
+
+def empty_fixture(dataset: Dict[str, Any]) -> DataFrame:
+    columns = {
+        column: pd.Series(dtype=_EMPTY_DTYPES.get(column_type, "object"))
+        for column, column_type in dataset["columns"].items()
+    }
+    return DataFrame(pd.DataFrame(columns), table_name=dataset["name"])
+
+
+async def replay_trace(
+    trace: ExecutionTrace,
+    fixtures: Optional[Union[str, Path]] = None,
+    sandbox: Optional[Sandbox] = None,
+    config: Optional[Dict[str, Any]] = None,
+) -> ReplayResult:
+    """
+    用录制的LLM回复重新运行一轮对话。
+
+    Args:
+        trace (ExecutionTrace): 录制的轨迹
+        fixtures (str | Path, optional): 本地数据目录
+        sandbox (Sandbox, optional): 代码执行沙箱，None表示在当前进程内执行
+        config (dict, optional): 额外的Agent配置，例如资源限制
+    """
+    from agent_core.agent.dataframe_agent import DataFrameAgent
+
+    fixtures = Path(fixtures) if fixtures is not None else None
+    dfs, missing = [], []
+    for dataset in trace.datasets:
+        df = load_fixture(dataset, fixtures)
+        if df is None:
+            missing.append(dataset["name"])
+            df = empty_fixture(dataset)
+        dfs.append(df)
+
+    with tempfile.TemporaryDirectory() as directory:
+        agent = DataFrameAgent(
+            dfs,
+            config={
+                **(config or {}),
+                "llm": ReplayChatModel(trace.completions()),
+                "trace_directory": directory,
+            },
+            sandbox=sandbox,
+        )
+        try:
+            await agent.follow_up(trace.query, trace.output_type)
+        except Exception:
+            # 错误已记录在重放轨迹中，与录制结果一起比较
+            pass
+    return ReplayResult(trace, agent.last_trace, missing)
@@ -0,0 +1,133 @@
+"""
+对话轮次的执行轨迹。
+
+开启后（Config.trace_directory），每轮对话记录渲染后的提示词、LLM回复、清洗后的代码、执行的SQL
+（耗时和行数）以及最终的响应类型，保存为 `<trace_id>.json`。`scripts/replay_traces.py` 用录制的
+LLM回复在本地数据上重放这些轨迹，对比各阶段的耗时。
+"""
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+# execute 的耗时包含其中调用 execute_sql_query 的 sql 阶段
+TRACE_STAGES = ("llm", "clean", "sql", "execute", "parse")
+
+
+@dataclass
+class ExecutionTrace:
+    """
+    一轮对话的执行轨迹。
+
+    Attributes:
+        query (str): 用户问题
+        output_type (str): 请求的输出类型
+        datasets (list): 数据集的表名和列类型，回放时用于匹配本地数据
+        events (list): 按发生顺序记录的阶段，每项包含stage、duration以及该阶段的内容
+        response_type (str, optional): 最终响应的类型
+        error (str, optional): 本轮失败时的错误
+    """
+
+    query: str
+    output_type: Optional[str] = None
+    datasets: List[Dict[str, Any]] = field(default_factory=list)
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    response_type: Optional[str] = None
+    error: Optional[str] = None
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def for_datasets(cls, query: str, output_type: Optional[str], dfs: List[Any]) -> "ExecutionTrace":
+        datasets = [
+            {
+                "name": df.schema.name,
+                "columns": {column.name: column.type for column in df.schema.columns},
+            }
+            for df in dfs
+        ]
+        return cls(query=query, output_type=output_type, datasets=datasets)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExecutionTrace":
+        return cls(**data)
+
+    def completions(self) -> List[str]:
+        """按调用顺序返回录制的LLM回复"""
+        return [event["completion"] for event in self.events if event["stage"] == "llm" and "completion" in event]
+
+    def durations(self) -> Dict[str, float]:
+        """各阶段的总耗时（秒）"""
+        totals: Dict[str, float] = {}
+        for event in self.events:
+            totals[event["stage"]] = totals.get(event["stage"], 0.0) + event.get("duration", 0.0)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def response_type_of(response: Any) -> Optional[str]:
+    """响应的类型：BaseResponse的type、服务端JSON响应的"type"字段，其他对象取类名"""
+    if response is None:
+        return None
+    if isinstance(response, dict):
+        return response.get("type")
+    return getattr(response, "type", type(response).__name__)
+
+
+@contextmanager
+def trace_stage(trace: Optional[ExecutionTrace], stage: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """
+    记录一个阶段的耗时和内容，未开启记录（trace为None）时只返回一个不会保存的字典。
+
+    Usage:
+        with trace_stage(state.trace, "sql", query=query) as event:
+            result = run(query)
+            event["rows"] = len(result)
+    """
+    event = {"stage": stage, **fields}
+    if trace is not None:
+        # 按开始顺序记录，嵌套的阶段（执行代码中的SQL）排在外层阶段之后
+        trace.events.append(event)
+    start = time.perf_counter()
+    try:
+        yield event
+    except Exception as e:
+        event["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        event["duration"] = time.perf_counter() - start
+
+
+class TraceRecorder:
+    """
+    把执行轨迹保存到目录中，每轮对话一个JSON文件。
+
+    Args:
+        directory (str | Path): 保存轨迹的目录，不存在时自动创建
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+
+    def save(self, trace: ExecutionTrace) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{trace.trace_id}.json"
+        # 先写临时文件再重命名，读取方不会看到写了一半的文件
+        temp = path.with_suffix(".tmp")
+        temp.write_text(json.dumps(trace.to_dict(), ensure_ascii=False, default=str), encoding="utf-8")
+        temp.replace(path)
+        return path
+
+    def load(self) -> List[ExecutionTrace]:
+        """按记录时间顺序读取目录中的所有轨迹"""
+        traces = [load_trace(path) for path in self.directory.glob("*.json")]
+        return sorted(traces, key=lambda trace: trace.created_at)
+
+
+def load_trace(path: Union[str, Path]) -> ExecutionTrace:
+    return ExecutionTrace.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
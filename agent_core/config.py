@@ -2,6 +2,8 @@ import os
 from typing import Any, Dict, Optional
 from pydantic import BaseModel, ConfigDict
 from agent_core.llm.base import BaseChatModel
+from data_inteligence.data_loader.workspace_catalog import WorkspaceCatalog
+from data_inteligence.query_builders.sampling import DEFAULT_SAMPLE_PERCENT, DEFAULT_SAMPLE_ROWS
 
 
 model_name = "gpt-3.5-turbo"
@@ -17,6 +19,28 @@ class Config(BaseModel):
     enable_cache: bool = False
     max_retries: int = 2
     llm: Optional[BaseChatModel] = None
+    # 工作空间的DuckDB catalog，本地数据集直接通过其中的视图查询
+    catalog: Optional[WorkspaceCatalog] = None
+    # 近似模式：execute_sql_query在采样数据上执行，结果会标记为近似值
+    approximate: bool = False
+    sample_percent: float = DEFAULT_SAMPLE_PERCENT
+    sample_rows: int = DEFAULT_SAMPLE_ROWS
+    # 图表在内存中渲染的格式（png/webp/svg）和分辨率
+    chart_format: str = "png"
+    chart_dpi: int = 100
+    # 单条序列绘图的最大点数，超过时绘图前先降采样
+    plot_max_points: int = 5000
+    # 生成代码执行的资源限制，None表示不限制；时间和内存限制只在沙箱中生效
+    max_execution_time: Optional[float] = None
+    max_cpu_time: Optional[float] = None
+    max_memory_mb: Optional[int] = None
+    max_result_rows: Optional[int] = None
+    max_result_bytes: Optional[int] = None
+    # 执行轨迹的保存目录，None表示不记录
+    trace_directory: Optional[str] = None
+    # 记忆压缩模式：提示词中的历史消息不超过该token数，较早的消息在响应返回后异步折叠为摘要；None表示不压缩
+    memory_token_budget: Optional[int] = None
+    memory_summary_tokens: int = 300
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     @classmethod
@@ -0,0 +1,43 @@
+from typing import Any, AsyncIterator, Dict, List, Union
+
+from agent_core.llm.base import BaseChatModel
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    按顺序返回录制的回复，不访问模型接口。用于回放执行轨迹和离线测试。
+
+    Args:
+        completions (List[str]): 依次返回的回复
+    """
+
+    def __init__(self, completions: List[str], **kwargs):
+        super().__init__(model="replay", api_key="", **kwargs)
+        self.completions = list(completions)
+        self.calls: List[List[Dict[str, str]]] = []
+
+    def _next(self, messages: List[Dict[str, str]]) -> str:
+        self.calls.append(messages)
+        if not self.completions:
+            raise RuntimeError(
+                f"Replay exhausted: no recorded completion for LLM call #{len(self.calls)}."
+            )
+        return self.completions.pop(0)
+
+    async def _chat_stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        yield self._next(messages)
+
+    async def _chat_no_stream(self, messages: List[Dict[str, str]]) -> str:
+        return self._next(messages)
+
+    async def _chat_with_functions(
+        self,
+        messages: List[Dict[str, str]],
+        functions: List[Dict[str, Any]],
+        function_call: Union[str, Dict[str, str], None],
+    ) -> Dict[str, Any]:
+        return {"content": self._next(messages), "function_call": None}
+
+    @property
+    def type(self) -> str:
+        return "replay"
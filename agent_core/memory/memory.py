@@ -1,19 +1,40 @@
-from typing import Union
+import re
+from typing import Optional, Union
+
+_CJK_RE = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计token数：中日韩字符约每字一个token，其他字符约每四个一个token"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
 
 
 class Memory:
-    """Memory class to store the conversations"""
+    """Memory class to store the conversations
+
+    设置 token_budget 后进入压缩模式：较早的消息折叠为滚动摘要（summary），提示词中只包含摘要和
+    预算内最近的原始消息，会话变长时提示词大小保持不变。需要折叠的消息由 pending_messages() 给出，
+    摘要由 MemorySummarizer 在响应返回后异步生成。
+    """
 
     _messages: list
     _memory_size: int
     agent_description: str
 
     def __init__(
-        self, memory_size: int = 1, agent_description: Union[str, None] = None
+        self,
+        memory_size: int = 1,
+        agent_description: Union[str, None] = None,
+        token_budget: Optional[int] = None,
     ):
         self._messages = []
         self._memory_size = memory_size
         self.agent_description = agent_description
+        self.token_budget = token_budget
+        self.summary: Optional[str] = None
+        # 开头已折叠进摘要的消息数
+        self._summarized = 0
 
     def add(self, message: str, is_user: bool):
         self._messages.append({"message": message, "is_user": is_user})
@@ -35,17 +56,50 @@ class Memory:
             f"{message[:max_length]} ..." if len(str(message)) > max_length else message
         )
 
+    def _format(self, message: dict) -> str:
+        return f"{'### QUERY' if message['is_user'] else '### ANSWER'}\n {message['message'] if message['is_user'] else self._truncate(message['message'])}"
+
     def get_messages(self, limit: int = None) -> list:
         """
         Returns the conversation messages based on limit parameter
         or default memory size
+
+        压缩模式下返回摘要和预算内最近的消息，limit不再生效
         """
+        if self.token_budget is not None:
+            summary = [f"### SUMMARY\n {self.summary}"] if self.summary else []
+            return summary + [self._format(message) for message in self._recent_messages()]
+
         limit = self._memory_size if limit is None else limit
 
-        return [
-            f"{'### QUERY' if message['is_user'] else '### ANSWER'}\n {message['message'] if message['is_user'] else self._truncate(message['message'])}"
-            for message in self._messages[-limit:]
-        ]
+        return [self._format(message) for message in self._messages[-limit:]]
+
+    def _recent_messages(self) -> list:
+        """未折叠的消息中，从最新的开始放入token预算的部分（至少包含最后一条）"""
+        budget = self.token_budget - (estimate_tokens(self.summary) if self.summary else 0)
+        unsummarized = self._messages[self._summarized:]
+        count, used = 0, 0
+        for message in reversed(unsummarized):
+            used += estimate_tokens(self._format(message))
+            if count and used > budget:
+                break
+            count += 1
+        # 从问题开始保留，回答和对应的问题一起折叠进摘要
+        while count > 1 and not unsummarized[len(unsummarized) - count]["is_user"]:
+            count -= 1
+        return unsummarized[len(unsummarized) - count:]
+
+    def pending_messages(self) -> list:
+        """压缩模式下放不进token预算、需要折叠进摘要的消息"""
+        if self.token_budget is None:
+            return []
+        end = len(self._messages) - len(self._recent_messages())
+        return self._messages[self._summarized:end]
+
+    def fold(self, summary: str, count: int):
+        """用新的摘要替换开头 count 条未折叠的消息"""
+        self.summary = summary
+        self._summarized = min(self._summarized + count, len(self._messages))
 
     def get_conversation(self, limit: int = None) -> str:
         """
@@ -89,7 +143,15 @@ class Memory:
                     "content": self.agent_description,
                 }
             )
-        for message in self.all():
+        if self.summary:
+            messages.append(
+                {
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation: {self.summary}",
+                }
+            )
+        # 已折叠进摘要的消息不再单独发送
+        for message in self._messages[self._summarized:]:
             if message["is_user"]:
                 messages.append({"role": "user", "content": message["message"]})
             else:
@@ -98,6 +160,8 @@ class Memory:
 
     def clear(self):
         self._messages = []
+        self.summary = None
+        self._summarized = 0
 
     @property
     def size(self):
@@ -0,0 +1,114 @@
+"""
+对话记忆的滚动摘要。
+
+压缩模式的 Memory 中放不进token预算的较早消息，由 MemorySummarizer 折叠进摘要：配置了LLM时
+由LLM在已有摘要的基础上更新，否则（或LLM调用失败时）使用抽取式摘要，保留用户的问题和回答的
+开头。摘要在响应返回后异步计算，不增加本轮的响应时间。
+"""
+import re
+from typing import List, Optional
+
+from loguru import logger
+
+from agent_core.llm.base import BaseChatModel
+from agent_core.memory.memory import Memory, estimate_tokens
+from agent_core.prompts import SummarizeConversationPrompt
+
+DEFAULT_SUMMARY_TOKENS = 300
+# 交给LLM摘要的单条消息的最大长度
+MAX_TRANSCRIPT_MESSAGE_LENGTH = 1000
+
+_CODE_BLOCK_RE = re.compile(r"```(?:python)?\n?(.*?)```", re.DOTALL)
+_SQL_RE = re.compile(r"execute_sql_query\(\s*[rf]?(\"\"\"|'''|\"|')(.*?)\1", re.DOTALL)
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    """按估计的token数截断文本"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    return text[: max(int(len(text) * max_tokens / tokens), 1)].rstrip() + " ..."
+
+
+def _answer_digest(message: str) -> str:
+    """回答的一行摘要：代码回答取其中的SQL，其他回答取第一行"""
+    code = _CODE_BLOCK_RE.search(message)
+    if code:
+        queries = [" ".join(match[1].split()) for match in _SQL_RE.findall(code.group(1))]
+        return f"SQL: {'; '.join(queries)}" if queries else "generated code"
+    lines = message.strip().splitlines()
+    return lines[0] if lines else ""
+
+
+def extractive_summary(previous: Optional[str], messages: List[dict], max_tokens: int) -> str:
+    """
+    不调用LLM的摘要：每轮一行「问题 -> 回答摘要」，超出token上限时先丢弃最早的行。
+    """
+    lines = previous.splitlines() if previous else []
+    for message in messages:
+        if message["is_user"]:
+            lines.append(f"- {' '.join(str(message['message']).split())}")
+        elif lines:
+            digest = _clip(_answer_digest(str(message["message"])), 60)
+            if digest:
+                lines[-1] = f"{lines[-1]} -> {digest}"
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return _clip("\n".join(lines), max_tokens)
+
+
+class MemorySummarizer:
+    """
+    Args:
+        llm (BaseChatModel, optional): 生成摘要的模型，None表示只使用抽取式摘要
+        max_tokens (int): 摘要的token上限
+    """
+
+    def __init__(self, llm: Optional[BaseChatModel] = None, max_tokens: int = DEFAULT_SUMMARY_TOKENS):
+        self.llm = llm
+        self.max_tokens = max_tokens
+
+    async def compact(self, memory: Memory) -> bool:
+        """
+        把放不进token预算的消息折叠进摘要。
+
+        Returns:
+            bool: 是否更新了摘要
+        """
+        pending = memory.pending_messages()
+        if not pending:
+            return False
+        # 摘要最多占用一半的预算，其余留给最近的原始消息
+        summary = await self.summarize(
+            memory.summary, pending, min(self.max_tokens, memory.token_budget // 2)
+        )
+        memory.fold(summary, len(pending))
+        return True
+
+    async def summarize(
+        self, previous: Optional[str], messages: List[dict], max_tokens: Optional[int] = None
+    ) -> str:
+        """在已有摘要的基础上加入新的消息，返回新的摘要"""
+        max_tokens = self.max_tokens if max_tokens is None else max_tokens
+        if self.llm is not None:
+            prompt = SummarizeConversationPrompt(
+                summary=previous,
+                conversation=self._transcript(messages),
+                # 英文约每词1.3个token
+                max_words=max(int(max_tokens / 1.3), 1),
+            )
+            try:
+                summary = (await self.llm.call(prompt)).strip()
+                if summary:
+                    return _clip(summary, max_tokens)
+            except Exception as e:
+                logger.bind(name="agent").warning(f"LLM summarization failed, using extractive summary: {e}")
+        return extractive_summary(previous, messages, max_tokens)
+
+    @staticmethod
+    def _transcript(messages: List[dict]) -> str:
+        return "\n".join(
+            f"{'User' if message['is_user'] else 'Assistant'}: "
+            f"{str(message['message'])[:MAX_TRANSCRIPT_MESSAGE_LENGTH]}"
+            for message in messages
+        )
@@ -15,6 +15,7 @@ from .generate_python_code_with_sql import GeneratePythonCodeWithSQLPrompt
 from .rephrase_query import RephraseQueryPrompt
 from .clarification_questions_prompt import ClarificationQuestionsPrompt
 from .generate_dataset_summary import GenerateDatasetSummaryPrompt
+from .summarize_conversation import SummarizeConversationPrompt
 
 if TYPE_CHECKING:
     from agent_core.agent.dataframe_state import AgentState
@@ -75,4 +76,5 @@ __all__ = [
     "RephraseQueryPrompt",
     "ClarificationQuestionsPrompt",
     "GenerateDatasetSummaryPrompt",
+    "SummarizeConversationPrompt",
 ]
@@ -0,0 +1,12 @@
+from .base import BasePrompt
+
+
+class SummarizeConversationPrompt(BasePrompt):
+    """Prompt to fold older conversation messages into a rolling summary."""
+
+    template_path = "summarize_conversation.tmpl"
+
+    def to_json(self):
+        return {
+            "prompt": self.to_string(),
+        }
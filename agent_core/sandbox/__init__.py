@@ -1,3 +1,4 @@
 from .sandbox import Sandbox
+from .subprocess_sandbox import SubprocessSandbox
 
-__all__ = ["Sandbox"]
\ No newline at end of file
+__all__ = ["Sandbox", "SubprocessSandbox"]
@@ -0,0 +1,90 @@
+"""
+沙箱进程间的数据传输。
+
+DataFrame按Arrow IPC流格式写入共享内存，另一端从共享内存读取后释放，避免对大结果集做pickle；
+较小的DataFrame直接随消息发送IPC字节。其余值由multiprocessing的连接按pickle传输。
+"""
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+# 小于该大小的DataFrame不使用共享内存，创建共享内存段的开销高于直接发送
+SHARED_MEMORY_MIN_BYTES = 64 * 1024
+
+
+@dataclass
+class ArrowFrame:
+    """
+    Arrow IPC编码的DataFrame。
+
+    Attributes:
+        size (int): IPC流的字节数
+        shm_name (str, optional): 共享内存段名称，由接收方读取后释放
+        data (bytes, optional): 较小的DataFrame直接携带IPC字节
+    """
+
+    size: int
+    shm_name: Optional[str] = None
+    data: Optional[bytes] = None
+
+
+def encode_dataframe(df: pd.DataFrame) -> Any:
+    """把DataFrame编码为ArrowFrame，Arrow无法表示的DataFrame原样返回（按pickle传输）"""
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return df
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    buffer = sink.getvalue()
+
+    if buffer.size < SHARED_MEMORY_MIN_BYTES:
+        return ArrowFrame(size=buffer.size, data=buffer.to_pybytes())
+
+    shm = shared_memory.SharedMemory(create=True, size=buffer.size)
+    try:
+        shm.buf[: buffer.size] = memoryview(buffer).cast("B")
+    finally:
+        shm.close()
+    # 共享内存段的所有权交给接收方，由接收方负责unlink
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return ArrowFrame(size=buffer.size, shm_name=shm.name)
+
+
+def decode_dataframe(frame: ArrowFrame) -> pd.DataFrame:
+    if frame.shm_name is None:
+        data = frame.data
+    else:
+        shm = shared_memory.SharedMemory(name=frame.shm_name)
+        try:
+            data = bytes(shm.buf[: frame.size])
+        finally:
+            shm.close()
+            shm.unlink()
+    return pa.ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+
+
+def encode(value: Any) -> Any:
+    """递归编码值中的DataFrame"""
+    if isinstance(value, pd.DataFrame):
+        return encode_dataframe(value)
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    if type(value) in (list, tuple):
+        return type(value)(encode(item) for item in value)
+    return value
+
+
+def decode(value: Any) -> Any:
+    if isinstance(value, ArrowFrame):
+        return decode_dataframe(value)
+    if isinstance(value, dict):
+        return {key: decode(item) for key, item in value.items()}
+    if type(value) in (list, tuple):
+        return type(value)(decode(item) for item in value)
+    return value
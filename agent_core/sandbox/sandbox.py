@@ -1,4 +1,4 @@
-import ast
+from data_inteligence.code_core.code_execution.code_cache import code_artifact_cache
 
 
 class Sandbox:
@@ -36,40 +36,7 @@ class Sandbox:
         Returns:
             list: List of SQL query strings found in the code.
         """
-        sql_queries = []
-
-        class SQLQueryExtractor(ast.NodeVisitor):
-            def visit_Assign(self, node):
-                # Look for assignments where SQL queries might be defined
-                if (
-                    isinstance(node.value, (ast.Str, ast.Constant))
-                    and isinstance(node.value.s, str)
-                    and any(
-                        keyword in node.value.s.upper()
-                        for keyword in ["SELECT", "WITH"]
-                    )
-                ):
-                    sql_queries.append(node.value.s)
-                self.generic_visit(node)
-
-            def visit_Call(self, node):
-                # Look for function calls where SQL queries might be passed
-                for arg in node.args:
-                    if (
-                        isinstance(arg, (ast.Str, ast.Constant))
-                        and isinstance(arg.s, str)
-                        and any(
-                            keyword in arg.s.upper() for keyword in ["SELECT", "WITH"]
-                        )
-                    ):
-                        sql_queries.append(arg.s)
-                self.generic_visit(node)
-
-        # Parse the code into an AST and visit all nodes
-        tree = ast.parse(code)
-        SQLQueryExtractor().visit(tree)
-
-        return sql_queries
+        return list(code_artifact_cache.get(code).sql_queries)
 
     def _compile_code(self, code: str) -> str:
         """Compile code as a Python module
@@ -84,6 +51,6 @@ class Sandbox:
             str: Compiled code as a string.
         """
         try:
-            return compile(code, "<string>", "exec")
+            return code_artifact_cache.get(code).code_object
         except SyntaxError as e:
             raise SyntaxError(f"Syntax error in code: {e}") from e
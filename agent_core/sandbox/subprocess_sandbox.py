@@ -0,0 +1,315 @@
+"""
+基于本地子进程池的沙箱。
+
+启动时预先创建若干worker进程，worker在就绪前已导入pandas/numpy/matplotlib，执行代码时不再
+承担导入开销。生成的代码在worker中执行，环境中的函数（execute_sql_query、skills）在worker中
+替换为代理，调用时回到宿主进程执行；DataFrame通过共享内存中的Arrow IPC传输。
+"""
+import importlib
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+import traceback
+import types
+from multiprocessing.connection import Connection
+from typing import Any, Dict
+
+from data_inteligence.code_core.code_execution.environment import get_base_environment
+from data_inteligence.code_core.code_execution.limits import EXECUTION_LIMITS_NAME, ExecutionLimits
+from data_inteligence.exceptions import (
+    CodeExecutionError,
+    ExecutionTimeoutError,
+    ResourceLimitError,
+    ResultTooLargeError,
+)
+
+from .ipc import decode, encode
+from .sandbox import Sandbox
+
+
+class SubprocessSandbox(Sandbox):
+    """
+    补充worker失败（如导入超时）时按指数退避重试，池中的worker数不会因一次失败而永久减少。
+
+    Args:
+        pool_size (int): 预热的worker进程数
+        timeout (float): 单次代码执行的最长时间（秒），超时的worker会被结束并替换；环境中的
+            ExecutionLimits设置了更短的wall_time时以其为准
+        max_tasks_per_worker (int): worker执行多少次代码后被替换，避免模块级状态不断累积
+        start_method (str): multiprocessing的进程启动方式，默认spawn，不继承宿主进程的线程和连接
+        startup_timeout (float): 等待worker完成导入的最长时间（秒）
+    """
+
+    # 补充worker失败后的重试间隔（秒），每次失败翻倍
+    replenish_retry_delay = 1.0
+    max_replenish_retry_delay = 60.0
+
+    def __init__(
+        self,
+        pool_size: int = 2,
+        timeout: float = 60.0,
+        max_tasks_per_worker: int = 100,
+        start_method: str = "spawn",
+        startup_timeout: float = 60.0,
+    ):
+        super().__init__()
+        if pool_size <= 0:
+            raise ValueError(f"Sandbox pool size must be positive, got {pool_size}")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.startup_timeout = startup_timeout
+        self._context = multiprocessing.get_context(start_method)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._stopping.clear()
+            workers = [_Worker(self._context) for _ in range(self.pool_size)]
+            for worker in workers:
+                worker.wait_ready(self.startup_timeout)
+                self._idle.put(worker)
+            self._started = True
+
+    def stop(self):
+        with self._lock:
+            self._started = False
+            self._stopping.set()
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+    def _exec_code(self, code: str, environment: dict) -> dict:
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise CodeExecutionError(
+                f"No sandbox worker became available within {self.timeout}s"
+            )
+
+        limits = environment.get(EXECUTION_LIMITS_NAME) or ExecutionLimits()
+        timeout = min(self.timeout, limits.wall_time) if limits.wall_time else self.timeout
+        try:
+            return worker.execute(code, environment, timeout)
+        finally:
+            self._release(worker)
+
+    def _release(self, worker: "_Worker") -> None:
+        if self._started and worker.is_alive() and worker.tasks < self.max_tasks_per_worker:
+            self._idle.put(worker)
+            return
+
+        worker.close()
+        if self._started:
+            # 在后台补充worker，不让当前请求承担新进程的导入开销
+            threading.Thread(target=self._replenish, daemon=True).start()
+
+    def _replenish(self) -> None:
+        delay = self.replenish_retry_delay
+        while self._started:
+            worker = _Worker(self._context)
+            try:
+                worker.wait_ready(self.startup_timeout)
+            except CodeExecutionError:
+                # stop()时立即结束等待
+                if self._stopping.wait(delay):
+                    return
+                delay = min(delay * 2, self.max_replenish_retry_delay)
+                continue
+            if self._started:
+                self._idle.put(worker)
+            else:
+                worker.close()
+            return
+
+    def transfer_file(self, csv_data, filename="file.csv"):
+        """worker与宿主进程共享文件系统，不需要传输文件，直接返回文件路径"""
+        return filename
+
+
+class _Worker:
+    """宿主进程持有的worker句柄"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def wait_ready(self, timeout: float) -> None:
+        try:
+            ready = self.conn.poll(timeout) and self.conn.recv()[0] == "ready"
+        except (EOFError, OSError):
+            ready = False
+        if not ready:
+            self.close()
+            raise CodeExecutionError(f"Sandbox worker failed to start within {timeout}s")
+
+    def execute(self, code: str, environment: dict, timeout: float) -> Any:
+        self.tasks += 1
+        values, functions, modules = _split_environment(environment)
+        deadline = time.monotonic() + timeout
+        try:
+            self.conn.send(("exec", code, encode(values), list(functions), modules))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.conn.poll(remaining):
+                    self.close()
+                    raise ExecutionTimeoutError(
+                        f"Code execution timed out after {timeout}s. Aggregate the data in SQL "
+                        "and avoid row-by-row loops over large DataFrames."
+                    )
+
+                message = self.conn.recv()
+                kind = message[0]
+                if kind == "call":
+                    _, name, args, kwargs = message
+                    self._call_host_function(functions[name], args, kwargs)
+                elif kind == "result":
+                    return decode(message[1])
+                else:
+                    # 异常信息为worker中的完整traceback，用于纠错提示
+                    _, error_trace, limit_error = message
+                    if limit_error is not None:
+                        # 触发CPU或内存限制的worker不再复用
+                        if not isinstance(limit_error, ResultTooLargeError):
+                            self.close()
+                        raise type(limit_error)(error_trace)
+                    raise CodeExecutionError(error_trace)
+        except CodeExecutionError:
+            raise
+        except (EOFError, OSError) as e:
+            self.close()
+            raise CodeExecutionError("Sandbox worker exited unexpectedly") from e
+        except BaseException:
+            # worker可能停在等待宿主回复的状态，不能再放回池中
+            self.close()
+            raise
+
+    def _call_host_function(self, function, args, kwargs) -> None:
+        try:
+            response = ("return", encode(function(*decode(args), **decode(kwargs))))
+        except Exception as e:
+            response = ("raise", _portable_exception(e))
+        try:
+            self.conn.send(response)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            self.conn.send(("raise", RuntimeError(f"Cannot transfer result to sandbox: {e}")))
+
+    def close(self) -> None:
+        if self.process.is_alive():
+            try:
+                self.conn.send(("stop",))
+            except OSError:
+                pass
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.conn.close()
+
+
+def _split_environment(environment: dict):
+    """把执行环境拆分为可传输的值、宿主函数和模块名，基础环境中的内容worker已自行导入"""
+    base_environment = get_base_environment()
+    values: Dict[str, Any] = {}
+    functions: Dict[str, Any] = {}
+    modules: Dict[str, str] = {}
+    for name, value in environment.items():
+        if name.startswith("__") or base_environment.get(name) is value:
+            continue
+        if isinstance(value, types.ModuleType):
+            modules[name] = value.__name__
+        elif callable(value) and not isinstance(value, type):
+            functions[name] = value
+        else:
+            values[name] = value
+    return values, functions, modules
+
+
+def _portable_exception(error: Exception) -> Exception:
+    """宿主函数抛出的异常需要能在worker中反序列化"""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+class _HostFunction:
+    """worker中代表宿主函数的代理，调用时把参数发回宿主进程执行"""
+
+    def __init__(self, conn: Connection, name: str):
+        self._conn = conn
+        self.__name__ = name
+
+    def __call__(self, *args, **kwargs):
+        self._conn.send(("call", self.__name__, encode(args), encode(kwargs)))
+        status, payload = self._conn.recv()
+        if status == "raise":
+            raise payload
+        return decode(payload)
+
+
+def _worker_main(conn: Connection) -> None:
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    from data_inteligence.code_core.code_execution.charts import CHART_CAPTURE_NAME, ChartCapture
+    from data_inteligence.code_core.code_execution.code_cache import code_artifact_cache
+    from data_inteligence.code_core.code_execution.downsampling import PLOT_GUARD_NAME, PlotGuard
+
+    base_environment = get_base_environment()
+    plt = base_environment["plt"]
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message[0] == "stop":
+            break
+
+        _, code, values, functions, modules = message
+        values = decode(values)
+        limits = values.pop(EXECUTION_LIMITS_NAME, None) or ExecutionLimits()
+        namespace = dict(base_environment)
+        namespace.update(
+            {name: importlib.import_module(module) for name, module in modules.items()}
+        )
+        namespace.update(values)
+        namespace.update({name: _HostFunction(conn, name) for name in functions})
+        namespace.setdefault(PLOT_GUARD_NAME, PlotGuard())
+        chart_capture = namespace.setdefault(CHART_CAPTURE_NAME, ChartCapture())
+        chart_capture.begin()
+        try:
+            with limits.enforce():
+                exec(code_artifact_cache.get(code).code_object, namespace)
+                if "result" not in namespace:
+                    raise ValueError(
+                        "No result was returned from the code execution. Please return the result in dictionary format, for example: result = {'type': ..., 'value': ...}"
+                    )
+                result = chart_capture.finalize(namespace["result"])
+            limits.check_result(result)
+            conn.send(("result", encode(result)))
+        except Exception as e:
+            conn.send(
+                ("error", traceback.format_exc(), e if isinstance(e, ResourceLimitError) else None)
+            )
+        finally:
+            plt.close("all")
+
+    conn.close()
+
@@ -105,7 +105,7 @@ def skill(*args: Union[str, Callable]) -> Callable:
 
             # Automatically add the skill to the global skills manager
             try:
-                from pandasai.ee.skills.manager import SkillsManager
+                from agent_core.skills.manager import SkillsManager
 
                 SkillsManager.add_skills(skill_obj)
             except ImportError:
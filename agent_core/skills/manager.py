@@ -1,4 +1,5 @@
-from typing import List
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping
 
 from . import SkillType
 
@@ -9,6 +10,8 @@ class SkillsManager:
     """
 
     _skills: List[SkillType] = []
+    # skill名称到函数的映射，注册时建立，执行代码时直接并入执行环境
+    _functions: Dict[str, Callable[..., Any]] = {}
 
     @classmethod
     def add_skills(cls, *skills: SkillType):
@@ -24,6 +27,7 @@ class SkillsManager:
                 raise ValueError(f"Skill with name '{skill.name}' already exists.")
 
         cls._skills.extend(skills)
+        cls._functions.update({skill.name: skill.func for skill in skills})
 
     @classmethod
     def skill_exists(cls, name: str):
@@ -71,12 +75,23 @@ class SkillsManager:
         """
         return cls._skills.copy()
 
+    @classmethod
+    def get_functions(cls) -> Mapping[str, Callable[..., Any]]:
+        """
+        Get the skill functions by name, bound once when the skills are registered.
+
+        Returns:
+            Mapping[str, Callable]: A read-only snapshot of the skill functions.
+        """
+        return MappingProxyType(dict(cls._functions))
+
     @classmethod
     def clear_skills(cls):
         """
         Clear all skills from the global list.
         """
         cls._skills.clear()
+        cls._functions.clear()
 
     @classmethod
     def __str__(cls) -> str:
@@ -1,3 +1,4 @@
+from .code_cache import CodeArtifact, CodeArtifactCache, code_artifact_cache
 from .code_executor import CodeExecutor
 
-__all__ = ["CodeExecutor"]
+__all__ = ["CodeArtifact", "CodeArtifactCache", "CodeExecutor", "code_artifact_cache"]
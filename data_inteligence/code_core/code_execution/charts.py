@@ -0,0 +1,153 @@
+"""
+在内存中捕获生成代码绘制的图表。
+
+代码清洗阶段把 `savefig(...)` 调用改写为 `_chart_capture.savefig(...)`，图表直接从matplotlib
+figure渲染到内存缓冲区，不再写入磁盘再读回；执行结束后本次执行创建的figure会被关闭。
+"""
+import base64
+import io
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+from data_inteligence.constants import DEFAULT_CHART_DIRECTORY
+
+CHART_CAPTURE_NAME = "_chart_capture"
+
+CHART_MIME_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+}
+
+
+@dataclass(frozen=True)
+class RenderedChart:
+    data: bytes
+    format: str
+
+    @property
+    def mime_type(self) -> str:
+        return CHART_MIME_TYPES[self.format]
+
+    @property
+    def data_uri(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode()}"
+
+    @classmethod
+    def from_data_uri(cls, uri: str) -> Optional["RenderedChart"]:
+        header, _, payload = uri.partition(",")
+        mime_type = header[len("data:"):].split(";")[0]
+        for chart_format, mime in CHART_MIME_TYPES.items():
+            if mime == mime_type:
+                return cls(base64.b64decode(payload), chart_format)
+        return None
+
+
+class ChartCapture:
+    """
+    一次代码执行的图表捕获器。
+
+    Args:
+        format (str): 图表格式，png/webp/svg/jpg
+        dpi (int): 位图格式的分辨率
+    """
+
+    def __init__(self, format: str = "png", dpi: int = 100):
+        chart_format = format.lower()
+        if chart_format not in CHART_MIME_TYPES:
+            raise ValueError(
+                f"Unsupported chart format '{format}', expected one of {sorted(CHART_MIME_TYPES)}"
+            )
+        self.format = chart_format
+        self.dpi = dpi
+        self.charts: Dict[str, RenderedChart] = {}
+        self._initial_figures: Set[int] = set()
+
+    def __getstate__(self):
+        # 传入沙箱worker时只携带渲染配置
+        return {"format": self.format, "dpi": self.dpi}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def begin(self) -> None:
+        """记录执行前已存在的figure，执行结束后只关闭本次执行创建的figure"""
+        import matplotlib.pyplot as plt
+
+        self._initial_figures = set(plt.get_fignums())
+
+    def savefig(self, target: Any, fname: Any = None, *args, **kwargs) -> None:
+        """
+        代替 `plt.savefig` / `Figure.savefig`，保存到文件路径的图表渲染到内存。
+
+        Args:
+            target: 原调用的对象，pyplot模块、Figure或Axes
+            fname: 原调用的输出路径，非路径（如文件对象）时按原方式保存
+        """
+        figure = self._figure(target)
+        if not isinstance(fname, (str, os.PathLike)):
+            figure.savefig(fname, *args, **kwargs)
+            return
+
+        kwargs.update(format=self.format, dpi=self.dpi)
+        buffer = io.BytesIO()
+        figure.savefig(buffer, *args, **kwargs)
+        self.charts[str(fname)] = RenderedChart(buffer.getvalue(), self.format)
+
+    def finalize(self, result: Any) -> Any:
+        """
+        把plot结果中的图表路径替换为内存中渲染的图表（data URI）。
+
+        代码没有通过savefig保存图表时，依次尝试读取代码写出的临时图表文件、渲染仍打开的figure。
+        """
+        if not isinstance(result, dict) or result.get("type") != "plot":
+            return result
+        value = result.get("value")
+        if not isinstance(value, (str, os.PathLike)) or str(value).startswith("data:"):
+            return result
+
+        chart = self.charts.get(str(value)) or self._read_file(value) or self._render_open_figure()
+        if chart is None:
+            return result
+        return {**result, "value": chart.data_uri}
+
+    def close_figures(self) -> None:
+        import matplotlib.pyplot as plt
+
+        for number in set(plt.get_fignums()) - self._initial_figures:
+            plt.close(number)
+
+    @staticmethod
+    def _figure(target: Any):
+        if hasattr(target, "gcf"):
+            return target.gcf()
+        if hasattr(target, "savefig"):
+            return target
+        return target.figure
+
+    def _read_file(self, path: Any) -> Optional[RenderedChart]:
+        path = Path(path)
+        if not path.is_file():
+            return None
+        chart_format = path.suffix.lstrip(".").lower()
+        if chart_format not in CHART_MIME_TYPES:
+            return None
+        chart = RenderedChart(path.read_bytes(), chart_format)
+        # 代码写出的临时图表文件读取后删除
+        if path.resolve().parent == DEFAULT_CHART_DIRECTORY.resolve():
+            path.unlink(missing_ok=True)
+        return chart
+
+    def _render_open_figure(self) -> Optional[RenderedChart]:
+        import matplotlib.pyplot as plt
+
+        figures = sorted(set(plt.get_fignums()) - self._initial_figures)
+        if not figures:
+            return None
+        buffer = io.BytesIO()
+        plt.figure(figures[-1]).savefig(buffer, format=self.format, dpi=self.dpi)
+        return RenderedChart(buffer.getvalue(), self.format)
@@ -0,0 +1,115 @@
+"""
+已清洗代码的编译产物缓存。
+
+缓存命中的代码（缓存回放、重试时重复生成的相同代码）直接复用编译好的code object和静态分析
+结果，不再重复解析和编译。缓存按代码文本的哈希索引。
+"""
+import ast
+import hashlib
+from dataclasses import dataclass
+from types import CodeType
+from typing import FrozenSet, Optional, Tuple
+
+from data_inteligence.helpers.lru_cache import LRUCache
+
+SQL_KEYWORDS = ("SELECT", "WITH")
+
+
+@dataclass(frozen=True)
+class CodeArtifact:
+    """
+    Attributes:
+        code_hash (str): 代码文本的sha256
+        code_object (CodeType): 编译后的模块代码
+        sql_queries (tuple): 代码中作为赋值或函数参数出现的SQL字符串
+        function_calls (frozenset): 代码调用的函数名，属性调用记为 "obj.attr"
+    """
+
+    code_hash: str
+    code_object: CodeType
+    sql_queries: Tuple[str, ...]
+    function_calls: FrozenSet[str]
+
+
+class _CodeAnalyzer(ast.NodeVisitor):
+    def __init__(self):
+        self.sql_queries = []
+        self.function_calls = set()
+
+    @staticmethod
+    def _is_sql(node: ast.AST) -> bool:
+        return (
+            isinstance(node, ast.Constant)
+            and isinstance(node.value, str)
+            and any(keyword in node.value.upper() for keyword in SQL_KEYWORDS)
+        )
+
+    def visit_Assign(self, node: ast.Assign):
+        if self._is_sql(node.value):
+            self.sql_queries.append(node.value.value)
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        if isinstance(node.func, ast.Name):
+            self.function_calls.add(node.func.id)
+        elif isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+            self.function_calls.add(f"{node.func.value.id}.{node.func.attr}")
+        self.sql_queries.extend(arg.value for arg in node.args if self._is_sql(arg))
+        self.generic_visit(node)
+
+
+class CodeArtifactCache:
+    """
+    Args:
+        max_size (int): 缓存的最大条目数
+        name (str, optional): 注册名称，设置后命中率会出现在监控指标中
+    """
+
+    def __init__(self, max_size: int = 512, name: Optional[str] = None):
+        self._cache = LRUCache(max_size=max_size, name=name)
+
+    @staticmethod
+    def hash_code(code: str) -> str:
+        return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+    def get(self, code: str) -> CodeArtifact:
+        """
+        返回代码的编译产物，未命中时解析、分析并编译。
+
+        Raises:
+            SyntaxError: 代码存在语法错误，错误不会被缓存
+        """
+        code_hash = self.hash_code(code)
+        return self._cache.get_or_compute(code_hash, lambda: self._build(code, code_hash))
+
+    def register(
+        self, code: str, sql_queries: Tuple[str, ...], function_calls: FrozenSet[str]
+    ) -> CodeArtifact:
+        """登记已完成静态分析的代码，只做编译，不再解析为Python AST"""
+        code_hash = self.hash_code(code)
+        artifact = CodeArtifact(
+            code_hash=code_hash,
+            code_object=compile(code, "<string>", "exec"),
+            sql_queries=tuple(sql_queries),
+            function_calls=frozenset(function_calls),
+        )
+        self._cache.put(code_hash, artifact)
+        return artifact
+
+    @staticmethod
+    def _build(code: str, code_hash: str) -> CodeArtifact:
+        tree = ast.parse(code)
+        analyzer = _CodeAnalyzer()
+        analyzer.visit(tree)
+        return CodeArtifact(
+            code_hash=code_hash,
+            code_object=compile(tree, "<string>", "exec"),
+            sql_queries=tuple(analyzer.sql_queries),
+            function_calls=frozenset(analyzer.function_calls),
+        )
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+code_artifact_cache = CodeArtifactCache(name="code_artifacts")
@@ -1,17 +1,43 @@
-from typing import Any
+from typing import Any, Mapping, Optional
 
-from data_inteligence.code_core.code_execution.environment import get_environment
+from data_inteligence.code_core.code_execution.charts import CHART_CAPTURE_NAME, ChartCapture
+from data_inteligence.code_core.code_execution.code_cache import code_artifact_cache
+from data_inteligence.code_core.code_execution.downsampling import (
+    DEFAULT_MAX_POINTS,
+    PLOT_GUARD_NAME,
+    PlotGuard,
+)
+from data_inteligence.code_core.code_execution.limits import EXECUTION_LIMITS_NAME, ExecutionLimits
+from data_inteligence.exceptions import CodeExecutionError, ResourceLimitError
+from data_inteligence.code_core.code_execution.environment import get_base_environment
 
 
 class CodeExecutor:
     """
     Handle the logic on how to handle different lines of code
+
+    执行环境由只读的基础环境和本次执行的覆盖层组成：基础环境（依赖库、skills等）只创建一次，
+    add_to_env只写入覆盖层，执行时才合并出代码使用的命名空间，代码的赋值不会影响基础环境。
     """
 
-    _environment: dict
+    _environment: Optional[dict]
 
-    def __init__(self, config: Any) -> None:
-        self._environment = get_environment()
+    def __init__(self, config: Any, base_environment: Optional[Mapping[str, Any]] = None) -> None:
+        self._base_environment = (
+            base_environment if base_environment is not None else get_base_environment()
+        )
+        self._chart_capture = ChartCapture(
+            format=getattr(config, "chart_format", "png"), dpi=getattr(config, "chart_dpi", 100)
+        )
+        plot_guard = PlotGuard(max_points=getattr(config, "plot_max_points", DEFAULT_MAX_POINTS))
+        # 资源限制随环境传给沙箱worker；在本进程内执行时只检查结果大小
+        self._limits = ExecutionLimits.from_config(config)
+        self._overlay: dict = {
+            CHART_CAPTURE_NAME: self._chart_capture,
+            PLOT_GUARD_NAME: plot_guard,
+            EXECUTION_LIMITS_NAME: self._limits,
+        }
+        self._environment = None
 
     def add_to_env(self, key: str, value: Any) -> None:
         """
@@ -20,29 +46,43 @@ class CodeExecutor:
             key (str): Name of variable or lib alias
             value (Any): It can any value int, float, function, class etc.
         """
-        self._environment[key] = value
+        self._overlay[key] = value
+        if self._environment is not None:
+            self._environment[key] = value
 
     def execute(self, code: str) -> dict:
+        environment = self.environment
         try:
-            exec(code, self._environment)
+            # 相同的代码（缓存回放、重试）复用已编译的code object
+            exec(code_artifact_cache.get(code).code_object, environment)
+        except ResourceLimitError:
+            raise
         except Exception as e:
-            raise SyntaxError("Code execution failed") from e
-        return self._environment
+            raise CodeExecutionError(f"Code execution failed: {type(e).__name__}: {e}") from e
+        return environment
 
     def execute_and_return_result(self, code: str) -> Any:
         """
         Executes the return updated environment
         """
-        self.execute(code)
+        self._chart_capture.begin()
+        try:
+            environment = self.execute(code)
 
-        # Get the result
-        if "result" not in self._environment:
-            raise ValueError(
-                "No result was returned from the code execution. Please return the result in dictionary format, for example: result = {'type': ..., 'value': ...}"
-            )
+            # Get the result
+            if "result" not in environment:
+                raise ValueError(
+                    "No result was returned from the code execution. Please return the result in dictionary format, for example: result = {'type': ..., 'value': ...}"
+                )
 
-        return self._environment.get("result", None)
+            result = self._chart_capture.finalize(environment.get("result", None))
+            self._limits.check_result(result)
+            return result
+        finally:
+            self._chart_capture.close_figures()
 
     @property
     def environment(self) -> dict:
+        if self._environment is None:
+            self._environment = {**self._base_environment, **self._overlay}
         return self._environment
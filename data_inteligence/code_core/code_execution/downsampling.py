@@ -0,0 +1,273 @@
+"""
+绘图前对过大的序列做保持形状的降采样。
+
+生成代码经常把 `execute_sql_query` 取回的几十万行数据直接交给matplotlib，渲染时间远超查询本身。
+代码清洗阶段把 `X.plot(...)` / `X.scatter(...)` / `X.hist(...)` 改写为经过 `_plot_guard` 的调用，
+点数超过上限时折线使用LTTB（Largest-Triangle-Three-Buckets）选点，散点按网格分箱取代表点，
+直方图先在numpy中分箱再绘制，画出的图与原图视觉上一致。
+"""
+import math
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+PLOT_GUARD_NAME = "_plot_guard"
+DEFAULT_MAX_POINTS = 5000
+
+DOWNSAMPLE_KINDS = ("line", "scatter")
+
+
+def _positions(values: Any) -> np.ndarray:
+    """横轴转换为数值，日期按时间戳，无法转换的（类别）按位置"""
+    kind = getattr(values, "dtype", np.asarray(values).dtype).kind
+    if kind in "mM":
+        # 带时区的日期按UTC转换
+        unit = "datetime64[ns]" if kind == "M" else "timedelta64[ns]"
+        values = values.to_numpy(dtype=unit) if isinstance(values, (pd.Series, pd.Index)) else np.asarray(values, dtype=unit)
+        return values.view(np.int64).astype(float)
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        return np.arange(len(values), dtype=float)
+
+
+def lttb_indices(x: Any, y: Any, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets降采样，返回保留点的下标。
+
+    首尾两点总是保留，中间的点均分为 max_points-2 个桶，每个桶保留与前一个保留点、下一个桶均值
+    构成的三角形面积最大的点，峰值和拐点因此得以保留。
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = _positions(x)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # 各桶补齐为等宽矩阵，补位重复桶内最后一个点，argmax取第一个最大值不受影响
+    width = int((ends - starts).max())
+    offsets = np.minimum(starts[:, None] + np.arange(width), ends[:, None] - 1)
+    bucket_x, bucket_y = x[offsets], y[offsets]
+    finite = np.isfinite(bucket_x) & np.isfinite(bucket_y)
+
+    # 下一个桶的均值，最后一个桶以终点代替
+    members = finite & (starts[:, None] + np.arange(width) < ends[:, None])
+    counts = members.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.where(members, bucket_x, 0).sum(axis=1) / counts
+        mean_y = np.where(members, bucket_y, 0).sum(axis=1) / counts
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    # 非有限值的点不参与选择
+    bucket_x = np.where(finite, bucket_x, 0.0)
+    bucket_y = np.where(finite, bucket_y, 0.0)
+    penalty = np.where(finite, 0.0, -np.inf)
+
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    anchor_x, anchor_y = x[0], y[0]
+    for bucket in range(max_points - 2):
+        # 以已选点和下一个桶均值为底的三角形面积（省略常数因子1/2），展开为bucket_x、bucket_y的线性式
+        slope_y = anchor_x - next_x[bucket]
+        slope_x = next_y[bucket] - anchor_y
+        constant = -slope_y * anchor_y - anchor_x * slope_x
+        area = np.abs(slope_y * bucket_y[bucket] + slope_x * bucket_x[bucket] + constant)
+        position = int(np.argmax(area + penalty[bucket]))
+        indices[bucket + 1] = offsets[bucket, position]
+        if finite[bucket, position]:
+            anchor_x, anchor_y = bucket_x[bucket, position], bucket_y[bucket, position]
+    return indices
+
+
+def bin_indices(x: Any, y: Any, max_points: int) -> np.ndarray:
+    """散点按二维网格分箱，每个有点的格子保留第一个点，返回保留点的下标（按原顺序）"""
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+
+    grid = max(int(math.sqrt(max_points)), 1)
+    codes = np.zeros(n, dtype=np.int64)
+    for values in (_positions(x), _positions(y)):
+        low, high = np.nanmin(values), np.nanmax(values)
+        scale = (high - low) or 1.0
+        cells = np.nan_to_num((values - low) / scale * (grid - 1), nan=0.0).astype(np.int64)
+        codes = codes * grid + cells
+    _, first = np.unique(codes, return_index=True)
+    return np.sort(first)
+
+
+def _columns(y: Union[str, Sequence[str], None], df: pd.DataFrame, x: Optional[str]) -> List[str]:
+    if y is None:
+        return [column for column in df.select_dtypes("number").columns if column != x]
+    return [y] if isinstance(y, str) else list(y)
+
+
+def downsample(
+    data: Union[pd.DataFrame, pd.Series],
+    max_points: int = DEFAULT_MAX_POINTS,
+    x: Optional[str] = None,
+    y: Union[str, Sequence[str], None] = None,
+    kind: str = "line",
+) -> Union[pd.DataFrame, pd.Series]:
+    """Reduces a large DataFrame or Series to at most max_points rows while preserving its visual shape, use it before plotting more than a few thousand points.
+
+    Args:
+        data: The data to plot
+        max_points: The maximum number of points to keep
+        x: The column used as the x axis, defaults to the index
+        y: The column(s) plotted, defaults to all numeric columns
+        kind: "line" keeps peaks and troughs (LTTB), "scatter" keeps one point per grid cell
+    """
+    if kind not in DOWNSAMPLE_KINDS:
+        raise ValueError(f"downsample kind must be one of {DOWNSAMPLE_KINDS}, got {kind!r}")
+    if len(data) <= max_points:
+        return data
+
+    if isinstance(data, pd.Series):
+        if kind == "line":
+            return data.iloc[lttb_indices(data.index, data.to_numpy(), max_points)]
+        return data.iloc[bin_indices(data.index, data.to_numpy(), max_points)]
+
+    x_values = data.index if x is None else data[x]
+    columns = _columns(y, data, x)
+    if not columns:
+        raise ValueError("downsample needs at least one numeric column to plot")
+
+    if kind == "scatter":
+        if len(columns) != 1:
+            raise ValueError("downsample(kind='scatter') needs a single y column")
+        return data.iloc[bin_indices(x_values, data[columns[0]].to_numpy(), max_points)]
+
+    # 多条折线平分点数，保留各自的特征点
+    budget = max(max_points // len(columns), 3)
+    indices = np.unique(
+        np.concatenate(
+            [lttb_indices(x_values, data[column].to_numpy(), budget) for column in columns]
+        )
+    )
+    return data.iloc[indices]
+
+
+def _is_array(value: Any) -> bool:
+    return isinstance(value, (np.ndarray, pd.Series, pd.Index, list, tuple)) and np.ndim(value) == 1
+
+
+def _take(value: Any, indices: np.ndarray) -> Any:
+    if isinstance(value, pd.Series):
+        return value.iloc[indices]
+    return np.asarray(value)[indices]
+
+
+def _is_numeric(value: Any) -> bool:
+    return np.asarray(value).dtype.kind in "biufmM"
+
+
+class PlotGuard:
+    """
+    生成代码的绘图调用入口，点数超过上限时先降采样再调用原方法；无法识别的调用原样转发。
+
+    Args:
+        max_points (int): 单条序列绘制的最大点数
+    """
+
+    def __init__(self, max_points: int = DEFAULT_MAX_POINTS):
+        self.max_points = max_points
+
+    def plot(self, target: Any, *args, **kwargs) -> Any:
+        """`plt.plot` / `Axes.plot` / `DataFrame.plot` / `Series.plot`"""
+        if isinstance(target, (pd.DataFrame, pd.Series)):
+            if isinstance(target, pd.DataFrame):
+                x, y, kind = (list(args) + [None, None, None])[:3]
+            else:
+                x, y, kind = None, None, args[0] if args else None
+            x = kwargs.get("x", x)
+            y = kwargs.get("y", y)
+            kind = kwargs.get("kind", kind) or "line"
+            return self._downsample_frame(target, kind, x, y).plot(*args, **kwargs)
+        return target.plot(*self._line_args(args), **kwargs)
+
+    def plot_kind(self, target: Any, kind: str, *args, **kwargs) -> Any:
+        """`df.plot.line(...)` / `df.plot.scatter(...)` 等绘图访问器调用"""
+        if isinstance(target, (pd.DataFrame, pd.Series)):
+            if isinstance(target, pd.DataFrame):
+                x, y = (list(args) + [None, None])[:2]
+                target = self._downsample_frame(target, kind, kwargs.get("x", x), kwargs.get("y", y))
+            else:
+                target = self._downsample_frame(target, kind, None, None)
+        return getattr(target.plot, kind)(*args, **kwargs)
+
+    def scatter(self, target: Any, *args, **kwargs) -> Any:
+        """`plt.scatter` / `Axes.scatter`，颜色、大小数组随点一起筛选"""
+        args = list(args)
+        x = args[0] if args else kwargs.get("x")
+        y = args[1] if len(args) > 1 else kwargs.get("y")
+        if not self._oversized(x, y) or isinstance(target, (pd.DataFrame, pd.Series)):
+            return target.scatter(*args, **kwargs)
+
+        indices = bin_indices(x, y, self.max_points)
+        n = len(y)
+        for position in range(min(len(args), 4)):
+            if _is_array(args[position]) and len(args[position]) == n:
+                args[position] = _take(args[position], indices)
+        for key in ("x", "y", "s", "c"):
+            if _is_array(kwargs.get(key)) and len(kwargs[key]) == n:
+                kwargs[key] = _take(kwargs[key], indices)
+        return target.scatter(*args, **kwargs)
+
+    def hist(self, target: Any, *args, **kwargs) -> Any:
+        """`plt.hist` / `Axes.hist`，在numpy中分箱后按权重绘制，柱子与直接绘制完全相同"""
+        values = args[0] if args else kwargs.get("x")
+        if (
+            isinstance(target, (pd.DataFrame, pd.Series))
+            or len(args) > 2
+            or kwargs.get("weights") is not None
+            or not _is_array(values)
+            or len(values) <= self.max_points
+            or not _is_numeric(values)
+        ):
+            return target.hist(*args, **kwargs)
+
+        import matplotlib
+
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        kwargs.pop("x", None)
+        bins = args[1] if len(args) > 1 else kwargs.pop("bins", None)
+        if bins is None:
+            bins = matplotlib.rcParams["hist.bins"]
+        counts, edges = np.histogram(values, bins=bins, range=kwargs.pop("range", None))
+        return target.hist(edges[:-1], bins=edges, weights=counts, **kwargs)
+
+    def _oversized(self, *values: Any) -> bool:
+        return all(_is_array(value) and _is_numeric(value) for value in values) and all(
+            len(value) > self.max_points for value in values
+        )
+
+    def _downsample_frame(self, data, kind: Optional[str], x: Any, y: Any):
+        if kind not in DOWNSAMPLE_KINDS or len(data) <= self.max_points:
+            return data
+        try:
+            return downsample(data, max_points=self.max_points, x=x, y=y, kind=kind)
+        except (KeyError, TypeError, ValueError):
+            return data
+
+    def _line_args(self, args: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        """只处理 plot(y) / plot(x, y) 及带格式字符串的形式，多组数据原样传递"""
+        fmt = args[-1:] if args and isinstance(args[-1], str) else ()
+        data = args[: len(args) - len(fmt)]
+        if len(data) == 1 and self._oversized(data[0]):
+            y = data[0]
+            if isinstance(y, pd.Series):
+                # matplotlib以Series的索引作为横轴
+                return (y.iloc[lttb_indices(y.index, y.to_numpy(), self.max_points)], *fmt)
+            indices = lttb_indices(np.arange(len(y)), y, self.max_points)
+            return (indices, _take(y, indices), *fmt)
+        if len(data) == 2 and _is_array(data[0]) and len(data[0]) == len(data[1]) and self._oversized(data[1]):
+            indices = lttb_indices(data[0], data[1], self.max_points)
+            return (_take(data[0], indices), _take(data[1], indices), *fmt)
+        return args
@@ -4,10 +4,16 @@ Source: Taken from pandas/compat/_optional.py
 """
 
 import importlib
+import threading
 import types
+from types import MappingProxyType
+from typing import Mapping, Optional
 
 INSTALL_MAPPING = {}
 
+_base_environment: Optional[Mapping] = None
+_base_environment_lock = threading.Lock()
+
 
 def get_version(module: types.ModuleType) -> str:
     """Get the version of a module."""
@@ -19,19 +25,36 @@ def get_version(module: types.ModuleType) -> str:
     return version
 
 
+def get_base_environment() -> Mapping:
+    """
+    进程内共享的只读基础环境，依赖只在第一次调用时导入。
+
+    Returns (Mapping): A read-only mapping of the libraries available to the code
+    """
+    global _base_environment
+    if _base_environment is None:
+        with _base_environment_lock:
+            if _base_environment is None:
+                from data_inteligence.code_core.code_execution.downsampling import downsample
+
+                _base_environment = MappingProxyType(
+                    {
+                        "pd": import_dependency("pandas"),
+                        "plt": import_dependency("matplotlib.pyplot"),
+                        "np": import_dependency("numpy"),
+                        "downsample": downsample,
+                    }
+                )
+    return _base_environment
+
+
 def get_environment() -> dict:
     """
     Returns the environment for the code to be executed.
 
     Returns (dict): A dictionary of environment variables
     """
-    env = {
-        "pd": import_dependency("pandas"),
-        "plt": import_dependency("matplotlib.pyplot"),
-        "np": import_dependency("numpy"),
-    }
-
-    return env
+    return dict(get_base_environment())
 
 
 def import_dependency(
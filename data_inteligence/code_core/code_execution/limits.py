@@ -0,0 +1,137 @@
+"""
+生成代码执行的资源限制。
+
+结果的行数和大小在任何执行方式下都会检查；墙钟时间、CPU时间和内存只能在沙箱worker进程中
+限制（CPU时间和内存通过rlimit设置），在API进程内执行时不生效。超出限制时抛出带有修正建议的
+ResourceLimitError子类，错误信息会进入纠错提示。
+"""
+import math
+import os
+import signal
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+import pandas as pd
+
+from data_inteligence.exceptions import ExecutionTimeoutError, MemoryLimitError, ResultTooLargeError
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+EXECUTION_LIMITS_NAME = "_execution_limits"
+
+
+@dataclass(frozen=True)
+class ExecutionLimits:
+    """
+    Attributes:
+        wall_time (float, optional): 单次执行的最长时间（秒）
+        cpu_time (float, optional): 单次执行可使用的CPU时间（秒）
+        memory_mb (int, optional): 单次执行可新增的内存（MB）
+        max_result_rows (int, optional): 结果DataFrame的最大行数
+        max_result_bytes (int, optional): 结果的最大字节数
+    """
+
+    wall_time: Optional[float] = None
+    cpu_time: Optional[float] = None
+    memory_mb: Optional[int] = None
+    max_result_rows: Optional[int] = None
+    max_result_bytes: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, config: Any) -> "ExecutionLimits":
+        return cls(
+            wall_time=getattr(config, "max_execution_time", None),
+            cpu_time=getattr(config, "max_cpu_time", None),
+            memory_mb=getattr(config, "max_memory_mb", None),
+            max_result_rows=getattr(config, "max_result_rows", None),
+            max_result_bytes=getattr(config, "max_result_bytes", None),
+        )
+
+    def check_result(self, result: Any) -> None:
+        """
+        检查代码返回的结果是否超出行数和大小限制。
+
+        Raises:
+            ResultTooLargeError: 结果超出限制
+        """
+        value = result.get("value") if isinstance(result, dict) else result
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            if self.max_result_rows is not None and len(value) > self.max_result_rows:
+                raise ResultTooLargeError(
+                    f"The result has {len(value)} rows, which exceeds the limit of {self.max_result_rows} rows. "
+                    "Aggregate or filter the data in SQL, or return only the top rows with LIMIT."
+                )
+            size = int(value.memory_usage(deep=True).sum()) if self.max_result_bytes is not None else 0
+        elif isinstance(value, (str, bytes)):
+            size = len(value)
+        else:
+            return
+
+        if self.max_result_bytes is not None and size > self.max_result_bytes:
+            raise ResultTooLargeError(
+                f"The result is {size / 1024 ** 2:.1f} MB, which exceeds the limit of "
+                f"{self.max_result_bytes / 1024 ** 2:.1f} MB. Return fewer rows or columns."
+            )
+
+    @contextmanager
+    def enforce(self) -> Iterator[None]:
+        """
+        在当前进程中设置本次执行的CPU时间和内存上限，退出时恢复。只在沙箱worker中使用。
+
+        CPU时间超出时内核发送SIGXCPU，处理函数在执行代码的主线程中抛出ExecutionTimeoutError；
+        内存超出时分配失败抛出MemoryError，转换为MemoryLimitError。Linux不限制RLIMIT_RSS，
+        内存上限通过虚拟地址空间（RLIMIT_AS）在执行开始时的用量上增加 memory_mb 实现。
+        """
+        if resource is None or (self.cpu_time is None and self.memory_mb is None):
+            yield
+            return
+
+        previous_cpu = resource.getrlimit(resource.RLIMIT_CPU)
+        previous_memory = resource.getrlimit(resource.RLIMIT_AS)
+        previous_handler = signal.getsignal(signal.SIGXCPU)
+        if self.cpu_time is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = math.ceil(usage.ru_utime + usage.ru_stime + self.cpu_time)
+            signal.signal(signal.SIGXCPU, self._cpu_time_exceeded)
+            resource.setrlimit(resource.RLIMIT_CPU, (min(soft, _hard(previous_cpu)), previous_cpu[1]))
+        if self.memory_mb is not None:
+            soft = _address_space() + self.memory_mb * 1024 ** 2
+            resource.setrlimit(resource.RLIMIT_AS, (min(soft, _hard(previous_memory)), previous_memory[1]))
+
+        try:
+            yield
+        except MemoryError as e:
+            if self.memory_mb is None:
+                raise
+            raise MemoryLimitError(
+                f"Code execution exceeded the memory limit of {self.memory_mb} MB. "
+                "Aggregate the data in SQL instead of loading all rows into pandas, "
+                "and avoid large merges or cross joins."
+            ) from e
+        finally:
+            resource.setrlimit(resource.RLIMIT_CPU, previous_cpu)
+            resource.setrlimit(resource.RLIMIT_AS, previous_memory)
+            signal.signal(signal.SIGXCPU, previous_handler)
+
+    def _cpu_time_exceeded(self, signum, frame):
+        raise ExecutionTimeoutError(
+            f"Code execution exceeded the CPU time limit of {self.cpu_time}s. "
+            "Aggregate the data in SQL and avoid row-by-row loops over large DataFrames."
+        )
+
+
+def _hard(limit) -> float:
+    return math.inf if limit[1] == resource.RLIM_INFINITY else limit[1]
+
+
+def _address_space() -> int:
+    """当前进程的虚拟内存大小（字节）"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
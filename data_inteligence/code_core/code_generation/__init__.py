@@ -1,9 +1,11 @@
 from .base import CodeGenerator
-from .code_cleaning import CodeCleaner
+from .code_cleaning import CodeAnalysis, CodeCleaner, SQLLiteral
 from .code_validation import CodeRequirementValidator
 
 __all__ = [
+    "CodeAnalysis",
     "CodeCleaner",
     "CodeGenerator",
     "CodeRequirementValidator",
+    "SQLLiteral",
 ]
@@ -1,7 +1,9 @@
 import traceback
 import re
 import ast
+from typing import Optional, Tuple
 from agent_core.agent.dataframe_state import AgentState
+from agent_core.agent.trace import trace_stage
 from agent_core.prompts.base import BasePrompt
 
 from .code_cleaning import CodeCleaner
@@ -43,11 +45,14 @@ class CodeGenerator:
         Returns (bool): True if Python Code otherwise False
 
         """
+        return self._parse_python_code(string) is not None
+
+    def _parse_python_code(self, string) -> Optional[ast.Module]:
+        """Parse the code once, the AST is reused by validation and cleaning."""
         try:
-            ast.parse(string)
-            return True
+            return ast.parse(string)
         except SyntaxError:
-            return False
+            return None
 
     def _extract_code(self, response: str, separator: str = "```") -> str:
         """
@@ -63,6 +68,11 @@ class CodeGenerator:
         Returns:
             str: Extracted code from the response
         """
+        return self._extract_code_and_tree(response, separator)[0]
+
+    def _extract_code_and_tree(
+        self, response: str, separator: str = "```"
+    ) -> Tuple[str, ast.Module]:
         code = response
 
         # If separator is in the response then we want the code in between only
@@ -71,10 +81,11 @@ class CodeGenerator:
         code = self._polish_code(code)
 
         # Even if the separator is not in the response, the output might still be valid python code
-        if not self._is_python_code(code):
+        tree = self._parse_python_code(code)
+        if tree is None:
             raise NoCodeFoundError("No code found in the response")
 
-        return code
+        return code, tree
 
     async def generate_code(self, prompt: BasePrompt) -> str:
         """
@@ -94,13 +105,17 @@ class CodeGenerator:
 
             # Generate the code
             # , memory
-            code = await self._context.config.llm.call(prompt) 
-            code = self._extract_code(code)
+            with trace_stage(self._context.trace, "llm") as event:
+                code = await self._context.config.llm.call(prompt)
+                event.update(prompt=str(prompt), completion=code)
+            code, tree = self._extract_code_and_tree(code)
             self._context.last_code_generated = code
             self._context.logger.info(f"Code Generated:\n{code}")
             
             # Validate and clean the code
-            cleaned_code = self.validate_and_clean_code(code)
+            with trace_stage(self._context.trace, "clean") as event:
+                cleaned_code = self.validate_and_clean_code(code, tree)
+                event["code"] = cleaned_code
             # Update with the final cleaned code (for subsequent processing and multi-turn conversations)
             self._context.last_code_generated = cleaned_code
 
@@ -115,13 +130,16 @@ class CodeGenerator:
 
             raise e
 
-    def validate_and_clean_code(self, code: str) -> str:
+    def validate_and_clean_code(self, code: str, tree: Optional[ast.Module] = None) -> str:
+        # 代码只解析一次，清洗和校验共用同一次分析的结果
+        self._context.logger.info("Cleaning the generated code...")
+        analysis = self._code_cleaner.analyze(code, tree)
+
         # Validate code requirements
         self._context.logger.info("Validating code requirements...")
-        if not self._code_validator.validate(code):
+        if not self._code_validator.validate(code, analysis.function_calls):
             raise ValueError("Code validation failed due to unmet requirements.")
         self._context.logger.info("Code validation successful.")
 
-        # Clean the code
-        self._context.logger.info("Cleaning the generated code...")
-        return self._code_cleaner.clean_code(code)
+        self._context.last_code_analysis = analysis
+        return analysis.code
@@ -1,12 +1,152 @@
 import ast
 import re
 import uuid
-import astor
+from dataclasses import dataclass, field
+from typing import FrozenSet, List, Optional
 
 from agent_core.agent.dataframe_state import AgentState
+from data_inteligence.code_core.code_execution.charts import CHART_CAPTURE_NAME
+from data_inteligence.code_core.code_execution.code_cache import SQL_KEYWORDS, code_artifact_cache
+from data_inteligence.code_core.code_execution.downsampling import PLOT_GUARD_NAME
 from data_inteligence.constants import DEFAULT_CHART_DIRECTORY
 from data_inteligence.query_builders.sql_parser import SQLParser
 from ...exceptions import MaliciousQueryError
+from .sql_pushdown import SQLPushdown
+
+
+@dataclass(frozen=True)
+class SQLLiteral:
+    """生成代码中的SQL字符串，lineno为其在LLM生成的原始代码中的行号"""
+
+    query: str
+    lineno: int
+
+
+@dataclass
+class CodeAnalysis:
+    """
+    生成代码一次解析得到的分析结果。
+
+    Attributes:
+        code (str): 清洗后的代码
+        function_calls (frozenset): 代码调用的函数名，属性调用记为 "obj.attr"
+        sql_queries (list): 清洗后的SQL字符串及其位置
+        chart_paths (list): 代码中图表输出文件被替换成的路径
+    """
+
+    code: str
+    function_calls: FrozenSet[str] = frozenset()
+    sql_queries: List[SQLLiteral] = field(default_factory=list)
+    chart_paths: List[str] = field(default_factory=list)
+
+
+PLOT_METHODS = ("plot", "scatter", "hist")
+
+
+class _CodeTransformer(ast.NodeTransformer):
+    """
+    单次遍历：收集函数调用和SQL字符串，替换图表文件名，savefig改为内存捕获，绘图调用经过降采样，
+    移除plt.show()
+    """
+
+    def __init__(self, chart_path: str):
+        self.chart_path = chart_path
+        self.function_calls = set()
+        self.sql_queries: List[SQLLiteral] = []
+        self.chart_paths: List[str] = []
+
+    @staticmethod
+    def _is_sql(node: ast.AST) -> bool:
+        return (
+            isinstance(node, ast.Constant)
+            and isinstance(node.value, str)
+            and any(keyword in node.value.upper() for keyword in SQL_KEYWORDS)
+        )
+
+    @staticmethod
+    def _is_plt_show(node: ast.AST) -> bool:
+        return (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id == "plt"
+            and node.func.attr == "show"
+        )
+
+    def _chart_constant(self, node: ast.AST) -> ast.Constant:
+        if self.chart_path not in self.chart_paths:
+            self.chart_paths.append(self.chart_path)
+        return ast.copy_location(ast.Constant(value=self.chart_path), node)
+
+    def visit_Expr(self, node: ast.Expr):
+        if self._is_plt_show(node.value):
+            return None
+        return self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign):
+        self.generic_visit(node)
+        if self._is_sql(node.value):
+            self.sql_queries.append(SQLLiteral(node.value.value, node.value.lineno))
+        return node
+
+    def visit_Call(self, node: ast.Call):
+        if isinstance(node.func, ast.Name):
+            self.function_calls.add(node.func.id)
+        elif isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+            self.function_calls.add(f"{node.func.value.id}.{node.func.attr}")
+        self.generic_visit(node)
+        self.sql_queries.extend(
+            SQLLiteral(arg.value, arg.lineno) for arg in node.args if self._is_sql(arg)
+        )
+        if isinstance(node.func, ast.Attribute) and node.func.attr == "savefig":
+            # plt.savefig(path) / fig.savefig(path) 改为渲染到内存
+            capture = ast.Attribute(
+                value=ast.Name(id=CHART_CAPTURE_NAME, ctx=ast.Load()), attr="savefig", ctx=ast.Load()
+            )
+            return ast.copy_location(
+                ast.Call(func=capture, args=[node.func.value, *node.args], keywords=node.keywords),
+                node,
+            )
+        if (
+            isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Attribute)
+            and node.func.value.attr == "plot"
+        ):
+            # df.plot.line(...) / df.plot.scatter(...)
+            kind = ast.Constant(value=node.func.attr)
+            return self._guarded_call("plot_kind", [node.func.value.value, kind], node)
+        if isinstance(node.func, ast.Attribute) and node.func.attr in PLOT_METHODS:
+            # plt.plot(x, y) / ax.scatter(x, y) / df.plot(...) 点数过多时先降采样
+            return self._guarded_call(node.func.attr, [node.func.value], node)
+        return node
+
+    @staticmethod
+    def _guarded_call(method: str, args: List[ast.expr], node: ast.Call) -> ast.Call:
+        guard = ast.Attribute(
+            value=ast.Name(id=PLOT_GUARD_NAME, ctx=ast.Load()), attr=method, ctx=ast.Load()
+        )
+        return ast.copy_location(
+            ast.Call(func=guard, args=[*args, *node.args], keywords=node.keywords), node
+        )
+
+    def visit_Constant(self, node: ast.Constant):
+        if isinstance(node.value, str) and node.value.endswith(".png"):
+            return self._chart_constant(node)
+        return node
+
+    def visit_JoinedStr(self, node: ast.JoinedStr):
+        # f"chart_{i}.png" 整体替换为图表路径
+        last = node.values[-1] if node.values else None
+        if isinstance(last, ast.Constant) and isinstance(last.value, str) and last.value.endswith(".png"):
+            return self._chart_constant(node)
+        return self.generic_visit(node)
+
+    def generic_visit(self, node: ast.AST):
+        node = super().generic_visit(node)
+        # 移除plt.show()后语句块可能为空
+        if isinstance(getattr(node, "body", None), list) and not node.body:
+            node.body = [ast.Pass()]
+        return node
 
 
 class CodeCleaner:
@@ -138,17 +278,33 @@ class CodeCleaner:
             code (str): The code to clean.
 
         Returns:
-            tuple: Cleaned code as a string and a list of additional dependencies.
+            str: Cleaned code as a string.
         """
-        code = self._replace_output_filenames_with_temp_chart(code)
+        return self.analyze(code).code
 
-        # If plt.show is in the code, remove that line
-        code = re.sub(r"plt.show\(\)", "", code)
+    def analyze(self, code: str, tree: Optional[ast.Module] = None) -> CodeAnalysis:
+        """
+        解析一次生成的代码，完成清洗并收集后续步骤需要的分析结果。
+
+        清洗后的代码直接登记到编译缓存，执行时不再重复解析和编译。
+
+        Args:
+            code (str): LLM生成的代码
+            tree (ast.Module, optional): 已解析的代码AST，会被原地修改
 
-        tree = ast.parse(code)
+        Returns:
+            CodeAnalysis: 清洗后的代码及分析结果
+        """
+        tree = tree if tree is not None else ast.parse(code)
         new_body = []
 
-        for node in tree.body:
+        # 取数后在pandas中的过滤、聚合、排序先下推到SQL，再统一校验表名
+        tables = {
+            df.schema.name: {column.name: column.type for column in df.schema.columns or ()}
+            for df in self.context.dfs
+        }
+        body = SQLPushdown(self.context.dfs[0].get_dialect(), tables).rewrite(tree.body)
+        for node in body:
             if self._check_direct_sql_func_def_exists(node):
                 continue
 
@@ -160,18 +316,26 @@ class CodeCleaner:
 
             new_body.append(node)
 
-        new_tree = ast.Module(body=new_body)
-        return astor.to_source(new_tree, pretty_source=lambda x: "".join(x)).strip()
+        tree.body = new_body
+        transformer = _CodeTransformer(self._get_temp_chart_path())
+        tree = transformer.visit(tree)
+        cleaned_code = ast.unparse(tree).strip()
 
-    def _replace_output_filenames_with_temp_chart(self, code: str) -> str:
+        code_artifact_cache.register(
+            cleaned_code,
+            sql_queries=tuple(sql.query for sql in transformer.sql_queries),
+            function_calls=frozenset(transformer.function_calls),
+        )
+        return CodeAnalysis(
+            code=cleaned_code,
+            function_calls=frozenset(transformer.function_calls),
+            sql_queries=transformer.sql_queries,
+            chart_paths=transformer.chart_paths,
+        )
+
+    def _get_temp_chart_path(self) -> str:
         """
-        Replace output file names with "temp_chart.png".
+        Output file names are replaced with "temp_chart_<uuid>.png".
         """
         _id = uuid.uuid4()
-        chart_path = DEFAULT_CHART_DIRECTORY / f"temp_chart_{_id}.png"
-        chart_path = str(chart_path).replace("\\", "\\\\")
-        return re.sub(
-            r"""(['"])([^'"]*\.png)\1""",
-            lambda m: f"{m.group(1)}{chart_path}{m.group(1)}",
-            code,
-        )
+        return str(DEFAULT_CHART_DIRECTORY / f"temp_chart_{_id}.png")
@@ -1,4 +1,6 @@
 import ast
+from typing import Iterable, Optional
+
 from agent_core.agent.dataframe_state import AgentState
 
 
@@ -36,26 +38,27 @@ class CodeRequirementValidator:
         """
         self.context = context
 
-    def validate(self, code: str) -> bool:
+    def validate(self, code: str, function_calls: Optional[Iterable[str]] = None) -> bool:
         """
         Validates whether the code meets the requirements specified by the pipeline context.
 
         Args:
             code (str): The code to validate.
+            function_calls (Iterable[str], optional): Function calls already collected by
+                `CodeCleaner.analyze`, the code is not parsed again when given.
         Returns:
             bool: True if the code meets the requirements, False otherwise.
         Raises:
             SyntaxError: If `execute_sql_query` is not used in the code.
         """
-        # Parse the code into an AST
-        tree = ast.parse(code)
-
-        # Use the visitor to collect function calls
-        func_call_visitor = self._FunctionCallVisitor()
-        func_call_visitor.visit(tree)
+        if function_calls is None:
+            # Parse the code into an AST and use the visitor to collect function calls
+            func_call_visitor = self._FunctionCallVisitor()
+            func_call_visitor.visit(ast.parse(code))
+            function_calls = func_call_visitor.function_calls
 
         # Validate requirements
-        if "execute_sql_query" not in func_call_visitor.function_calls:
+        if "execute_sql_query" not in function_calls:
             raise SyntaxError(
                 "The code must execute SQL queries using the `execute_sql_query` function, which is already defined!"
             )
@@ -0,0 +1,781 @@
+"""
+把生成代码中对 execute_sql_query 结果的pandas后处理下推到SQL。
+
+生成代码经常先 `SELECT *` 取回明细，再在pandas中过滤、分组、排序、取前几行。重写器识别这类
+“取数后归约”的写法，把过滤、列选择、分组聚合、排序和行数限制折叠进SQL，数据源只返回最终结果。
+只处理能确定与pandas语义一致的写法（包括空值的处理、分组键的排序和求和结果的类型），其余情况
+保留原代码。
+
+SQL结果总是默认的RangeIndex，而pandas的过滤、排序保留原来的行标签。只有结果仍为RangeIndex
+（聚合后reset_index、链以reset_index(drop=True)结尾），或之后只作为dataframe结果返回、
+用于len()等不读取行标签的场合时才折叠这类写法。
+"""
+import ast
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+SQL_FUNCTION = "execute_sql_query"
+
+_COMPARISONS = {
+    ast.Eq: exp.EQ,
+    ast.NotEq: exp.NEQ,
+    ast.Lt: exp.LT,
+    ast.LtE: exp.LTE,
+    ast.Gt: exp.GT,
+    ast.GtE: exp.GTE,
+}
+_FLIPPED = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE}
+
+_AGGREGATES = ("sum", "mean", "min", "max", "count", "nunique")
+
+# schema列类型对应的求和结果类型：SUM(BIGINT)在DuckDB中为HUGEINT（pandas中为float64），
+# 在postgres/mysql中为NUMERIC/DECIMAL，需要转换回与pandas求和一致的类型
+_SUM_TYPES = {"integer": "BIGINT", "float": "DOUBLE"}
+_AGGREGATE_TYPES = {"mean": "float", "count": "integer", "nunique": "integer", "size": "integer"}
+
+
+class _Unsupported(Exception):
+    """无法确定等价的SQL，保留原代码"""
+
+
+def _constant(node: ast.AST, types: tuple = (str, int, float, bool)):
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _constant(node.operand, (int, float))
+        return -value
+    if isinstance(node, ast.Constant) and isinstance(node.value, types):
+        return node.value
+    raise _Unsupported
+
+
+def _names(node: ast.AST) -> List[str]:
+    """"a" 或 ["a", "b"]"""
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_constant(item, (str,)) for item in node.elts]
+    return [_constant(node, (str,))]
+
+
+def _keywords(node: ast.Call, allowed: Sequence[str]) -> Dict[str, ast.AST]:
+    keywords = {keyword.arg: keyword.value for keyword in node.keywords}
+    if None in keywords or set(keywords) - set(allowed):
+        raise _Unsupported
+    return keywords
+
+
+def _column(name: str) -> exp.Column:
+    return exp.column(name, quoted=True)
+
+
+class _Query:
+    """
+    折叠过程中的查询。
+
+    能在同一层查询上完成的操作直接修改当前SQL，否则把当前SQL作为子查询再包一层。
+
+    Attributes:
+        select: 当前的SQL
+        columns: 已知的输出列，原始SQL为 `SELECT *` 时未知
+        types: 已知输出列的schema类型（integer/float等）
+        order: 需要在外层保持的排序，均为输出列
+        opaque_order: 当前SQL带有无法在外层重建的ORDER BY
+        range_index: 对应的pandas结果是否仍为默认的RangeIndex（过滤、排序后保留的是原行标签）
+    """
+
+    def __init__(
+        self,
+        select: exp.Query,
+        columns: Optional[List[str]],
+        aliases: int = 0,
+        types: Optional[Dict[str, str]] = None,
+    ):
+        self.select = select
+        self.columns = columns
+        self.types = types or {}
+        self.order: List[Tuple[str, bool]] = []
+        self.opaque_order = bool(select.args.get("order"))
+        self.range_index = True
+        self._aliases = aliases
+
+    def _is_star_select(self, *allowed: str) -> bool:
+        """`SELECT * FROM 单表`，除allowed外没有其他子句，可以直接在这一层追加条件"""
+        select = self.select
+        return (
+            isinstance(select, exp.Select)
+            and len(select.expressions) == 1
+            and isinstance(select.expressions[0], exp.Star)
+            and not any(
+                select.args.get(clause)
+                for clause in ("joins", "group", "having", "qualify", "limit", "offset", "distinct", "windows")
+                if clause not in allowed
+            )
+        )
+
+    def _wrapped(self) -> exp.Select:
+        # 外层重新排序或分组时，没有LIMIT的内层ORDER BY不再有意义
+        if self.select.args.get("order") and not self.select.args.get("limit"):
+            self.select.set("order", None)
+        self._aliases += 1
+        return exp.select("*").from_(self.select.subquery(f"_t{self._aliases}", copy=False))
+
+    def _ordered(self, select: exp.Select) -> exp.Select:
+        if self.order:
+            select = select.order_by(
+                *(exp.Ordered(this=_column(name), desc=desc, nulls_first=False) for name, desc in self.order),
+                copy=False,
+            )
+        return select
+
+    def check_columns(self, names: Sequence[str]) -> None:
+        if self.columns is not None and not set(names) <= set(self.columns):
+            raise _Unsupported
+
+    def filter(self, condition: exp.Expression) -> None:
+        self.range_index = False
+        if self._is_star_select():
+            self.select = self.select.where(condition, copy=False)
+            return
+        if self.opaque_order:
+            raise _Unsupported
+        self.select = self._ordered(self._wrapped().where(condition, copy=False))
+
+    def project(self, names: List[str]) -> None:
+        self.check_columns(names)
+        # 选择列不改变行，LIMIT和ORDER BY仍在同一层生效
+        if not self._is_star_select("limit", "offset"):
+            if self.opaque_order or any(name not in names for name, _ in self.order):
+                raise _Unsupported
+            self.select = self._ordered(self._wrapped())
+        self.select = self.select.select(*map(_column, names), append=False, copy=False)
+        self.columns = names
+        if any(name not in names for name, _ in self.order):
+            self.order, self.opaque_order = [], True
+
+    def distinct(self) -> None:
+        if self.opaque_order:
+            raise _Unsupported
+        self.range_index = False
+        select = self._wrapped() if self.order or not self._is_star_select() else self.select
+        self.select = self._ordered(select.distinct(copy=False))
+
+    def sort(self, order: List[Tuple[str, bool]]) -> None:
+        self.check_columns([name for name, _ in order])
+        self.order = order
+        self.opaque_order = False
+        self.range_index = False
+        select = self.select if self._is_star_select() else self._wrapped()
+        select.set("order", None)
+        self.select = self._ordered(select)
+
+    def limit(self, count: int) -> None:
+        if count < 0:
+            raise _Unsupported
+        limit = self.select.args.get("limit")
+        if self.select.args.get("offset") or (limit and not isinstance(limit.expression, exp.Literal)):
+            self.select = self._ordered(self._wrapped())
+        elif limit:
+            count = min(count, int(limit.expression.this))
+        self.select = self.select.limit(count, copy=False)
+
+    def aggregate(
+        self,
+        keys: List[str],
+        aggregates: List[Tuple[str, str, Optional[str]]],
+        sort: bool,
+        dropna: bool,
+    ) -> None:
+        """aggregates为 (输出列名, 函数, 聚合列)，size的聚合列为None"""
+        self.check_columns(keys + [column for _, _, column in aggregates if column is not None])
+        selects = [_column(key) for key in keys]
+        types = {key: self.types[key] for key in keys if key in self.types}
+        for name, function, column in aggregates:
+            if function in ("sum", "min", "max") and column in self.types:
+                types[name] = self.types[column]
+            elif function in _AGGREGATE_TYPES:
+                types[name] = _AGGREGATE_TYPES[function]
+
+            if function == "size":
+                value = exp.Count(this=exp.Star())
+            elif function == "sum":
+                # 列类型未知时无法保证结果类型与pandas一致
+                sum_type = _SUM_TYPES.get(self.types.get(column))
+                if sum_type is None:
+                    raise _Unsupported
+                # pandas对全为空值的分组求和得到0
+                value = exp.cast(
+                    exp.func("COALESCE", exp.Sum(this=_column(column)), exp.Literal.number(0)), sum_type
+                )
+            elif function == "mean":
+                value = exp.Avg(this=_column(column))
+            elif function == "min":
+                value = exp.Min(this=_column(column))
+            elif function == "max":
+                value = exp.Max(this=_column(column))
+            elif function == "count":
+                value = exp.Count(this=_column(column))
+            elif function == "nunique":
+                value = exp.Count(this=exp.Distinct(expressions=[_column(column)]))
+            else:
+                raise _Unsupported
+            selects.append(exp.alias_(value, name, quoted=True))
+
+        # 分组后原有的行顺序不再有意义
+        select = self.select if self._is_star_select() else self._wrapped()
+        select.set("order", None)
+        select = select.select(*selects, append=False, copy=False).group_by(*map(_column, keys), copy=False)
+        if dropna:
+            # pandas默认丢弃分组键为空的行
+            for key in keys:
+                select = select.where(exp.Not(this=exp.Is(this=_column(key), expression=exp.Null())), copy=False)
+        self.select = select
+        self.columns = keys + [name for name, _, _ in aggregates]
+        self.types = types
+        self.range_index = True
+        self.opaque_order = False
+        self.order = [(key, False) for key in keys] if sort else []
+        self.select = self._ordered(self.select)
+
+
+class _ChainFolder:
+    """把一个表达式中以SQL查询结果为起点的方法链折叠为一条SQL"""
+
+    def __init__(
+        self,
+        dialect: str,
+        sql_constants: Dict[str, str],
+        variable: Optional[str],
+        sql: Optional[str],
+        tables: Optional[Dict[str, Dict[str, str]]] = None,
+    ):
+        self.dialect = dialect
+        self.tables = tables or {}
+        self.sql_constants = sql_constants
+        self.variable = variable
+        self.sql = sql
+        # 表达式中引用变量的次数，必须全部被折叠
+        self.variable_uses = 0
+
+    def source_sql(self, node: ast.AST) -> Optional[str]:
+        if self.variable is not None and isinstance(node, ast.Name) and node.id == self.variable:
+            self.variable_uses += 1
+            return self.sql
+        return sql_of_call(node, self.sql_constants)
+
+    def fold(self, node: ast.AST) -> _Query:
+        sql = self.source_sql(node)
+        if sql is not None:
+            return self._query(sql)
+
+        if isinstance(node, ast.Subscript):
+            return self._subscript(node)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            return self._method(node, node.func.attr, node.func.value)
+        raise _Unsupported
+
+    def _query(self, sql: str) -> _Query:
+        try:
+            select = sqlglot.parse_one(sql.rstrip().rstrip(";"), read=self.dialect)
+        except SqlglotError:
+            raise _Unsupported
+        if not isinstance(select, exp.Query):
+            raise _Unsupported
+        # 已折叠过的SQL中的子查询别名不再重复使用
+        aliases = max(
+            (int(alias.name[2:]) for alias in select.find_all(exp.TableAlias) if re.fullmatch(r"_t\d+", alias.name)),
+            default=0,
+        )
+        columns = None
+        if isinstance(select, exp.Select) and not select.is_star:
+            columns = select.named_selects
+            if len(set(columns)) != len(columns):
+                raise _Unsupported
+            if "" in columns:
+                columns = None
+        return _Query(select, columns, aliases, self._column_types(select))
+
+    def _column_types(self, select: exp.Query) -> Dict[str, str]:
+        """直接读取单表列（未经计算）的输出列类型，来自数据集schema"""
+        if not isinstance(select, exp.Select) or select.args.get("joins"):
+            return {}
+        source = select.args.get("from_") or select.args.get("from")
+        table = source.this if source is not None else None
+        if not isinstance(table, exp.Table):
+            return {}
+        table_types = self.tables.get(table.name.lower(), {})
+        if select.is_star:
+            return dict(table_types)
+        types = {}
+        for expression in select.expressions:
+            column = expression.this if isinstance(expression, exp.Alias) else expression
+            if isinstance(column, exp.Column) and column.name in table_types:
+                types[expression.alias_or_name] = table_types[column.name]
+        return types
+
+    def _subscript(self, node: ast.Subscript) -> _Query:
+        receiver = node.value
+        if isinstance(receiver, ast.Attribute) and receiver.attr == "loc":
+            # df.loc[条件] / df.loc[条件, 列]
+            selection = node.slice
+            columns = None
+            if isinstance(selection, ast.Tuple) and len(selection.elts) == 2:
+                selection, columns = selection.elts
+            query = self._filtered(receiver.value, selection)
+            if columns is not None:
+                query.project(_names(columns))
+            return query
+
+        if isinstance(node.slice, ast.List):
+            query = self.fold(receiver)
+            query.project(_names(node.slice))
+            return query
+        return self._filtered(receiver, node.slice)
+
+    def _filtered(self, receiver: ast.AST, condition: ast.AST) -> _Query:
+        # 条件中的列引用的是变量本身，只能作用在链的起点上
+        if self.variable is None or not (isinstance(receiver, ast.Name) and receiver.id == self.variable):
+            raise _Unsupported
+        query = self.fold(receiver)
+        query.filter(self._condition(condition, query))
+        return query
+
+    def _method(self, node: ast.Call, method: str, receiver: ast.AST) -> _Query:
+        if method == "reset_index":
+            keywords = _keywords(node, ("drop", "name"))
+            if node.args:
+                raise _Unsupported
+            if self._is_aggregation(receiver):
+                if "drop" in keywords:
+                    raise _Unsupported
+                name = _constant(keywords["name"], (str,)) if "name" in keywords else None
+                return self._aggregate(receiver, as_frame_name=name, reset=True)
+            # 丢弃行标签后与SQL结果一样是默认索引
+            if "name" in keywords or _constant(keywords.get("drop", ast.Constant(False)), (bool,)) is not True:
+                raise _Unsupported
+            query = self.fold(receiver)
+            query.range_index = True
+            return query
+
+        if self._is_aggregation(node):
+            return self._aggregate(node, as_frame_name=None, reset=False)
+
+        if method == "sort_values":
+            keywords = _keywords(node, ("by", "ascending"))
+            if len(node.args) > 1 or ("by" in keywords) == bool(node.args):
+                raise _Unsupported
+            names = _names(node.args[0] if node.args else keywords["by"])
+            ascending = keywords.get("ascending", ast.Constant(True))
+            if isinstance(ascending, (ast.List, ast.Tuple)):
+                flags = [_constant(item, (bool,)) for item in ascending.elts]
+                if len(flags) != len(names):
+                    raise _Unsupported
+            else:
+                flags = [_constant(ascending, (bool,))] * len(names)
+            query = self.fold(receiver)
+            query.sort([(name, not flag) for name, flag in zip(names, flags)])
+            return query
+
+        if method == "head":
+            _keywords(node, ("n",))
+            count = node.args[0] if node.args else (node.keywords[0].value if node.keywords else ast.Constant(5))
+            query = self.fold(receiver)
+            query.limit(_constant(count, (int,)))
+            return query
+
+        if method in ("nlargest", "nsmallest"):
+            _keywords(node, ())
+            if len(node.args) != 2:
+                raise _Unsupported
+            count, column = _constant(node.args[0], (int,)), _constant(node.args[1], (str,))
+            query = self.fold(receiver)
+            # 空值排在最后：n超过非空行数时pandas同样用空值行补足
+            query.sort([(column, method == "nlargest")])
+            query.limit(count)
+            return query
+
+        if method == "drop_duplicates" and not node.args and not node.keywords:
+            query = self.fold(receiver)
+            query.distinct()
+            return query
+
+        raise _Unsupported
+
+    @staticmethod
+    def _groupby(node: ast.AST) -> Optional[ast.Call]:
+        """聚合调用的接收者：df.groupby(...) 或 df.groupby(...)[列]"""
+        if isinstance(node, ast.Subscript):
+            node = node.value
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "groupby":
+            return node
+        return None
+
+    def _is_aggregation(self, node: ast.AST) -> bool:
+        return (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr in (*_AGGREGATES, "agg", "aggregate", "size")
+            and self._groupby(node.func.value) is not None
+        )
+
+    def _aggregate(self, node: ast.Call, as_frame_name: Optional[str], reset: bool) -> _Query:
+        grouped = node.func.value
+        groupby = self._groupby(grouped)
+        keywords = _keywords(groupby, ("by", "as_index", "sort", "dropna"))
+        if len(groupby.args) > 1 or ("by" in keywords) == bool(groupby.args):
+            raise _Unsupported
+        keys = _names(groupby.args[0] if groupby.args else keywords["by"])
+        as_index = _constant(keywords.get("as_index", ast.Constant(True)), (bool,))
+        sort = _constant(keywords.get("sort", ast.Constant(True)), (bool,))
+        dropna = _constant(keywords.get("dropna", ast.Constant(True)), (bool,))
+        # 结果必须是以分组键为列的DataFrame，与SQL结果的形状一致
+        if as_index != reset:
+            raise _Unsupported
+
+        selected = _names(grouped.slice) if isinstance(grouped, ast.Subscript) else None
+        function = node.func.attr
+        if function == "size":
+            _keywords(node, ())
+            if selected is not None or node.args:
+                raise _Unsupported
+            name = as_frame_name or ("size" if not as_index else None)
+            if name is None:
+                raise _Unsupported
+            aggregates = [(name, "size", None)]
+        elif function in _AGGREGATES:
+            _keywords(node, ())
+            if selected is None or node.args:
+                raise _Unsupported
+            aggregates = [(column, function, column) for column in selected]
+        else:
+            aggregates = self._agg_arguments(node, selected)
+
+        if as_frame_name is not None:
+            # reset_index(name=...) 只适用于结果为Series的聚合
+            series = function == "size" or (
+                isinstance(grouped, ast.Subscript) and isinstance(grouped.slice, ast.Constant)
+            )
+            if not series or len(aggregates) != 1:
+                raise _Unsupported
+            aggregates = [(as_frame_name, aggregates[0][1], aggregates[0][2])]
+        if len({name for name, _, _ in aggregates} | set(keys)) != len(aggregates) + len(keys):
+            raise _Unsupported
+
+        query = self.fold(groupby.func.value)
+        query.aggregate(keys, aggregates, sort=sort, dropna=dropna)
+        return query
+
+    @staticmethod
+    def _agg_arguments(node: ast.Call, selected: Optional[List[str]]) -> List[Tuple[str, str, Optional[str]]]:
+        """agg("sum") / agg({"列": "sum"}) / agg(名称=("列", "sum"))"""
+        if node.keywords and not node.args and selected is None:
+            aggregates = []
+            for keyword in node.keywords:
+                if keyword.arg is None or not isinstance(keyword.value, ast.Tuple) or len(keyword.value.elts) != 2:
+                    raise _Unsupported
+                column, function = (_constant(item, (str,)) for item in keyword.value.elts)
+                aggregates.append((keyword.arg, function, column))
+            return aggregates
+        if len(node.args) != 1 or node.keywords:
+            raise _Unsupported
+        argument = node.args[0]
+        if isinstance(argument, ast.Dict) and selected is None:
+            return [
+                (_constant(key, (str,)), _constant(value, (str,)), _constant(key, (str,)))
+                for key, value in zip(argument.keys, argument.values)
+            ]
+        if selected is not None:
+            function = _constant(argument, (str,))
+            return [(column, function, column) for column in selected]
+        raise _Unsupported
+
+    def _column_ref(self, node: ast.AST) -> Optional[str]:
+        """df["列"] 或 df.列"""
+        if self.variable is None:
+            return None
+        if (
+            isinstance(node, ast.Subscript)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == self.variable
+            and isinstance(node.slice, ast.Constant)
+            and isinstance(node.slice.value, str)
+        ):
+            return node.slice.value
+        if (
+            isinstance(node, ast.Attribute)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == self.variable
+            and not hasattr(pd.DataFrame, node.attr)
+        ):
+            return node.attr
+        return None
+
+    def _column_expression(self, node: ast.AST, query: _Query) -> exp.Column:
+        name = self._column_ref(node)
+        if name is None:
+            raise _Unsupported
+        self.variable_uses += 1
+        query.check_columns([name])
+        return _column(name)
+
+    def _condition(self, node: ast.AST, query: _Query) -> exp.Expression:
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+            combine = exp.and_ if isinstance(node.op, ast.BitAnd) else exp.or_
+            return combine(self._condition(node.left, query), self._condition(node.right, query))
+
+        if isinstance(node, ast.Compare) and len(node.ops) == 1:
+            left, op, right = node.left, type(node.ops[0]), node.comparators[0]
+            if self._column_ref(left) is None:
+                left, right, op = right, left, _FLIPPED.get(op, op)
+            if op not in _COMPARISONS:
+                raise _Unsupported
+            column = self._column_expression(left, query)
+            condition = _COMPARISONS[op](this=column, expression=exp.convert(_constant(right)))
+            if op is ast.NotEq:
+                # pandas中空值与任何值都“不等”
+                condition = exp.or_(condition, exp.Is(this=column.copy(), expression=exp.Null()))
+            return condition
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Invert):
+            # 只处理取反后空值语义明确的条件
+            inner = node.operand
+            if isinstance(inner, ast.Call) and isinstance(inner.func, ast.Attribute):
+                if inner.func.attr == "isin":
+                    condition = self._condition(inner, query)
+                    return exp.or_(exp.Not(this=condition), exp.Is(this=condition.this.copy(), expression=exp.Null()))
+                if inner.func.attr in ("isna", "isnull", "notna", "notnull"):
+                    condition = self._condition(inner, query)
+                    return condition.this if isinstance(condition, exp.Not) else exp.Not(this=condition)
+            raise _Unsupported
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and not node.keywords:
+            column = self._column_expression(node.func.value, query)
+            method = node.func.attr
+            if method == "isin" and len(node.args) == 1 and isinstance(node.args[0], (ast.List, ast.Tuple, ast.Set)):
+                values = [exp.convert(_constant(item)) for item in node.args[0].elts]
+                if not values:
+                    raise _Unsupported
+                return exp.In(this=column, expressions=values)
+            if method == "between" and len(node.args) == 2:
+                low, high = (exp.convert(_constant(item)) for item in node.args)
+                return exp.Between(this=column, low=low, high=high)
+            if method in ("isna", "isnull") and not node.args:
+                return exp.Is(this=column, expression=exp.Null())
+            if method in ("notna", "notnull") and not node.args:
+                return exp.Not(this=exp.Is(this=column, expression=exp.Null()))
+        raise _Unsupported
+
+
+def sql_of_call(node: ast.AST, sql_constants: Dict[str, str]) -> Optional[str]:
+    """`execute_sql_query("...")` 或 `execute_sql_query(sql_query)` 中的SQL"""
+    if not (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == SQL_FUNCTION
+        and len(node.args) == 1
+        and not node.keywords
+    ):
+        return None
+    argument = node.args[0]
+    if isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+        return argument.value
+    if isinstance(argument, ast.Name):
+        return sql_constants.get(argument.id)
+    return None
+
+
+def _loads(node: ast.AST, name: str) -> int:
+    return sum(
+        1
+        for child in ast.walk(node)
+        if isinstance(child, ast.Name) and child.id == name and isinstance(child.ctx, ast.Load)
+    )
+
+
+def _stores(node: ast.AST, name: str) -> bool:
+    return any(
+        isinstance(child, ast.Name) and child.id == name and not isinstance(child.ctx, ast.Load)
+        for child in ast.walk(node)
+    )
+
+
+def _label_free_use(node: ast.Name, parent: Optional[ast.AST]) -> bool:
+    """len(df) 或 {"type": "dataframe", "value": df}"""
+    if isinstance(parent, ast.Call):
+        return isinstance(parent.func, ast.Name) and parent.func.id == "len" and parent.args == [node]
+    if isinstance(parent, ast.Dict) and node in parent.values:
+        entries = {
+            key.value: value
+            for key, value in zip(parent.keys, parent.values)
+            if isinstance(key, ast.Constant) and isinstance(key.value, str)
+        }
+        result_type = entries.get("type")
+        return (
+            entries.get("value") is node
+            and isinstance(result_type, ast.Constant)
+            and result_type.value == "dataframe"
+        )
+    return False
+
+
+def _assigned_name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+        return node.targets[0].id
+    return None
+
+
+class SQLPushdown:
+    """
+    Args:
+        dialect (str): 生成代码中SQL的方言
+        tables (dict, optional): 表名（小写）到 {列名: schema类型} 的映射，用于确定聚合结果的类型
+    """
+
+    def __init__(self, dialect: str, tables: Optional[Dict[str, Dict[str, str]]] = None):
+        self.dialect = dialect
+        self.tables = {name.lower(): types for name, types in (tables or {}).items()}
+
+    def rewrite(self, body: List[ast.stmt]) -> List[ast.stmt]:
+        """
+        重写模块顶层语句，返回新的语句列表，无法下推的语句保持不变。
+
+        处理两种写法：
+            df = execute_sql_query("SELECT ...").groupby(...)...
+            df = execute_sql_query("SELECT ...")
+            top = df[df["amount"] > 0].sort_values("amount").head(10)   # df之后不再使用
+        """
+        body = list(body)
+        sql_constants = self._sql_constants(body)
+        index = 0
+        while index < len(body):
+            statement = body[index]
+            variable = _assigned_name(statement)
+            if variable is None:
+                index += 1
+                continue
+
+            folded = self._fold(
+                statement.value, sql_constants, index_unused=self._index_unused(body, index, variable)
+            )
+            if folded is not None:
+                statement.value = folded
+            sql = sql_of_call(statement.value, sql_constants)
+            consumer = self._consumer(body, index, variable) if sql is not None else None
+            folded = (
+                self._fold(
+                    body[consumer].value,
+                    sql_constants,
+                    variable,
+                    sql,
+                    index_unused=self._index_unused(body, consumer, _assigned_name(body[consumer])),
+                )
+                if consumer is not None
+                else None
+            )
+            if folded is None:
+                index += 1
+                continue
+            # 消费语句改为直接查询折叠后的SQL，原查询语句删除；继续尝试折叠新的查询
+            body[consumer].value = folded
+            del body[index]
+            index = consumer - 1
+        return body
+
+    def _fold(
+        self,
+        node: ast.AST,
+        sql_constants: Dict[str, str],
+        variable: Optional[str] = None,
+        sql: Optional[str] = None,
+        index_unused: bool = False,
+    ) -> Optional[ast.Call]:
+        if variable is None and sql_of_call(node, sql_constants) is not None:
+            return None
+        folder = _ChainFolder(self.dialect, sql_constants, variable, sql, self.tables)
+        try:
+            query = folder.fold(node)
+            folded_sql = query.select.sql(dialect=self.dialect)
+        except (_Unsupported, SqlglotError):
+            return None
+        # 折叠后行标签变为RangeIndex，之后读取行标签的代码会得到不同的结果
+        if not query.range_index and not index_unused:
+            return None
+        # 变量在表达式中还有其他用途（如作为参数），不能删除原查询
+        if variable is not None and folder.variable_uses != _loads(node, variable):
+            return None
+        call = ast.Call(
+            func=ast.Name(id=SQL_FUNCTION, ctx=ast.Load()),
+            args=[ast.Constant(value=folded_sql)],
+            keywords=[],
+        )
+        return ast.fix_missing_locations(ast.copy_location(call, node))
+
+    @staticmethod
+    def _sql_constants(body: List[ast.stmt]) -> Dict[str, str]:
+        """只赋值一次的顶层SQL字符串变量"""
+        constants = {}
+        for statement in body:
+            name = _assigned_name(statement)
+            if name and isinstance(statement.value, ast.Constant) and isinstance(statement.value.value, str):
+                constants[name] = statement.value.value
+        module = ast.Module(body=body, type_ignores=[])
+        return {
+            name: value
+            for name, value in constants.items()
+            if sum(1 for node in ast.walk(module) if isinstance(node, ast.Name) and node.id == name and not isinstance(node.ctx, ast.Load)) == 1
+        }
+
+    @staticmethod
+    def _index_unused(body: List[ast.stmt], index: int, name: str) -> bool:
+        """
+        第index条语句赋值的变量之后不会读取行标签：只作为dataframe结果的值返回（响应中不包含
+        行标签）或用于len()，直到被重新赋值。
+        """
+        if any(
+            isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda))
+            and _loads(statement, name)
+            for statement in body
+        ):
+            return False
+        for statement in body[index + 1:]:
+            parents = {child: parent for parent in ast.walk(statement) for child in ast.iter_child_nodes(parent)}
+            for node in ast.walk(statement):
+                if isinstance(node, ast.Name) and node.id == name and isinstance(node.ctx, ast.Load):
+                    if not _label_free_use(node, parents.get(node)):
+                        return False
+            if _stores(statement, name):
+                break
+        return True
+
+    @staticmethod
+    def _consumer(body: List[ast.stmt], index: int, variable: str) -> Optional[int]:
+        """
+        查询结果唯一的使用者：之后第一条读取变量的顶层赋值语句，且此后直到变量被重新赋值前
+        没有其他语句读取变量。
+        """
+        # 之前定义的函数可能在之后读取变量
+        if any(
+            isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+            and _loads(statement, variable)
+            for statement in body[:index]
+        ):
+            return None
+        consumer = None
+        for position in range(index + 1, len(body)):
+            statement = body[position]
+            if consumer is None:
+                if _loads(statement, variable):
+                    if _assigned_name(statement) is None:
+                        return None
+                    consumer = position
+                    if _assigned_name(statement) == variable:
+                        return consumer
+                elif _stores(statement, variable):
+                    return None
+            else:
+                if _loads(statement, variable):
+                    return None
+                if _stores(statement, variable):
+                    break
+        return consumer
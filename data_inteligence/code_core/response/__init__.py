@@ -1,5 +1,6 @@
 from .base import BaseResponse
 from .chart import ChartResponse
+from .chart_spec import ChartSpecResponse
 from .dataframe import DataFrameResponse
 from .error import ErrorResponse
 from .number import NumberResponse
@@ -10,6 +11,7 @@ __all__ = [
     "ResponseParser",
     "BaseResponse",
     "ChartResponse",
+    "ChartSpecResponse",
     "DataFrameResponse",
     "NumberResponse",
     "StringResponse",
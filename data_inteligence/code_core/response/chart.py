@@ -1,16 +1,39 @@
 import base64
 import io
+from pathlib import Path
 from typing import Any
 
 from PIL import Image
 
 from .base import BaseResponse
 
+SVG_MIME_TYPE = "image/svg+xml"
+
 
 class ChartResponse(BaseResponse):
+    """
+    图表结果，value为图表文件路径或data URI。
+
+    SVG图表（CHART_FORMAT=svg）无法用PIL打开，保存和编码时直接使用原始内容，也不在本地显示。
+    """
+
     def __init__(self, value: Any, error: str = None):
         super().__init__(value, "chart", error)
 
+    @property
+    def is_svg(self) -> bool:
+        if self.value.startswith("data:"):
+            return self.value[len("data:"):].split(";")[0].split(",")[0] == SVG_MIME_TYPE
+        return Path(self.value).suffix.lower() == ".svg"
+
+    def _get_bytes(self) -> bytes:
+        if not self.value.startswith("data:"):
+            return Path(self.value).read_bytes()
+        header, _, payload = self.value.partition(",")
+        if header.endswith(";base64"):
+            return base64.b64decode(payload)
+        return payload.encode("utf-8")
+
     def _get_image(self) -> Image.Image:
         if not self.value.startswith("data:image"):
             return Image.open(self.value)
@@ -20,10 +43,15 @@ class ChartResponse(BaseResponse):
         return Image.open(io.BytesIO(image_data))
 
     def save(self, path: str):
+        if self.is_svg:
+            Path(path).write_bytes(self._get_bytes())
+            return
         img = self._get_image()
         img.save(path)
 
     def show(self):
+        if self.is_svg:
+            return
         img = self._get_image()
         img.show()
 
@@ -32,6 +60,9 @@ class ChartResponse(BaseResponse):
         return self.value
 
     def get_base64_image(self) -> str:
+        """base64编码的图表：位图统一转为PNG，SVG保持原样"""
+        if self.is_svg:
+            return base64.b64encode(self._get_bytes()).decode("utf-8")
         img = self._get_image()
         img_byte_arr = io.BytesIO()
         img.save(img_byte_arr, format="PNG")
@@ -0,0 +1,100 @@
+"""
+chart_spec 输出类型：Vega-Lite风格的图表描述加上聚合后的数据点，由前端渲染。
+
+相比matplotlib渲染的PNG，描述和数据通常小一到两个数量级，也不需要在服务端绘图。
+"""
+import json
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from .base import BaseResponse
+
+VEGA_LITE_SCHEMA = "https://vega.github.io/schema/vega-lite/v5.json"
+CHART_SPEC_MARKS = frozenset(
+    {"arc", "area", "bar", "boxplot", "circle", "line", "point", "rect", "rule", "square", "text", "tick"}
+)
+CHART_SPEC_FIELD_TYPES = frozenset({"quantitative", "nominal", "ordinal", "temporal"})
+# 图表数据应在SQL中聚合，超过该点数说明取回的是明细数据
+MAX_CHART_SPEC_POINTS = 5000
+
+
+def _records(data: Any) -> List[Dict[str, Any]]:
+    if isinstance(data, pd.Series):
+        data = data.reset_index()
+    if isinstance(data, pd.DataFrame):
+        return json.loads(
+            data.to_json(orient="records", date_format="iso", default_handler=str, force_ascii=False)
+        )
+    if isinstance(data, dict) and "values" in data:
+        data = data["values"]
+    if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+        return data
+    raise ValueError(
+        "Invalid output: chart_spec data must be a pandas DataFrame or a list of records."
+    )
+
+
+def normalize_chart_spec(value: Any) -> Dict[str, Any]:
+    """
+    校验图表描述，并把数据转换为可序列化的Vega-Lite内联数据。
+
+    Args:
+        value: 生成代码返回的描述，包含mark、encoding和data
+
+    Raises:
+        ValueError: 描述不合法，错误信息会进入纠错提示
+
+    Returns:
+        dict: Vega-Lite规范
+    """
+    if not isinstance(value, dict):
+        raise ValueError("Invalid output: Expected a dict chart specification for result type 'chart_spec'.")
+
+    spec = dict(value)
+    mark = spec.get("mark")
+    mark_type = mark.get("type") if isinstance(mark, dict) else mark
+    if mark_type not in CHART_SPEC_MARKS:
+        raise ValueError(
+            f"Invalid output: chart_spec mark must be one of {sorted(CHART_SPEC_MARKS)}, got {mark_type!r}."
+        )
+
+    if "data" not in spec:
+        raise ValueError("Invalid output: chart_spec must include the aggregated 'data' to plot.")
+    records = _records(spec["data"])
+    if len(records) > MAX_CHART_SPEC_POINTS:
+        raise ValueError(
+            f"Invalid output: chart_spec has {len(records)} data points, aggregate the data in SQL "
+            f"to at most {MAX_CHART_SPEC_POINTS} points."
+        )
+
+    encoding = spec.get("encoding")
+    if not isinstance(encoding, dict) or not encoding:
+        raise ValueError("Invalid output: chart_spec must include an 'encoding' dict, e.g. {'x': {...}, 'y': {...}}.")
+    columns = set(records[0]) if records else set()
+    for channel, definition in encoding.items():
+        if not isinstance(definition, dict):
+            raise ValueError(f"Invalid output: chart_spec encoding '{channel}' must be a dict.")
+        field = definition.get("field")
+        if field is not None and records and field not in columns:
+            raise ValueError(
+                f"Invalid output: chart_spec encoding '{channel}' uses field {field!r} which is not in the data columns {sorted(columns)}."
+            )
+        field_type = definition.get("type")
+        if field_type is not None and field_type not in CHART_SPEC_FIELD_TYPES:
+            raise ValueError(
+                f"Invalid output: chart_spec encoding '{channel}' type must be one of {sorted(CHART_SPEC_FIELD_TYPES)}."
+            )
+
+    spec["data"] = {"values": records}
+    spec.setdefault("$schema", VEGA_LITE_SCHEMA)
+    return spec
+
+
+class ChartSpecResponse(BaseResponse):
+    """
+    Class for handling chart specifications rendered by the client.
+    """
+
+    def __init__(self, value: Any = None, error: str = None):
+        super().__init__(normalize_chart_spec(value), "chart_spec", error)
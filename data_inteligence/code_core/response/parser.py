@@ -4,6 +4,7 @@ import pandas as pd
 
 from .base import BaseResponse
 from .chart import ChartResponse
+from .chart_spec import ChartSpecResponse, normalize_chart_spec
 from .dataframe import DataFrameResponse
 from .number import NumberResponse
 from .string import StringResponse
@@ -23,6 +24,8 @@ class ResponseParser:
             return DataFrameResponse(result["value"], error)
         elif result["type"] == "plot":
             return ChartResponse(result["value"], error)
+        elif result["type"] == "chart_spec":
+            return ChartSpecResponse(result["value"], error)
         else:
             raise TypeError(f"Invalid output type: {result['type']}")
 
@@ -51,6 +54,9 @@ class ResponseParser:
                     "Invalid output: Expected a Pandas DataFrame or Series, but received an incompatible type."
                 )
 
+        elif result["type"] == "chart_spec":
+            normalize_chart_spec(result["value"])
+
         elif result["type"] == "plot":
             if not isinstance(result["value"], (str, dict)):
                 raise ValueError(
@@ -59,7 +65,7 @@ class ResponseParser:
 
             if isinstance(result["value"], dict) or (
                 isinstance(result["value"], str)
-                and "data:image/png;base64" in result["value"]
+                and result["value"].startswith("data:image/")
             ):
                 return True
 
@@ -12,6 +12,12 @@ DEFAULT_CHART_DIRECTORY = DEFAULT_STORGE_PATH / "charts"
 # 文件和目录的默认权限
 DEFAULT_FILE_PERMISSIONS = 0o755
 
+# 上传的本地数据集在入库时转换成的parquet文件名
+DEFAULT_PARQUET_FILE = "data.parquet"
+
+# 写入parquet时每个row group的行数（DuckDB默认值），row group粒度的min/max统计用于谓词下推
+DEFAULT_PARQUET_ROW_GROUP_SIZE = 122880
+
 LOCAL_SOURCE_TYPES = ["csv", "parquet", "xlsx", "xls"]
 REMOTE_SOURCE_TYPES = [
     "mysql",
@@ -6,9 +6,14 @@ from ..query_builders.sql_parser import SQLParser
 
 
 class DuckDBConnectionManager:
-    def __init__(self):
-        """Initialize a DuckDB connection."""
-        self.connection = duckdb.connect()
+    def __init__(self, connection: Optional[duckdb.DuckDBPyConnection] = None):
+        """
+        Initialize a DuckDB connection.
+
+        Args:
+            connection (duckdb.DuckDBPyConnection, optional): 已有的连接（如工作空间catalog的游标），默认新建内存连接
+        """
+        self.connection = connection or duckdb.connect()
         self._registered_tables = set()
 
     def __del__(self):
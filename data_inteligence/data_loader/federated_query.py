@@ -0,0 +1,265 @@
+"""
+跨数据源的联邦查询。
+
+当一条SQL同时引用了不同数据源（如MySQL表与上传的CSV）的数据集时，按数据源拆分查询：
+只涉及单个远程数据源的子查询/CTE整体下推（包括其中的过滤和聚合），其余远程表只拉取
+查询用到的列以及只涉及该表的过滤条件；部分结果以Arrow表注册到DuckDB，最终的JOIN在DuckDB中完成。
+近似模式下各数据集的表引用替换为采样子查询，采样由各自的数据源执行。
+"""
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+from sqlglot import exp, parse_one
+
+from data_inteligence.dataframe.virtual_dataframe import VirtualDataFrame
+from data_inteligence.query_builders.sampling import TableSample, TableSampler
+from data_inteligence.query_builders.sql_parser import SQLParser
+from .duck_db_connection_manager import DuckDBConnectionManager
+from .local_loader import execute_local_query
+
+FEDERATED_TABLE_PREFIX = "__federated_"
+
+
+class FederatedQueryPlanner:
+    """
+    Args:
+        datasets (Dict[str, VirtualDataFrame]): 数据集名到数据集的映射
+        db_manager (DuckDBConnectionManager): 执行最终查询的DuckDB连接（已注册内存表）
+        catalog_views (Iterable[str]): 工作空间catalog中已存在视图的本地数据集，无需替换表名
+        sampler (TableSampler, optional): 近似模式的采样配置，为None时执行精确查询
+    """
+
+    def __init__(
+        self,
+        datasets: Dict[str, VirtualDataFrame],
+        db_manager: DuckDBConnectionManager,
+        catalog_views: Iterable[str] = (),
+        sampler: Optional[TableSampler] = None,
+    ):
+        self.datasets = datasets
+        self.db_manager = db_manager
+        self.catalog_views = frozenset(catalog_views)
+        self.sampler = sampler
+        self._fetched: Dict[str, str] = {}
+        self._samples: Dict[str, Optional[TableSample]] = {}
+
+    @property
+    def samples(self) -> Dict[str, TableSample]:
+        """本次查询中实际被采样的数据集"""
+        return {name: sample for name, sample in self._samples.items() if sample}
+
+    def is_local(self, name: str) -> bool:
+        return bool(self.datasets[name].local_sources)
+
+    def remote_groups(self, names: Iterable[str]) -> List[List[str]]:
+        """按连接对远程数据集分组，同一组的数据集可以在同一个数据库中执行JOIN"""
+        groups: List[List[str]] = []
+        for name in names:
+            if self.is_local(name):
+                continue
+            source = self.datasets[name].source
+            for group in groups:
+                if self.datasets[group[0]].source.is_compatible_source(source):
+                    group.append(name)
+                    break
+            else:
+                groups.append([name])
+        return groups
+
+    def execute(self, query: str) -> pd.DataFrame:
+        parsed = parse_one(query)
+        cte_names = {cte.alias_or_name for cte in parsed.find_all(exp.CTE)}
+        table_names = {
+            table.name for table in parsed.find_all(exp.Table) if table.name not in cte_names
+        }
+        referenced = [name for name in self.datasets if name in table_names]
+        groups = self.remote_groups(referenced)
+
+        # 只涉及单个远程数据源：整条查询由该数据库执行
+        if len(groups) == 1 and set(groups[0]) == table_names:
+            return self._execute_remote(groups[0], parsed)
+
+        for group in groups:
+            self._push_down_subqueries(parsed, group, cte_names)
+        remote = {name for group in groups for name in group}
+        for table in list(parsed.find_all(exp.Table)):
+            if table.name in remote and table.name not in cte_names:
+                self._fetch_table(table)
+
+        return self._execute_local(parsed)
+
+    def _execute_remote(self, names: List[str], parsed: exp.Expression) -> pd.DataFrame:
+        mapping = {name: self._table_reference(name) for name in names}
+        final_query = SQLParser.replace_table_and_column_names(parsed.sql(), mapping)
+        return self.datasets[names[0]].execute_sql_query(final_query)
+
+    def _execute_local(self, parsed: exp.Expression) -> pd.DataFrame:
+        table_names = {table.name for table in parsed.find_all(exp.Table)}
+        mapping = {}
+        local_sources = []
+        for name, df in self.datasets.items():
+            if not self.is_local(name):
+                continue
+            local_sources.extend(df.local_sources)
+            if self.sampler is not None and name in table_names:
+                # 采样子查询基于数据集自身的表引用，catalog视图也需要替换
+                mapping[name] = self._table_reference(name)
+            elif name not in self.catalog_views:
+                mapping[name] = df.get_table_reference()
+
+        final_query = SQLParser.replace_table_and_column_names(parsed.sql(), mapping)
+        return execute_local_query(final_query, local_sources, db_manager=self.db_manager)
+
+    def _table_reference(self, name: str) -> str:
+        df = self.datasets[name]
+        reference = df.get_table_reference()
+        if self.sampler is None:
+            return reference
+        if name not in self._samples:
+            if self.is_local(name):
+                # 本地文件的行数可以廉价获得，小表不采样
+                sample = self.sampler.sample(reference, "duckdb", df.rows_count)
+            else:
+                sample = self.sampler.sample(reference, df.source.type)
+            self._samples[name] = sample
+        sample = self._samples[name]
+        return sample.reference if sample else reference
+
+    def _register(self, names: List[str], query: exp.Expression) -> str:
+        """在远程数据源上执行查询，并把结果以Arrow表注册到DuckDB"""
+        sql = query.sql()
+        if sql not in self._fetched:
+            result = self._execute_remote(names, query)
+            table_name = f"{FEDERATED_TABLE_PREFIX}{len(self._fetched)}"
+            self.db_manager.register(table_name, pa.Table.from_pandas(result, preserve_index=False))
+            self._fetched[sql] = table_name
+        return self._fetched[sql]
+
+    def _push_down_subqueries(
+        self, parsed: exp.Expression, group: List[str], cte_names: set
+    ) -> None:
+        """只引用同一远程数据源的CTE和派生表整体下推，聚合也在远程执行"""
+        candidates = [
+            node
+            for node in parsed.find_all(exp.CTE, exp.Subquery)
+            if isinstance(node, exp.CTE) or isinstance(node.parent, (exp.From, exp.Join))
+        ]
+        for node in candidates:
+            # 祖先节点已经整体下推
+            if node.root() is not parsed:
+                continue
+            tables = {table.name for table in node.this.find_all(exp.Table)}
+            if not tables or not tables <= set(group) or tables & cte_names:
+                continue
+
+            table_name = self._register(group, node.this)
+            if isinstance(node, exp.CTE):
+                node.set("this", exp.select("*").from_(table_name))
+            else:
+                node.replace(exp.Table(this=exp.to_identifier(table_name), alias=node.args.get("alias")))
+
+    def _fetch_table(self, table: exp.Table) -> None:
+        """拉取远程表：只取查询用到的列，并下推只涉及该表的过滤条件"""
+        name = table.name
+        alias = table.alias_or_name
+        scope = table.find_ancestor(exp.Select)
+
+        query = exp.select(*self._projection(scope, alias, name)).from_(exp.to_table(name))
+        for condition in self._pushable_filters(scope, alias, name):
+            query = query.where(condition)
+
+        table_name = self._register([name], query)
+        table.replace(
+            exp.Table(
+                this=exp.to_identifier(table_name),
+                alias=exp.TableAlias(this=exp.to_identifier(alias)),
+            )
+        )
+
+    def _known_columns(self, name: str) -> Optional[List[str]]:
+        df = self.datasets[name]
+        if df.schema.columns and not df.schema.view:
+            return [column.name for column in df.schema.columns]
+        try:
+            return [str(column) for column in df.head().columns]
+        except Exception:
+            return None
+
+    @staticmethod
+    def _from_table(scope: exp.Select) -> Optional[exp.Expression]:
+        # sqlglot新版本中FROM子句的参数名为 "from_"
+        from_ = scope.args.get("from_") or scope.args.get("from")
+        return from_.this if from_ else None
+
+    def _scope_tables(self, scope: exp.Select) -> List[exp.Expression]:
+        tables = [self._from_table(scope)] if self._from_table(scope) else []
+        tables.extend(join.this for join in scope.args.get("joins") or [])
+        return tables
+
+    def _projection(self, scope: Optional[exp.Select], alias: str, name: str) -> list:
+        known_columns = self._known_columns(name)
+        if scope is None or known_columns is None:
+            return ["*"]
+
+        single_table = len(self._scope_tables(scope)) == 1
+        columns = []
+        for node in scope.walk():
+            if isinstance(node, exp.Star):
+                # COUNT(*) 不需要任何列；SELECT * 或 alias.* 需要全部列
+                if isinstance(node.parent, exp.Count):
+                    continue
+                if isinstance(node.parent, exp.Column) and node.parent.table != alias:
+                    continue
+                return ["*"]
+            if isinstance(node, exp.Column) and not isinstance(node.this, exp.Star):
+                if node.table == alias or (not node.table and (single_table or node.name in known_columns)):
+                    columns.append(node.name)
+
+        # 未限定表名的列也可能是输出列的别名（如ORDER BY total），只保留数据集中存在的列
+        columns = [column for column in dict.fromkeys(columns) if column in known_columns]
+        return [exp.column(column) for column in columns] or ["*"]
+
+    def _pushable_filters(
+        self, scope: Optional[exp.Select], alias: str, name: str
+    ) -> List[exp.Expression]:
+        if scope is None or not scope.args.get("where"):
+            return []
+        if alias in self._null_supplying_tables(scope):
+            return []
+
+        single_table = len(self._scope_tables(scope)) == 1
+        where = scope.args["where"].this
+        conditions = list(where.flatten()) if isinstance(where, exp.And) else [where]
+
+        filters = []
+        for condition in conditions:
+            if condition.find(exp.Subquery, exp.Select, exp.AggFunc, exp.Window):
+                continue
+            columns = list(condition.find_all(exp.Column))
+            if not columns or not all(
+                column.table == alias or (not column.table and single_table)
+                for column in columns
+            ):
+                continue
+
+            condition = condition.copy()
+            for column in condition.find_all(exp.Column):
+                column.set("table", None)
+            filters.append(condition)
+        return filters
+
+    def _null_supplying_tables(self, scope: exp.Select) -> set:
+        """外连接中可能被补NULL的一侧，过滤条件不能提前到JOIN之前"""
+        tables = set()
+        from_table = self._from_table(scope)
+        preceding = [from_table.alias_or_name] if from_table else []
+        for join in scope.args.get("joins") or []:
+            side = (join.side or "").upper()
+            joined = join.this.alias_or_name
+            if side in ("LEFT", "FULL"):
+                tables.add(joined)
+            if side in ("RIGHT", "FULL"):
+                tables.update(preceding)
+            preceding.append(joined)
+        return tables
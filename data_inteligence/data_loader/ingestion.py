@@ -0,0 +1,185 @@
+"""
+本地数据集入库：将上传的CSV/Excel文件转换为带类型的parquet文件。
+
+parquet按列存储并带有row group级别的min/max统计信息，DuckDB查询时只需读取
+涉及到的列和row group，避免每次查询都重新解析CSV/Excel。
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Optional, Union
+
+import duckdb
+import pandas as pd
+
+from data_inteligence.constants import DEFAULT_PARQUET_FILE, DEFAULT_PARQUET_ROW_GROUP_SIZE
+from .semantic_layer_schema import Column, SemanticLayerSchema, Source
+
+# DuckDB类型到semantic layer列类型的映射
+DUCKDB_COLUMN_TYPES = {
+    "boolean": "boolean",
+    "tinyint": "integer",
+    "smallint": "integer",
+    "integer": "integer",
+    "bigint": "integer",
+    "hugeint": "integer",
+    "utinyint": "integer",
+    "usmallint": "integer",
+    "uinteger": "integer",
+    "ubigint": "integer",
+    "float": "float",
+    "double": "float",
+    "decimal": "float",
+    "date": "datetime",
+    "timestamp": "datetime",
+    "timestamp with time zone": "datetime",
+    "timestamp_s": "datetime",
+    "timestamp_ms": "datetime",
+    "timestamp_ns": "datetime",
+    "varchar": "string",
+    "time": "string",
+    "time with time zone": "string",
+    "uuid": "string",
+    "blob": "string",
+    "interval": "string",
+}
+
+# CSV嗅探只基于样本行，样本之外的值不符合推断的类型时COPY会抛出ConversionException：
+# 依次改为基于全部行嗅探、全部列按字符串读取
+CSV_READ_FALLBACKS = [{}, {"sample_size": -1}, {"all_varchar": True}]
+
+EXCEL_SOURCE_TYPES = ["xlsx", "xls"]
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _open_source(
+    connection: duckdb.DuckDBPyConnection, file_path: Path, source_type: str, **csv_options
+) -> duckdb.DuckDBPyRelation:
+    """以DuckDB relation的形式打开原始文件，csv_options为DuckDB read_csv的参数"""
+    if source_type == "csv":
+        try:
+            # DuckDB的CSV嗅探会推断出日期、时间戳等类型，且不需要把整个文件读入pandas
+            return connection.read_csv(str(file_path), **csv_options)
+        except duckdb.Error:
+            data = pd.read_csv(file_path)
+    elif source_type in EXCEL_SOURCE_TYPES:
+        data = pd.read_excel(file_path)
+    else:
+        raise ValueError(f"Unsupported file format: {source_type}")
+
+    connection.register("source_data", data)
+    return connection.table("source_data")
+
+
+def infer_columns(relation: duckdb.DuckDBPyRelation) -> List[Column]:
+    """根据DuckDB relation的列类型生成semantic layer的列定义，其余类型（列表、结构体等）按字符串处理"""
+    return [
+        Column(name=name, type=DUCKDB_COLUMN_TYPES.get(dtype.id, "string"))
+        for name, dtype in zip(relation.columns, relation.types)
+    ]
+
+
+def choose_sort_keys(columns: List[Column]) -> List[str]:
+    """
+    选择写入parquet时的排序列：第一个日期时间列。
+
+    数据按时间有序写入后，各row group的min/max区间互不重叠，时间范围过滤可以跳过大部分row group。
+    """
+    for column in columns:
+        if column.type == "datetime":
+            return [column.name]
+    return []
+
+
+def convert_to_parquet(
+    file_path: Union[str, Path],
+    target_path: Union[str, Path],
+    source_type: Optional[str] = None,
+    sort_by: Optional[List[str]] = None,
+    row_group_size: int = DEFAULT_PARQUET_ROW_GROUP_SIZE,
+) -> List[Column]:
+    """
+    将CSV/Excel文件转换为parquet文件。
+
+    Args:
+        file_path (str | Path): 原始文件路径
+        target_path (str | Path): parquet文件路径
+        source_type (str, optional): 原始文件类型，默认取文件后缀
+        sort_by (List[str], optional): 排序列，为None时由choose_sort_keys自动选择
+        row_group_size (int): 每个row group的行数
+
+    Returns:
+        List[Column]: parquet文件的列定义
+    """
+    file_path = Path(file_path)
+    target_path = Path(target_path)
+    source_type = (source_type or file_path.suffix.lstrip(".")).lower()
+
+    # 先写入临时文件再替换，避免覆盖数据集时读到写了一半的文件
+    temp_path = target_path.with_name(f".{target_path.name}.tmp")
+    fallbacks = CSV_READ_FALLBACKS if source_type == "csv" else [{}]
+    connection = duckdb.connect()
+    try:
+        for attempt, csv_options in enumerate(fallbacks):
+            relation = _open_source(connection, file_path, source_type, **csv_options)
+            columns = infer_columns(relation)
+            sort_keys = sort_by if sort_by is not None else choose_sort_keys(columns)
+            if sort_keys:
+                relation = relation.order(", ".join(_quote_identifier(c) for c in sort_keys))
+            try:
+                connection.execute(
+                    f"COPY ({relation.sql_query()}) TO {_quote_literal(str(temp_path))} "
+                    f"(FORMAT PARQUET, COMPRESSION ZSTD, ROW_GROUP_SIZE {int(row_group_size)})"
+                )
+                break
+            except duckdb.ConversionException:
+                if attempt == len(fallbacks) - 1:
+                    raise
+        os.replace(temp_path, target_path)
+    finally:
+        connection.close()
+        temp_path.unlink(missing_ok=True)
+
+    return columns
+
+
+def ingest_local_file(
+    file_path: Union[str, Path],
+    name: Optional[str] = None,
+    source_type: Optional[str] = None,
+    sort_by: Optional[List[str]] = None,
+) -> SemanticLayerSchema:
+    """
+    将上传的文件转换为同目录下的parquet文件，并返回指向该parquet文件的schema。
+
+    原始文件保留在原处（供下载），schema.yaml应使用返回的schema。
+
+    Args:
+        file_path (str | Path): 上传的原始文件
+        name (str, optional): 数据集表名，默认为 table_<列名哈希>
+        source_type (str, optional): 原始文件类型，默认取文件后缀
+        sort_by (List[str], optional): 排序列
+    """
+    file_path = Path(file_path)
+    columns = convert_to_parquet(
+        file_path,
+        file_path.parent / DEFAULT_PARQUET_FILE,
+        source_type=source_type,
+        sort_by=sort_by,
+    )
+    if name is None:
+        column_string = ",".join(column.name for column in columns)
+        name = f"table_{hashlib.md5(column_string.encode()).hexdigest()}"
+
+    return SemanticLayerSchema(
+        name=name,
+        source=Source(type="parquet", path=DEFAULT_PARQUET_FILE),
+        columns=columns,
+    )
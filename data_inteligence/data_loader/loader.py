@@ -1,8 +1,10 @@
 import yaml
+import pandas as pd
 from pathlib import Path
 from abc import ABC, abstractmethod
-from typing import Optional
-from .semantic_layer_schema import SemanticLayerSchema
+from typing import List, Optional
+from .rollup import DatasetRollup
+from .semantic_layer_schema import SemanticLayerSchema, Source
 from data_inteligence.exceptions import MethodNotImplementedError
 from data_inteligence.dataframe.base import DataFrame
 from data_inteligence.constants import LOCAL_SOURCE_TYPES
@@ -12,6 +14,7 @@ class DatasetLoader(ABC):
     def __init__(self, schema: SemanticLayerSchema, dataset_path: str):
         self.schema = schema
         self.dataset_path = dataset_path
+        self._rollup: Optional[DatasetRollup] = None
 
     @property
     @abstractmethod
@@ -23,6 +26,39 @@ class DatasetLoader(ABC):
     def execute_query(self, query: str, params: Optional[list] = None):
         pass
 
+    def execute_sql_query(self, query: str) -> pd.DataFrame:
+        """执行LLM生成的查询，子类可以在执行前增加额外的检查"""
+        return self.execute_query(query)
+
+    @property
+    def source(self) -> Source:
+        """执行查询的数据源"""
+        return self.schema.source
+
+    @property
+    def rollup(self) -> Optional[DatasetRollup]:
+        """group_by数据集的预聚合结果，其他数据集（及无法判断rollup何时过期的数据集）为None"""
+        if self._rollup is None and DatasetRollup.is_supported(self.schema):
+            self._rollup = DatasetRollup(self)
+        return self._rollup
+
+    def _available_rollup(self) -> Optional[DatasetRollup]:
+        rollup = self.rollup
+        return rollup if rollup is not None and rollup.is_fresh() else None
+
+    @property
+    def local_sources(self) -> List[str]:
+        """查询需要读取的本地数据集文件，为空表示数据集不是本地文件"""
+        rollup = self._available_rollup()
+        return [str(rollup.path)] if rollup else []
+
+    def get_table_reference(self) -> str:
+        """在LLM生成的SQL中替换数据集表名时使用的表达式，已物化rollup时直接读取rollup"""
+        rollup = self._available_rollup()
+        if rollup:
+            return rollup.table_expression
+        return self.query_builder.get_table_reference()
+
     @classmethod
     def create_loader_from_schema(
         cls, schema: SemanticLayerSchema, dataset_path: str
@@ -74,4 +110,26 @@ class DatasetLoader(ABC):
         Returns:
             DataFrame: A new DataFrame instance with loaded data.
         """
-        raise MethodNotImplementedError("Loader未实例化")
\ No newline at end of file
+        raise MethodNotImplementedError("Loader未实例化")
+
+    def load_head(self, n: int = 5) -> pd.DataFrame:
+        rollup = self._available_rollup()
+        if rollup:
+            return self._execute_rollup_query(f"SELECT * FROM {rollup.table_expression} LIMIT {int(n)}")
+        query = self.query_builder.get_head_query(n)
+        return self.execute_query(query)
+
+    def get_row_count(self) -> int:
+        rollup = self._available_rollup()
+        if rollup:
+            result = self._execute_rollup_query(f"SELECT COUNT(*) FROM {rollup.table_expression}")
+        else:
+            query = self.query_builder.get_row_count()
+            result = self.execute_query(query)
+        # iloc[0, 0] 用于获取查询结果的第一个行第一个列的值
+        return int(result.iloc[0, 0])
+
+    def _execute_rollup_query(self, query: str) -> pd.DataFrame:
+        from data_inteligence.data_loader.local_loader import execute_local_query
+
+        return execute_local_query(query, [str(self.rollup.path)])
@@ -1,5 +1,4 @@
-import re
-from typing import Optional
+from typing import Iterable, List, Optional
 
 import duckdb
 import pandas as pd
@@ -7,14 +6,48 @@ from .loader import DatasetLoader
 from .semantic_layer_schema import SemanticLayerSchema
 from .duck_db_connection_manager import DuckDBConnectionManager
 from data_inteligence.query_builders.local_query_builder import LocalQueryBuilder
-from data_inteligence.dataframe import DataFrame
+from data_inteligence.dataframe import VirtualDataFrame
 from data_inteligence.exceptions import MaliciousQueryError
-from data_inteligence.helpers.sql_sanitizer import is_sql_query_safe
+from data_inteligence.helpers.sql_analyzer import analyze_sql_query
+
+
+def execute_local_query(
+    query: str,
+    trusted_sources: Iterable[str],
+    params: Optional[list] = None,
+    db_manager: Optional[DuckDBConnectionManager] = None,
+) -> pd.DataFrame:
+    """
+    使用DuckDB直接在数据集文件上执行查询，只物化查询结果。
+
+    Args:
+        query (str): SQL查询
+        trusted_sources (Iterable[str]): 查询允许读取的数据集文件路径
+        params (list, optional): 查询参数
+        db_manager (DuckDBConnectionManager, optional): 已注册了内存表的DuckDB连接
+    """
+    try:
+        db_manager = db_manager or DuckDBConnectionManager()
+
+        # 只允许通过read_parquet等表函数读取数据集自身的文件
+        verdict = analyze_sql_query(
+            query, dialect="duckdb", trusted_sources=trusted_sources
+        )
+        if not verdict.safe:
+            raise MaliciousQueryError(
+                f"The SQL query is deemed unsafe and will not be executed: {verdict.reason}"
+            )
+
+        return db_manager.sql(query, params=params).df()
+    except duckdb.Error as e:
+        raise RuntimeError(f"SQL execution failed: {e}") from e
 
 
 class LocalDatasetLoader(DatasetLoader):
     """
     Loader for local datasets (CSV, Parquet, XLSX/XLS).
+
+    数据不会被整体加载到内存，head、行数以及SQL查询都由DuckDB直接在文件上执行。
     """
     def __init__(self, schema: SemanticLayerSchema, dataset_path: str):
         super().__init__(schema, dataset_path)
@@ -24,41 +57,21 @@ class LocalDatasetLoader(DatasetLoader):
     def query_builder(self) -> LocalQueryBuilder:
         return self._query_builder
 
-    def register_table(self):
-        df = self.load()
-        db_manager = DuckDBConnectionManager()
-        db_manager.register(self.schema.name, df)
+    @property
+    def source_path(self) -> str:
+        """数据集文件的绝对路径"""
+        return self.query_builder.source_path
+
+    @property
+    def local_sources(self) -> List[str]:
+        return [self.source_path, *super().local_sources]
 
-    def load(self) -> DataFrame:
-        df: pd.DataFrame = self.execute_query(self.query_builder.build_query())
-        return DataFrame(
-            df,
+    def load(self) -> VirtualDataFrame:
+        return VirtualDataFrame(
             schema=self.schema,
+            data_loader=self,
             path=self.dataset_path,
         )
 
-    def _replace_readparquet_block_with_table(
-        self, sql_query, table: str = "dummy_table"
-    ):
-        read_parquet_pattern = re.compile(r"(READ_PARQUET\(\s*'[^']+'\s*\))", re.DOTALL)
-        read_parquet_blocks = read_parquet_pattern.findall(sql_query)
-        for block in read_parquet_blocks:
-            sql_query = sql_query.replace(block, table)
-
-        return sql_query
-
     def execute_query(self, query: str, params: Optional[list] = None) -> pd.DataFrame:
-        try:
-            db_manager = DuckDBConnectionManager()
-
-            # Replace READ_PARQUET blocks with a dummy table for validation
-            validation_query = self._replace_readparquet_block_with_table(query)
-
-            if not is_sql_query_safe(validation_query, dialect="duckdb"):
-                raise MaliciousQueryError(
-                    "The SQL query is deemed unsafe and will not be executed."
-                )
-
-            return db_manager.sql(query, params=params).df()
-        except duckdb.Error as e:
-            raise RuntimeError(f"SQL execution failed: {e}") from e
\ No newline at end of file
+        return execute_local_query(query, [self.source_path], params)
@@ -0,0 +1,183 @@
+"""
+group_by数据集的预聚合（rollup）。
+
+schema中定义了group_by和聚合expression的数据集，每次加载、head查询都会在原始行上重新聚合。
+rollup把 build_query() 的结果物化为parquet文件，按 update_frequency 定期刷新，本地数据源的文件
+比rollup新时也会刷新；查询时数据集透明地改为读取rollup文件（由DuckDB执行）。
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+import duckdb
+
+from data_inteligence.constants import DEFAULT_STORGE_PATH, LOCAL_SOURCE_TYPES
+
+if TYPE_CHECKING:
+    from .loader import DatasetLoader
+    from .semantic_layer_schema import SemanticLayerSchema
+
+DEFAULT_ROLLUP_DIRECTORY = DEFAULT_STORGE_PATH / "rollups"
+
+UPDATE_FREQUENCIES = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "monthly": timedelta(days=30),
+}
+_DURATION_RE = re.compile(r"^(\d+)\s*([smhdw])$")
+_DURATION_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+# 超过该时间的临时文件视为写入进程已退出后的残留
+_ABANDONED_TEMP_SECONDS = 3600
+
+
+def parse_update_frequency(value: Optional[str]) -> Optional[timedelta]:
+    """
+    解析schema中的update_frequency。
+
+    支持 hourly/daily/weekly/monthly 以及 30m、6h、1d 这样的时长，无法识别时返回None（不按时间过期）。
+    """
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value in UPDATE_FREQUENCIES:
+        return UPDATE_FREQUENCIES[value]
+    match = _DURATION_RE.match(value)
+    if match:
+        return timedelta(**{_DURATION_UNITS[match.group(2)]: int(match.group(1))})
+    return None
+
+
+class DatasetRollup:
+    """
+    数据集的rollup文件。
+
+    文件名包含聚合查询与数据源的摘要，schema变化后会自动使用新的rollup文件。
+
+    Args:
+        loader (DatasetLoader): 数据集的loader
+        directory (str | Path): rollup文件所在目录
+    """
+
+    def __init__(
+        self,
+        loader: "DatasetLoader",
+        directory: Union[str, Path] = DEFAULT_ROLLUP_DIRECTORY,
+    ):
+        self.loader = loader
+        self.query = loader.query_builder.build_query()
+        source = loader.source.model_dump() if loader.source else None
+        digest = hashlib.sha1(
+            json.dumps([self.query, source, loader.dataset_path], sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        self.path = (Path(directory) / f"{loader.schema.name}-{digest}.parquet").resolve()
+        self.update_interval = parse_update_frequency(loader.schema.update_frequency)
+
+    @staticmethod
+    def is_supported(schema: "SemanticLayerSchema") -> bool:
+        """
+        只为能判断何时过期的group_by数据集物化rollup：设置了update_frequency，或者数据源是本地
+        文件（按文件修改时间判断）。远程数据源且未设置update_frequency时rollup永远不会刷新。
+        """
+        return bool(schema.group_by) and (
+            parse_update_frequency(schema.update_frequency) is not None
+            or (schema.source is not None and schema.source.type in LOCAL_SOURCE_TYPES)
+        )
+
+    @property
+    def table_expression(self) -> str:
+        return f"read_parquet('{self.path}')"
+
+    def is_available(self) -> bool:
+        return self.path.exists()
+
+    def is_outdated(self) -> bool:
+        """本地数据源文件在rollup生成之后被修改过"""
+        source_path = getattr(self.loader, "source_path", None)
+        if source_path is None:
+            return False
+        try:
+            return os.path.getmtime(source_path) > self.path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+
+    def is_fresh(self) -> bool:
+        """rollup已生成且数据源没有变化，可以代替原始数据回答查询"""
+        return self.is_available() and not self.is_outdated()
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        if not self.is_fresh():
+            return True
+        if self.update_interval is None:
+            return False
+        now = now if now is not None else time.time()
+        return self.path.stat().st_mtime + self.update_interval.total_seconds() <= now
+
+    def refresh(self) -> int:
+        """
+        在数据源上执行一次聚合查询并写入rollup文件。
+
+        Returns:
+            int: rollup的行数
+        """
+        result = self.loader.execute_query(self.query)
+
+        temp_path = make_temp_path(self.path)
+        connection = duckdb.connect()
+        try:
+            connection.register("rollup", result)
+            connection.execute(
+                f"COPY rollup TO '{temp_path}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+            )
+            # 原子替换，正在读取旧文件的查询不受影响
+            os.replace(temp_path, self.path)
+        finally:
+            connection.close()
+            temp_path.unlink(missing_ok=True)
+        return len(result)
+
+
+def make_temp_path(path: Path) -> Path:
+    """在目标文件所在目录创建唯一的临时文件，多个进程同时刷新时不会写入同一个文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    os.close(fd)
+    return Path(temp_path)
+
+
+def remove_superseded_files(directory: Union[str, Path], keep: Iterable[Union[str, Path]]) -> int:
+    """
+    删除目录中不再被任何数据集引用的rollup/快照文件（schema或数据源变化后摘要不同的旧文件），
+    以及写入进程退出后残留的临时文件。
+
+    Args:
+        directory (str | Path): rollup或快照目录
+        keep (Iterable): 当前数据集引用的文件（包括快照的状态文件）
+
+    Returns:
+        int: 删除的文件数
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return 0
+    keep = {Path(path).resolve() for path in keep}
+    now = time.time()
+    removed = 0
+    for path in directory.iterdir():
+        try:
+            if path.name.startswith("."):
+                if not path.name.endswith(".tmp") or path.stat().st_mtime + _ABANDONED_TEMP_SECONDS > now:
+                    continue
+            elif not path.name.endswith((".parquet", ".parquet.json")) or path.resolve() in keep:
+                continue
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
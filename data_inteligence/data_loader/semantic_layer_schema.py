@@ -1,8 +1,9 @@
 import re
 import yaml
 from functools import partial
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Union
 from pydantic import BaseModel, Field, field_validator, model_validator
+from sqlglot import ParseError, parse_one
 
 from data_inteligence.constants import *
 from data_inteligence.helpers.path import validate_underscore_name_format
@@ -186,6 +187,9 @@ class SQLConnectionConfig(BaseModel):
     password: str = Field(..., description="Database password")
     # postgres数据库会有schema的概念，而mysql和oracle没有
     schema: str = Field(None, description="Schema for the database server")
+    statement_timeout: Optional[int] = Field(
+        None, description="Statement timeout in seconds for queries on this source"
+    )
 
     def __eq__(self, other):
         return (
@@ -198,6 +202,27 @@ class SQLConnectionConfig(BaseModel):
         )
 
 
+class QueryGuard(BaseModel):
+    """
+    远程数据源上LLM生成查询的代价保护。
+
+    执行前先EXPLAIN，估算的行数或代价超过阈值时拒绝执行、追加LIMIT后执行，或改在本地快照上执行。
+    """
+
+    max_rows: Optional[int] = Field(
+        None, description="Maximum estimated number of result rows."
+    )
+    max_cost: Optional[float] = Field(
+        None, description="Maximum estimated plan cost, in the source's own cost units."
+    )
+    action: Literal["reject", "limit", "snapshot"] = Field(
+        "reject",
+        description="What to do when an estimate exceeds a threshold. "
+        "'snapshot' runs the query on the local snapshot of the table when one exists.",
+    )
+    limit: int = Field(10000, description="LIMIT appended when action is 'limit'.")
+
+
 class Source(BaseModel):
     type: str = Field(..., description="Type of the data source.")
     path: Optional[str] = Field(None, description="Path of the local data source.")
@@ -205,6 +230,16 @@ class Source(BaseModel):
         None, description="Connection object of the data source."
     )
     table: Optional[str] = Field(None, description="Table of the data source.")
+    guard: Optional[QueryGuard] = Field(
+        None, description="Cost guard applied to generated queries on a remote source."
+    )
+    watermark: Optional[str] = Field(
+        None,
+        description="Monotonic column (updated_at or an increasing id) used to snapshot the table incrementally.",
+    )
+    primary_key: Optional[str] = Field(
+        None, description="Key used to replace updated rows in an incremental snapshot."
+    )
 
     def is_compatible_source(self, source2: "Source"):
         """
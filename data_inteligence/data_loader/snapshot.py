@@ -0,0 +1,194 @@
+"""
+远程表的本地快照。
+
+schema中设置了 update_frequency 的远程数据集，按该频率把表同步为本地parquet文件；
+source配置了watermark列（updated_at或自增id）时只拉取watermark之后的新行，配置了
+primary_key时用新行覆盖快照中的旧版本。快照未过期时，数据集的查询改为在快照上由DuckDB执行。
+"""
+import hashlib
+import json
+import numbers
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+import duckdb
+import pandas as pd
+from sqlglot import exp
+
+from data_inteligence.constants import DEFAULT_STORGE_PATH, REMOTE_SOURCE_TYPES
+from data_inteligence.query_builders.sql_parser import SQLParser
+from .rollup import make_temp_path, parse_update_frequency
+from .semantic_layer_schema import SemanticLayerSchema
+
+if TYPE_CHECKING:
+    from .sql_loader import SQLDatasetLoader
+
+DEFAULT_SNAPSHOT_DIRECTORY = DEFAULT_STORGE_PATH / "snapshots"
+
+
+class TableSnapshot:
+    """
+    Args:
+        loader (SQLDatasetLoader): 远程数据集的loader
+        directory (str | Path): 快照文件所在目录，schema中的destination优先
+    """
+
+    def __init__(
+        self,
+        loader: "SQLDatasetLoader",
+        directory: Union[str, Path] = DEFAULT_SNAPSHOT_DIRECTORY,
+    ):
+        self.loader = loader
+        self.source = loader.schema.source
+        self.table = loader.query_builder.get_table_reference()
+        self.update_interval = parse_update_frequency(loader.schema.update_frequency)
+
+        destination = loader.schema.destination
+        if destination and destination.format == "parquet":
+            self.path = Path(destination.path).resolve()
+        else:
+            connection = self.source.connection
+            digest = hashlib.sha1(
+                json.dumps(
+                    [self.source.type, connection.host, connection.port, connection.database,
+                     connection.schema, self.table],
+                    default=str,
+                ).encode()
+            ).hexdigest()[:16]
+            self.path = (Path(directory) / f"{loader.schema.name}-{digest}.parquet").resolve()
+        self.state_path = self.path.with_name(f"{self.path.name}.json")
+
+    @staticmethod
+    def is_supported(schema: SemanticLayerSchema) -> bool:
+        """只为设置了update_frequency的远程表建立快照，group_by数据集已有rollup"""
+        return (
+            schema.source is not None
+            and schema.source.type in REMOTE_SOURCE_TYPES
+            and not schema.view
+            and not schema.group_by
+            and parse_update_frequency(schema.update_frequency) is not None
+        )
+
+    @property
+    def table_expression(self) -> str:
+        return f"read_parquet('{self.path}')"
+
+    @property
+    def files(self) -> list:
+        """快照及其增量状态文件"""
+        return [self.path, self.state_path]
+
+    @property
+    def watermark(self) -> Optional[Any]:
+        """快照中watermark列的最大值，没有增量状态时为None"""
+        if not self.state_path.exists():
+            return None
+        return json.loads(self.state_path.read_text()).get("watermark")
+
+    def is_available(self) -> bool:
+        return self.path.exists()
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        if not self.is_available():
+            return True
+        now = now if now is not None else time.time()
+        return self.path.stat().st_mtime + self.update_interval.total_seconds() <= now
+
+    def is_fresh(self) -> bool:
+        """快照在update_frequency之内同步过，可以代替远程表回答查询"""
+        return not self.is_stale()
+
+    def execute(self, query: str) -> pd.DataFrame:
+        """在快照上执行针对远程表的查询"""
+        from .local_loader import execute_local_query
+
+        table_name = exp.to_table(self.table).name
+        # 远程表的查询为通用方言，在DuckDB上执行前转换方言
+        query = SQLParser.replace_table_and_column_names(
+            query, {table_name: self.table_expression}, dialect="duckdb"
+        )
+        return execute_local_query(query, [str(self.path)])
+
+    def refresh(self) -> int:
+        """
+        同步快照，有watermark时增量拉取。
+
+        Returns:
+            int: 本次从远程表拉取的行数
+        """
+        watermark_column = self.source.watermark
+        watermark = self.watermark if self.is_available() and watermark_column else None
+
+        query = exp.select(*self._columns()).from_(exp.to_table(self.table))
+        if watermark is not None:
+            query = query.where(exp.column(watermark_column) > self._literal(watermark))
+        rows = self.loader.execute_query(query.sql())
+
+        if watermark is not None and rows.empty:
+            # 没有新数据，只更新同步时间
+            os.utime(self.path)
+            return 0
+
+        temp_path = make_temp_path(self.path)
+        connection = duckdb.connect()
+        try:
+            connection.register("increment", rows)
+            if watermark is None:
+                snapshot = "SELECT * FROM increment"
+            elif self.source.primary_key:
+                key = self.source.primary_key.replace('"', '""')
+                snapshot = (
+                    f'SELECT * FROM {self.table_expression} WHERE "{key}" NOT IN '
+                    f'(SELECT "{key}" FROM increment) '
+                    "UNION ALL BY NAME SELECT * FROM increment"
+                )
+            else:
+                snapshot = f"SELECT * FROM {self.table_expression} UNION ALL BY NAME SELECT * FROM increment"
+            connection.execute(f"COPY ({snapshot}) TO '{temp_path}' (FORMAT PARQUET, COMPRESSION ZSTD)")
+
+            if watermark_column:
+                column = watermark_column.replace('"', '""')
+                latest = connection.execute(
+                    f"SELECT MAX(\"{column}\") FROM read_parquet('{temp_path}')"
+                ).fetchone()[0]
+            # 原子替换，正在读取旧快照的查询不受影响
+            os.replace(temp_path, self.path)
+        finally:
+            connection.close()
+            temp_path.unlink(missing_ok=True)
+
+        if watermark_column:
+            self._write_state(latest)
+        return len(rows)
+
+    def _columns(self) -> list:
+        if not self.loader.schema.columns:
+            return ["*"]
+        columns = [column.name for column in self.loader.schema.columns]
+        for column in (self.source.watermark, self.source.primary_key):
+            if column and column not in columns:
+                columns.append(column)
+        return [exp.column(column) for column in columns]
+
+    def _write_state(self, watermark: Any) -> None:
+        if watermark is None:
+            return
+        if isinstance(watermark, numbers.Number):
+            value = int(watermark) if watermark == int(watermark) else float(watermark)
+            state = {"watermark": value, "type": "number"}
+        elif isinstance(watermark, date):
+            state = {"watermark": str(watermark), "type": "timestamp"}
+        else:
+            state = {"watermark": str(watermark), "type": "string"}
+        self.state_path.write_text(json.dumps(state))
+
+    def _literal(self, watermark: Any) -> exp.Expression:
+        watermark_type = json.loads(self.state_path.read_text()).get("type")
+        if watermark_type == "number":
+            return exp.Literal.number(watermark)
+        if watermark_type == "timestamp":
+            return exp.cast(exp.Literal.string(watermark), "TIMESTAMP")
+        return exp.Literal.string(watermark)
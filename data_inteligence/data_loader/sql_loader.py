@@ -1,14 +1,26 @@
 import pandas as pd
-from typing import Optional
+from typing import List, Optional
+
+from sqlglot import exp, parse_one
 
 from .loader import DatasetLoader
 from .semantic_layer_schema import SemanticLayerSchema
-from data_inteligence.exceptions import MaliciousQueryError
+from .snapshot import TableSnapshot
+from data_inteligence.constants import REMOTE_SOURCE_TYPES
+from data_inteligence.exceptions import MaliciousQueryError, QueryCostExceededError
 from data_inteligence.dataframe.virtual_dataframe import VirtualDataFrame
 from data_inteligence.query_builders import SqlQueryBuilder
 from data_inteligence.query_builders.sql_parser import SQLParser
-from data_inteligence.helpers.sql_load import load_from_mysql, load_from_postgres, load_from_oracle
-from data_inteligence.helpers.sql_sanitizer import is_sql_query_safe
+from data_inteligence.helpers.sql_load import (
+    QueryEstimate,
+    explain_mysql,
+    explain_oracle,
+    explain_postgres,
+    load_from_mysql,
+    load_from_oracle,
+    load_from_postgres,
+)
+from data_inteligence.helpers.sql_analyzer import analyze_sql_query
 
 
 class SQLDatasetLoader(DatasetLoader):
@@ -18,11 +30,47 @@ class SQLDatasetLoader(DatasetLoader):
     def __init__(self, schema: SemanticLayerSchema, dataset_path: str):
         super().__init__(schema, dataset_path)
         self._query_builder: SqlQueryBuilder = SqlQueryBuilder(schema)
+        self._snapshot: Optional[TableSnapshot] = None
     
     @property
     def query_builder(self) -> SqlQueryBuilder:
         return self._query_builder
 
+    @property
+    def snapshot(self) -> Optional[TableSnapshot]:
+        """设置了update_frequency的远程表的本地快照，其他数据集为None"""
+        if self._snapshot is None and TableSnapshot.is_supported(self.schema):
+            self._snapshot = TableSnapshot(self)
+        return self._snapshot
+
+    def _fresh_snapshot(self) -> Optional[TableSnapshot]:
+        snapshot = self.snapshot
+        return snapshot if snapshot is not None and snapshot.is_fresh() else None
+
+    @property
+    def local_sources(self) -> List[str]:
+        snapshot = self._fresh_snapshot()
+        return [str(snapshot.path)] if snapshot else super().local_sources
+
+    def get_table_reference(self) -> str:
+        """快照未过期时查询改为读取本地快照"""
+        snapshot = self._fresh_snapshot()
+        if snapshot:
+            return snapshot.table_expression
+        return super().get_table_reference()
+
+    def load_head(self, n: int = 5) -> pd.DataFrame:
+        snapshot = self._fresh_snapshot()
+        if snapshot:
+            return snapshot.execute(self.query_builder.get_head_query(n))
+        return super().load_head(n)
+
+    def get_row_count(self) -> int:
+        snapshot = self._fresh_snapshot()
+        if snapshot:
+            return int(snapshot.execute(self.query_builder.get_row_count()).iloc[0, 0])
+        return super().get_row_count()
+
     def load(self) -> VirtualDataFrame:
         return VirtualDataFrame(
             schema=self.schema,
@@ -31,15 +79,16 @@ class SQLDatasetLoader(DatasetLoader):
         )
 
     def execute_query(self, query: str, params: Optional[list] = None) -> pd.DataFrame:
-        source_type = self.schema.source.type
-        connection_info = self.schema.source.connection
+        source_type = self.source.type
+        connection_info = self.source.connection
 
         load_function = self._get_load_function(source_type)
         query = SQLParser.transpile_sql_dialect(query, to_dialect=source_type)
         
-        if not is_sql_query_safe(query, source_type):
+        verdict = analyze_sql_query(query, source_type)
+        if not verdict.safe:
             raise MaliciousQueryError(
-                "The SQL query is deemed unsafe and will not be executed."
+                f"The SQL query is deemed unsafe and will not be executed: {verdict.reason}"
             )
         try:
             if params:
@@ -50,6 +99,75 @@ class SQLDatasetLoader(DatasetLoader):
                 f"Failed to execute query for '{source_type}' with: {query}"
             ) from e
 
+    def execute_sql_query(self, query: str) -> pd.DataFrame:
+        try:
+            query = self._guard_query(query)
+        except QueryCostExceededError:
+            # 代价超限时改在本地快照上执行（即使快照已超过update_frequency）
+            snapshot = self.snapshot
+            if self.source.guard.action == "snapshot" and snapshot and snapshot.is_available():
+                return snapshot.execute(query)
+            raise
+        return self.execute_query(query)
+
+    def _guard_query(self, query: str) -> str:
+        """
+        按数据源配置的guard检查查询代价。
+
+        EXPLAIN由内部直接执行，不经过 analyze_sql_query 的关键字检查；查询本身仍会在
+        execute_query 中检查。估算超过阈值时拒绝执行、追加LIMIT，或由 execute_sql_query 改在本地快照上执行。
+        """
+        guard = self.source.guard
+        if guard is None or self.source.type not in REMOTE_SOURCE_TYPES:
+            return query
+        if guard.max_rows is None and guard.max_cost is None:
+            return query
+
+        dialect_query = SQLParser.transpile_sql_dialect(query, to_dialect=self.source.type)
+        verdict = analyze_sql_query(dialect_query, self.source.type)
+        if not verdict.safe:
+            # 不安全的查询交给execute_query拒绝，不在数据库上EXPLAIN
+            return query
+
+        explain_function = self._get_explain_function(self.source.type)
+        estimate: QueryEstimate = explain_function(self.source.connection, dialect_query)
+
+        exceeded = {}
+        if guard.max_rows is not None and estimate.rows is not None and estimate.rows > guard.max_rows:
+            exceeded["rows"] = f"estimated rows {estimate.rows:.0f} > {guard.max_rows}"
+        if guard.max_cost is not None and estimate.cost is not None and estimate.cost > guard.max_cost:
+            exceeded["cost"] = f"estimated cost {estimate.cost:.0f} > {guard.max_cost:.0f}"
+        if not exceeded:
+            return query
+
+        # LIMIT只能限制结果行数，代价超限（如全表聚合）时追加LIMIT无济于事
+        if guard.action == "limit" and "cost" not in exceeded:
+            parsed = parse_one(query)
+            limit = parsed.args.get("limit")
+            already_limited = (
+                limit is not None
+                and isinstance(limit.expression, exp.Literal)
+                and int(limit.expression.name) <= guard.limit
+            )
+            if isinstance(parsed, exp.Query) and not already_limited:
+                return parsed.limit(guard.limit).sql()
+
+        raise QueryCostExceededError(
+            f"The SQL query is too expensive for the '{self.source.type}' source "
+            f"({', '.join(exceeded.values())}). Add filters, aggregate in SQL or limit the result."
+        )
+
+    @staticmethod
+    def _get_explain_function(source_type: str):
+        if source_type == 'mysql':
+            return explain_mysql
+        elif source_type == 'postgres':
+            return explain_postgres
+        elif source_type == 'oracle':
+            return explain_oracle
+        else:
+            raise ValueError(f"Unsupported source type: {source_type}")
+
     @staticmethod
     def _get_load_function(source_type: str):
         if source_type == 'mysql':
@@ -60,13 +178,3 @@ class SQLDatasetLoader(DatasetLoader):
             return load_from_oracle
         else:
             raise ValueError(f"Unsupported source type: {source_type}")
-    
-    def load_head(self) -> pd.DataFrame:
-        query = self.query_builder.get_head_query()
-        return self.execute_query(query)
-
-    def get_row_count(self) -> int:
-        query = self.query_builder.get_row_count()
-        result = self.execute_query(query)
-        # iloc[0, 0] 用于获取查询结果的第一个行第一个列的值
-        return result.iloc[0, 0]
@@ -1,18 +1,14 @@
-from typing import Any, List, Optional
+from pathlib import Path
+from typing import Dict, List, Optional
 
-import duckdb
 import pandas as pd
 
-from pandasai.dataframe.virtual_dataframe import VirtualDataFrame
-from pandasai.query_builders import ViewQueryBuilder
-
 from ..constants import LOCAL_SOURCE_TYPES
-from ..exceptions import MaliciousQueryError
-from ..helpers.sql_sanitizer import is_sql_query_safe
+from ..dataframe.virtual_dataframe import VirtualDataFrame
 from ..query_builders.base_query_builder import BaseQueryBuilder
-from ..query_builders.sql_parser import SQLParser
-from .duck_db_connection_manager import DuckDBConnectionManager
+from ..query_builders.view_query_builder import ViewQueryBuilder
 from .loader import DatasetLoader
+from .local_loader import execute_local_query
 from .semantic_layer_schema import SemanticLayerSchema, Source
 from .sql_loader import SQLDatasetLoader
 
@@ -20,17 +16,26 @@ from .sql_loader import SQLDatasetLoader
 class ViewDatasetLoader(SQLDatasetLoader):
     """
     Loader for view-based datasets.
+
+    视图的JOIN被编译成一条SQL：依赖都是同一连接的远程表时由数据库执行，都是本地文件时由DuckDB执行。
+
+    Args:
+        schema (SemanticLayerSchema): 视图的schema
+        dataset_path (str): 视图数据集目录，依赖的本地数据集默认位于同级目录下
+        dependencies (Dict[str, DatasetLoader], optional): 已加载的依赖数据集（如远程表），key为数据集名
     """
 
-    def __init__(self, schema: SemanticLayerSchema, dataset_path: str):
+    def __init__(
+        self,
+        schema: SemanticLayerSchema,
+        dataset_path: str,
+        dependencies: Optional[Dict[str, DatasetLoader]] = None,
+    ):
         super().__init__(schema, dataset_path)
         self.dependencies_datasets = self._get_dependencies_datasets()
-        self.schema_dependencies_dict: dict[
+        self.schema_dependencies_dict: Dict[
             str, DatasetLoader
-        ] = self._get_dependencies_schemas()
-        self.source: Source = list(self.schema_dependencies_dict.values())[
-            0
-        ].schema.source
+        ] = self._get_dependencies_schemas(dependencies or {})
         self._query_builder: ViewQueryBuilder = ViewQueryBuilder(
             schema, self.schema_dependencies_dict
         )
@@ -39,32 +44,55 @@ class ViewDatasetLoader(SQLDatasetLoader):
     def query_builder(self) -> ViewQueryBuilder:
         return self._query_builder
 
+    @property
+    def source(self) -> Source:
+        return list(self.schema_dependencies_dict.values())[0].schema.source
+
+    @property
+    def local_sources(self) -> List[str]:
+        # 远程表上的视图即使依赖已有本地快照/rollup，JOIN仍然编译为远程SQL执行
+        if self.source.type not in LOCAL_SOURCE_TYPES:
+            return super().local_sources
+        return [
+            path
+            for loader in self.schema_dependencies_dict.values()
+            for path in loader.local_sources
+        ] + super().local_sources
+
     def _get_dependencies_datasets(self) -> set[str]:
         return {
             table.split(".")[0]
-            for relation in self.schema.relations
+            for relation in self.schema.relations or ()
             for table in (relation.from_, relation.to)
         } or {self.schema.columns[0].name.split(".")[0]}
 
-    def _get_dependencies_schemas(self) -> dict[str, DatasetLoader]:
+    def _get_dependencies_schemas(
+        self, dependencies: Dict[str, DatasetLoader]
+    ) -> Dict[str, DatasetLoader]:
         dependency_dict = {}
         for dep in self.dependencies_datasets:
+            if dep in dependencies:
+                dependency_dict[dep] = dependencies[dep]
+                continue
             try:
                 dependency_dict[dep] = DatasetLoader.create_loader_from_path(
-                    f"{self.org_name}/{dep}"
+                    str(Path(self.dataset_path).parent / dep)
                 )
             except FileNotFoundError:
                 raise FileNotFoundError(
-                    f"View failed to load. Missing required dataset: '{dep}'. Try pulling the dataset to resolve the issue."
+                    f"View failed to load. Missing required dataset: '{dep}'."
                 )
 
         loaders = list(dependency_dict.values())
 
+        if any(loader.schema.view for loader in loaders):
+            raise ValueError(f"Views cannot depend on other views: {self.schema.name}")
+
         if not BaseQueryBuilder.check_compatible_sources(
             [loader.schema.source for loader in loaders]
         ):
             raise ValueError(
-                f"Sources in this schemas {self.schema} are compatible for a view."
+                f"Sources in this schemas {self.schema.name} are not compatible for a view."
             )
 
         return dependency_dict
@@ -76,39 +104,7 @@ class ViewDatasetLoader(SQLDatasetLoader):
             path=self.dataset_path,
         )
 
-    def execute_local_query(
-        self, query: str, params: Optional[List[Any]] = None
-    ) -> pd.DataFrame:
-        try:
-            db_manager = DuckDBConnectionManager()
-            return db_manager.sql(query, params).df()
-        except duckdb.Error as e:
-            raise RuntimeError(f"SQL execution failed: {e}") from e
-
     def execute_query(self, query: str, params: Optional[list] = None) -> pd.DataFrame:
-        source_type = self.source.type
-        connection_info = self.source.connection
-
-        if source_type in LOCAL_SOURCE_TYPES:
-            return self.execute_local_query(query, params)
-        load_function = self._get_loader_function(source_type)
-        query = SQLParser.transpile_sql_dialect(query, to_dialect=source_type)
-
-        if not is_sql_query_safe(query, dialect=source_type):
-            raise MaliciousQueryError(
-                "The SQL query is deemed unsafe and will not be executed."
-            )
-        try:
-            if params:
-                query = query.replace(" % ", " %% ")
-            return load_function(connection_info, query, params)
-
-        except ModuleNotFoundError as e:
-            raise ImportError(
-                f"{source_type.capitalize()} connector not found. Please install the pandasai_sql[{source_type}] library, e.g. `pip install pandasai_sql[{source_type}]`."
-            ) from e
-
-        except Exception as e:
-            raise RuntimeError(
-                f"Failed to execute query for '{source_type}' with: {query}"
-            ) from e
+        if self.source.type in LOCAL_SOURCE_TYPES:
+            return execute_local_query(query, self.local_sources, params)
+        return super().execute_query(query, params)
@@ -0,0 +1,246 @@
+"""
+工作空间级别的DuckDB catalog文件。
+
+每个工作空间对应一个磁盘上的DuckDB数据库，其中只包含指向数据集parquet文件（以及远程表快照）
+的视图。数据集增删改时由DatasetController维护，worker只需以只读方式打开一个文件即可直接查询，
+无需在每次重启后重新发现并注册所有数据集。
+
+DuckDB会按路径缓存已打开的数据库实例，原地替换文件对已打开的进程不可见，因此每次修改都会
+写出新版本的catalog文件，再原子地更新CURRENT指针；读取方发现指针变化后重新打开。
+多个worker会同时修改同一个catalog，写入、切换指针和清理旧版本都在跨进程的文件锁内完成。
+
+数据集视图以 schema.name 命名，而 schema.name 由列结构决定，列相同的两个数据集会同名。catalog
+在 __view_sources 表中记录每个数据集视图指向的文件：不覆盖仍指向另一个数据集的视图，删除数据集
+时也只删除指向自身文件的视图；查询时只使用确实指向该数据集文件的视图。
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple, Union
+
+import duckdb
+
+from data_inteligence.constants import DEFAULT_STORGE_PATH
+from data_inteligence.helpers.file_lock import file_lock
+from data_inteligence.query_builders.local_query_builder import LocalQueryBuilder
+from .semantic_layer_schema import SemanticLayerSchema
+
+CATALOG_POINTER_FILE = "CURRENT"
+CATALOG_FILE_PREFIX = "catalog-"
+CATALOG_LOCK_FILE = ".lock"
+CATALOG_SOURCES_TABLE = "__view_sources"
+
+_VIEWS_QUERY = "SELECT view_name, sql FROM duckdb_views() WHERE NOT internal AND NOT temporary"
+_SOURCES_QUERY = f"SELECT name, source FROM {CATALOG_SOURCES_TABLE}"
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class WorkspaceCatalog:
+    """
+    工作空间的DuckDB catalog。
+
+    Args:
+        root (str | Path): catalog文件所在目录
+    """
+
+    # 进程内共享的只读连接: root -> (catalog文件路径, 连接, 视图名集合, 数据集视图指向的文件)
+    _connections: Dict[
+        str, Tuple[str, duckdb.DuckDBPyConnection, FrozenSet[str], Dict[str, str]]
+    ] = {}
+    _lock = threading.RLock()
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    @classmethod
+    def for_workspace(cls, workspace_id) -> "WorkspaceCatalog":
+        return cls(DEFAULT_STORGE_PATH / "catalogs" / str(workspace_id))
+
+    @property
+    def current_path(self) -> Optional[Path]:
+        """当前版本的catalog文件，尚未创建时返回None"""
+        try:
+            version = (self.root / CATALOG_POINTER_FILE).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return self.root / version if version else None
+
+    def connect(self) -> Optional[duckdb.DuckDBPyConnection]:
+        """以只读方式打开当前版本的catalog，同一版本在进程内只打开一次"""
+        entry = self._attach()
+        return entry[1] if entry else None
+
+    def cursor(self) -> Optional[duckdb.DuckDBPyConnection]:
+        """
+        返回catalog的独立游标，可在其上注册临时表而不影响其他查询。
+        游标持有数据库实例，catalog更新后仍可继续使用旧版本完成查询。
+        """
+        connection = self.connect()
+        return connection.cursor() if connection is not None else None
+
+    def view_names(self) -> FrozenSet[str]:
+        entry = self._attach()
+        return entry[2] if entry else frozenset()
+
+    def views(self) -> Dict[str, str]:
+        """catalog中所有视图的建表语句"""
+        connection = self.connect()
+        if connection is None:
+            return {}
+        return dict(connection.cursor().sql(_VIEWS_QUERY).fetchall())
+
+    def view_sources(self) -> Dict[str, str]:
+        """通过 register_dataset 创建的视图 -> 视图读取的数据集文件"""
+        entry = self._attach()
+        return dict(entry[3]) if entry else {}
+
+    def dataset_views(self, sources: Dict[str, Iterable[str]]) -> FrozenSet[str]:
+        """
+        可以直接用于查询的数据集视图。
+
+        Args:
+            sources (Dict[str, Iterable[str]]): 数据集名 -> 数据集读取的本地文件
+
+        Returns:
+            FrozenSet[str]: 确实指向对应数据集文件的视图名；同名视图属于另一个数据集时不返回
+        """
+        registered = self.view_sources()
+        return frozenset(
+            name for name, files in sources.items() if registered.get(name) in set(files)
+        )
+
+    def register_view(self, name: str, table_expression: str) -> None:
+        """创建或替换视图 name，指向表表达式（如 read_parquet('...')）"""
+        self._update(upserts={name: _view_statement(name, table_expression)})
+
+    def register_dataset(self, schema: SemanticLayerSchema, dataset_path: str) -> bool:
+        """
+        为本地数据集创建以 schema.name 命名的视图。
+
+        Returns:
+            bool: 同名视图仍指向另一个存在的数据集文件时不覆盖，返回False
+        """
+        builder = LocalQueryBuilder(schema, dataset_path)
+        statement = _view_statement(schema.name, builder._get_table_expression())
+        return self._update(upserts={schema.name: statement}, source=builder.source_path)
+
+    def drop_dataset(self, schema: SemanticLayerSchema, dataset_path: str) -> None:
+        """删除数据集的视图，同名视图属于另一个数据集时保留"""
+        source = LocalQueryBuilder(schema, dataset_path).source_path
+        if self.view_sources().get(schema.name) == source:
+            self._update(drops=[schema.name], source=source)
+
+    def drop_view(self, name: str) -> None:
+        if name in self.views():
+            self._update(drops=[name])
+
+    def _attach(
+        self,
+    ) -> Optional[Tuple[str, duckdb.DuckDBPyConnection, FrozenSet[str], Dict[str, str]]]:
+        path = self.current_path
+        if path is None:
+            return None
+
+        key = str(self.root.resolve())
+        with self._lock:
+            entry = self._connections.get(key)
+            if entry is not None and entry[0] == str(path):
+                return entry
+
+            # 旧连接直接丢弃：仍在执行的游标会保持旧版本数据库可用
+            connection = duckdb.connect(str(path), read_only=True)
+            names = frozenset(name for name, _ in connection.sql(_VIEWS_QUERY).fetchall())
+            entry = (str(path), connection, names, _read_sources(connection))
+            self._connections[key] = entry
+            return entry
+
+    def _update(
+        self,
+        upserts: Optional[Dict[str, str]] = None,
+        drops: Iterable[str] = (),
+        source: Optional[str] = None,
+    ) -> bool:
+        """
+        写出新版本的catalog。source为数据集文件时，upserts中的视图记录为指向该文件，
+        已记录为指向另一个仍存在的文件的视图不会被覆盖或删除，此时不做任何修改并返回False；
+        source为None时按视图名直接修改。
+        """
+        upserts = upserts or {}
+        # 进程内的锁保护连接缓存，文件锁保证其他worker不会基于同一旧版本写入而丢失视图
+        with self._lock, file_lock(self.root / CATALOG_LOCK_FILE):
+            views = self.views()
+            sources = self.view_sources()
+            for name in [*upserts, *drops] if source is not None else ():
+                registered = sources.get(name)
+                if registered not in (None, source) and os.path.exists(registered):
+                    return False
+
+            views.update(upserts)
+            for name in upserts:
+                if source is not None:
+                    sources[name] = source
+                else:
+                    sources.pop(name, None)
+            for name in drops:
+                views.pop(name, None)
+                sources.pop(name, None)
+
+            version = f"{CATALOG_FILE_PREFIX}{time.time_ns()}.duckdb"
+            connection = duckdb.connect(str(self.root / version))
+            try:
+                for statement in views.values():
+                    connection.execute(statement)
+                connection.execute(
+                    f"CREATE TABLE {CATALOG_SOURCES_TABLE} (name VARCHAR PRIMARY KEY, source VARCHAR)"
+                )
+                if sources:
+                    connection.executemany(
+                        f"INSERT INTO {CATALOG_SOURCES_TABLE} VALUES (?, ?)", list(sources.items())
+                    )
+            finally:
+                connection.close()
+
+            pointer = self.root / CATALOG_POINTER_FILE
+            temp_pointer = self.root / f".{CATALOG_POINTER_FILE}.tmp"
+            temp_pointer.write_text(version)
+            os.replace(temp_pointer, pointer)
+            self._remove_stale_versions(keep=version)
+            return True
+
+    def _remove_stale_versions(self, keep: str) -> None:
+        """
+        删除比当前版本旧的catalog文件（及其wal），只在持有文件锁时调用。
+        已打开旧版本的进程在文件删除后仍可继续读取（POSIX语义）。
+        """
+        current = _version_number(keep)
+        for path in self.root.glob(f"{CATALOG_FILE_PREFIX}*"):
+            if path.name.startswith(keep):
+                continue
+            version = _version_number(path.name)
+            if version is not None and current is not None and version < current:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+def _view_statement(name: str, table_expression: str) -> str:
+    return f"CREATE VIEW {_quote_identifier(name)} AS SELECT * FROM {table_expression}"
+
+
+def _read_sources(connection: duckdb.DuckDBPyConnection) -> Dict[str, str]:
+    try:
+        return dict(connection.sql(_SOURCES_QUERY).fetchall())
+    except duckdb.CatalogException:
+        # 记录视图来源之前写出的catalog
+        return {}
+
+
+def _version_number(name: str) -> Optional[int]:
+    """catalog-<time_ns>.duckdb[.wal] 中的版本号"""
+    stem = name[len(CATALOG_FILE_PREFIX):].split(".", 1)[0]
+    return int(stem) if stem.isdigit() else None
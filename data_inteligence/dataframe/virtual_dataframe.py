@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, List, Optional
 import pandas as pd
 
 from data_inteligence.dataframe.base import DataFrame
 
 if TYPE_CHECKING:
-    from data_inteligence.data_loader.sql_loader import SQLDatasetLoader
+    from data_inteligence.data_loader.loader import DatasetLoader
     
 
 class VirtualDataFrame(DataFrame):
@@ -22,7 +22,7 @@ class VirtualDataFrame(DataFrame):
     ]
 
     def __init__(self, *args, **kwargs):
-        self._loader: Optional[SQLDatasetLoader] = kwargs.pop("data_loader", None)
+        self._loader: Optional[DatasetLoader] = kwargs.pop("data_loader", None)
         if not self._loader:
             raise NameError("Data loader is required for virtualization!")
         self._head = None
@@ -32,7 +32,9 @@ class VirtualDataFrame(DataFrame):
             **kwargs,
         )
 
-    def head(self):
+    def head(self, n: int = 5):
+        if n != 5:
+            return self._loader.load_head(n)
         if self._head is None:
             self._head = self._loader.load_head()
         return self._head
@@ -44,8 +46,8 @@ class VirtualDataFrame(DataFrame):
         2、对表格数据的空值进行处理
         3、若某些行的内容过多，请截断，小于200字
         """
-        # 随机获取10条数据，要求包含有空值的行和无空值的行
-        df = self._loader
+        # 随机获取10条数据，要求包含有空值的行和无空值的行（只从有限的行中抽样，避免加载全量数据）
+        df = self._loader.load_head(200)
         nan_rows = df[df.isnull().any(axis=1)]  # 含空值的行
         non_nan_rows = df[~df.isnull().any(axis=1)]  # 无空值的行
 
@@ -78,10 +80,29 @@ class VirtualDataFrame(DataFrame):
     def rows_count(self) -> int:
         return self._loader.get_row_count()
 
+    @property
+    def columns_count(self) -> int:
+        if self.schema.columns:
+            return len(self.schema.columns)
+        return len(self.head().columns)
+
     @property
     def query_builder(self):
         return self._loader.query_builder
 
+    @property
+    def source(self):
+        """实际执行查询的数据源（视图为其依赖数据集的数据源）"""
+        return self._loader.source
+
+    @property
+    def local_sources(self) -> List[str]:
+        """本地数据集（含本地数据集上的视图）需要读取的文件"""
+        return self._loader.local_sources
+
+    def get_table_reference(self) -> str:
+        return self._loader.get_table_reference()
+
     def execute_sql_query(self, query: str) -> pd.DataFrame:
-        return self._loader.execute_query(query)
+        return self._loader.execute_sql_query(query)
 
@@ -42,3 +42,43 @@ class NoCodeFoundError(Exception):
     Args:
         Exception (Exception): NoCodeFoundError
     """
+
+class QueryCostExceededError(Exception):
+    """
+    Raised when the estimated cost of a query on a remote source exceeds the configured guard.
+
+    Args:
+        Exception (Exception): QueryCostExceededError
+    """
+
+class ResourceLimitError(CodeExecutionError):
+    """
+    Raised when generated code exceeds a resource limit of its execution.
+
+    Args:
+        CodeExecutionError (Exception): ResourceLimitError
+    """
+
+class ExecutionTimeoutError(ResourceLimitError):
+    """
+    Raised when generated code exceeds the wall time or CPU time limit.
+
+    Args:
+        ResourceLimitError (Exception): ExecutionTimeoutError
+    """
+
+class MemoryLimitError(ResourceLimitError):
+    """
+    Raised when generated code exceeds the memory limit.
+
+    Args:
+        ResourceLimitError (Exception): MemoryLimitError
+    """
+
+class ResultTooLargeError(ResourceLimitError):
+    """
+    Raised when the result of generated code exceeds the row or size limit.
+
+    Args:
+        ResourceLimitError (Exception): ResultTooLargeError
+    """
@@ -0,0 +1,110 @@
+"""
+带命中率统计的线程安全LRU缓存。
+
+用于SQL方言转换、表名替换、安全判定等纯函数结果的缓存；按名称注册的缓存可以通过
+cache_stats() 汇总命中率，供监控接口读取。
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_REGISTRY: Dict[str, "LRUCache"] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+@dataclass
+class CacheStats:
+    """缓存的命中统计"""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+    max_size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class LRUCache:
+    """
+    Args:
+        max_size (int): 最大条目数，为0时不缓存（只统计未命中）
+        name (str, optional): 注册名称，设置后可在 cache_stats() 中查看
+    """
+
+    def __init__(self, max_size: int = 1024, name: Optional[str] = None):
+        self.max_size = max_size
+        self.name = name
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        if name:
+            with _REGISTRY_LOCK:
+                _REGISTRY[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self._hits += 1
+                return self._data[key]
+            self._misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        返回缓存值，未命中时调用compute计算并写入缓存。
+
+        compute在锁外执行，并发未命中时可能重复计算，结果以最后写入的为准。
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._data),
+                max_size=self.max_size,
+            )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """所有已注册缓存的命中统计"""
+    with _REGISTRY_LOCK:
+        caches = dict(_REGISTRY)
+    return {name: cache.stats.to_dict() for name, cache in sorted(caches.items())}
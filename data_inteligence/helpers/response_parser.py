@@ -80,7 +80,9 @@ class ResponseParser(IResponseParser):
         if (
             self._context._config.open_charts
             and isinstance(result["value"], str)
-            and "data:image/png;base64" not in result["value"]
+            # data URI（内存中捕获的图表）和PIL无法打开的SVG不在本地显示
+            and not result["value"].startswith("data:")
+            and not result["value"].lower().endswith(".svg")
         ):
             with Image.open(result["value"]) as img:
                 img.show()
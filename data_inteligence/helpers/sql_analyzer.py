@@ -0,0 +1,333 @@
+"""
+基于sqlglot AST的SQL安全分析器。
+
+对LLM生成的SQL只解析一次，然后按白名单遍历语法树（包括节点类型和函数），给出结构化的判定
+结果（拒绝原因、触发拒绝的节点），判定结果按查询原文的哈希缓存。
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, Optional
+
+import sqlglot
+from sqlglot import exp
+
+from .lru_cache import LRUCache
+
+PLACEHOLDER = "___PLACEHOLDER___"
+
+
+@dataclass(frozen=True)
+class SQLSafetyVerdict:
+    """SQL安全判定结果"""
+
+    safe: bool
+    reason: Optional[str] = None
+    node: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return self.safe
+
+
+def _exp_types(*names: str) -> tuple:
+    """按名称获取sqlglot表达式类型，忽略当前sqlglot版本中不存在的类型"""
+    return tuple(getattr(exp, name) for name in names if hasattr(exp, name))
+
+
+# 查询结构中允许出现的节点类型（函数、运算符和谓词单独处理）
+ALLOWED_NODE_TYPES = _exp_types(
+    "Select", "Union", "Intersect", "Except", "Subquery", "With", "CTE",
+    "From", "Join", "Lateral", "Where", "Group", "Having", "Qualify", "Order",
+    "Ordered", "Limit", "LimitOptions", "Offset", "Fetch", "Distinct", "Table", "TableAlias",
+    "TableSample", "Alias", "Aliases", "Column", "Identifier", "Star", "Literal",
+    "Null", "Boolean", "Placeholder", "Parameter", "Paren", "Tuple", "Array",
+    "Bracket", "Dot", "Var", "DataType", "DataTypeParam", "Interval", "IntervalSpan",
+    "Window", "WindowSpec", "Case", "If", "Cube", "Rollup", "GroupingSets",
+    "Values", "Pivot", "Unpivot", "PivotAlias", "Lambda", "Kwarg", "PropertyEQ",
+    "Slice", "Hint", "Filter", "WithinGroup", "IgnoreNulls", "RespectNulls",
+    "HavingMax", "Unnest", "Exists", "Any", "All", "JSONPath", "JSONPathKey",
+    "JSONPathRoot", "JSONPathSubscript", "JSONPathWildcard", "Semicolon",
+)
+
+# 读取文件的表函数，仅允许读取数据集自身的文件（trusted_sources）
+FILE_READER_TYPES = _exp_types("ReadCSV", "ReadParquet")
+FILE_READER_FUNCTIONS = frozenset(
+    {
+        "read_csv", "read_csv_auto", "read_parquet", "parquet_scan", "read_excel",
+        "read_xlsx", "read_json", "read_json_auto", "read_ndjson", "read_text",
+        "read_blob", "st_read", "sniff_csv", "glob",
+    }
+)
+
+# 允许的聚合函数和窗口函数（sqlglot已知类型，与方言无关）
+ALLOWED_AGGREGATE_TYPES = _exp_types(
+    "Count", "CountIf", "Sum", "Avg", "Min", "Max", "Median", "Mode", "AnyValue",
+    "ArgMax", "ArgMin", "First", "Last", "Stddev", "StddevPop", "StddevSamp", "Variance",
+    "VariancePop", "Corr", "CovarPop", "CovarSamp", "Kurtosis", "Skewness", "Quantile",
+    "PercentileCont", "PercentileDisc", "ApproxDistinct", "ApproxQuantile", "GroupConcat",
+    "ArrayAgg", "LogicalAnd", "LogicalOr", "Grouping", "GroupingId", "BitwiseAndAgg",
+    "BitwiseOrAgg", "BitwiseXorAgg", "RegrSlope", "RegrIntercept", "RegrR2", "RegrCount",
+    "RowNumber", "Rank", "DenseRank", "PercentRank", "CumeDist", "Ntile", "Lag", "Lead",
+    "FirstValue", "LastValue", "NthValue",
+)
+
+# 允许的标量函数（sqlglot已知类型，与方言无关）
+ALLOWED_SCALAR_TYPES = _exp_types(
+    # 类型转换与条件
+    "Cast", "TryCast", "Case", "If", "Coalesce", "Nullif", "Greatest", "Least", "Nvl2",
+    # 数值
+    "Abs", "Round", "Ceil", "Floor", "Sqrt", "Cbrt", "Pow", "Exp", "Ln", "Log", "Sign",
+    "Trunc", "Mod", "Pi", "Radians", "Degrees", "Sin", "Cos", "Tan", "Asin", "Acos",
+    "Atan", "Atan2", "Rand",
+    # 字符串
+    "Lower", "Upper", "Initcap", "Trim", "Length", "Substring", "Left", "Right", "Concat",
+    "ConcatWs", "Replace", "Translate", "SplitPart", "Split", "StrPosition", "Pad",
+    "Reverse", "Repeat", "Ascii", "Chr", "Unicode", "StartsWith", "EndsWith", "Contains",
+    "RegexpLike", "RegexpILike", "RegexpExtract", "RegexpExtractAll", "RegexpReplace",
+    "RegexpSplit", "Format", "MD5", "SHA", "SHA2", "Hex", "Unhex", "LowerHex",
+    # 日期时间
+    "Extract", "Year", "Quarter", "Month", "Week", "WeekOfYear", "Day", "DayOfWeek",
+    "DayOfWeekIso", "DayOfMonth", "DayOfYear", "Hour", "Minute", "Second", "Date",
+    "CurrentDate", "CurrentTime", "CurrentTimestamp", "CurrentDatetime", "DateTrunc",
+    "TimestampTrunc", "DatetimeTrunc", "TimeTrunc", "DateAdd", "DateSub", "DateDiff",
+    "DatetimeAdd", "DatetimeSub", "DatetimeDiff", "TimestampAdd", "TimestampSub",
+    "TimestampDiff", "TimeAdd", "TimeSub", "TimeDiff", "TsOrDsAdd", "TsOrDsDiff",
+    "TsOrDsToDate", "TsOrDsToTimestamp", "DateFromParts", "TimeFromParts",
+    "TimestampFromParts", "StrToDate", "StrToTime", "StrToUnix", "TimeToStr",
+    "TimeStrToTime", "TimeStrToDate", "TimeStrToUnix", "TimeToTimeStr", "TimeToUnix",
+    "UnixToTime", "UnixToStr", "UnixToTimeStr", "DateStrToDate", "DateToDateStr",
+    "DateToDi", "DiToDate", "LastDay", "MonthsBetween", "AddMonths", "ToChar", "ToNumber",
+    "ToDouble", "GenerateDateArray", "GenerateSeries", "ExplodingGenerateSeries",
+    # 数组、结构体、JSON
+    "Array", "ArraySize", "ArrayContains", "ArrayFilter", "ArrayToString", "Explode",
+    "Struct", "StructExtract", "JSONExtract", "JSONExtractScalar", "JSONBExtract",
+    "JSONBExtractScalar", "JSONFormat", "ParseJSON",
+)
+
+# sqlglot不认识（Anonymous）但各方言中常用且安全的函数，按方言分别允许
+_COMMON_ALLOWED_FUNCTIONS = frozenset(
+    {"now", "date_part", "age", "to_date", "to_timestamp", "trunc", "nvl", "ifnull"}
+)
+ALLOWED_FUNCTIONS = {
+    "postgres": _COMMON_ALLOWED_FUNCTIONS
+    | {
+        "to_char", "date_bin", "make_date", "make_timestamp", "justify_days",
+        "justify_interval", "width_bucket", "btrim", "ltrim", "rtrim", "lpad", "rpad",
+        "position", "strpos", "string_to_array", "array_to_string", "array_length",
+        "cardinality", "regexp_match", "jsonb_array_length", "json_array_length",
+    },
+    "mysql": _COMMON_ALLOWED_FUNCTIONS
+    | {
+        "date_format", "str_to_date", "timestampdiff", "timestampadd", "datediff",
+        "yearweek", "weekday", "dayname", "monthname", "from_unixtime", "unix_timestamp",
+        "curdate", "curtime", "sysdate", "makedate", "period_diff", "locate", "instr",
+        "lpad", "rpad", "ltrim", "rtrim", "field", "elt", "truncate", "json_length",
+    },
+    "oracle": _COMMON_ALLOWED_FUNCTIONS
+    | {"to_char", "decode", "instr", "lpad", "rpad", "ltrim", "rtrim", "sysdate"},
+    "duckdb": _COMMON_ALLOWED_FUNCTIONS
+    | {
+        "date_diff", "datediff", "date_sub", "datesub", "date_add", "time_bucket",
+        "make_date", "make_time", "make_timestamp", "dayname", "monthname", "isodow",
+        "isoyear", "yearweek", "epoch_ms", "strptime", "try_strptime", "list_value",
+        "list_contains", "list_aggregate", "len", "ltrim", "rtrim", "lpad", "rpad",
+        "position", "instr", "strpos", "prefix", "suffix", "string_split", "regexp_full_match",
+        "bar", "histogram", "arbitrary", "quantile_cont", "quantile_disc", "approx_quantile",
+        "fsum", "favg", "product", "geomean", "entropy", "list", "array_length",
+    },
+}
+
+# 以SQL字符串为参数、在数据库内执行任意查询的表函数，即使参数来自数据集也不允许
+QUERY_FUNCTIONS = frozenset({"query", "query_table"})
+
+# 系统库/系统表（及同名前缀的系统函数），禁止访问
+DENIED_SCHEMAS = frozenset(
+    {"information_schema", "pg_catalog", "mysql", "performance_schema", "sys", "sysibm"}
+)
+DENIED_TABLE_PREFIXES = ("pg_", "duckdb_", "sqlite_", "v$")
+
+
+class SQLSafetyAnalyzer:
+    """
+    对SQL查询做一次AST遍历，判断其是否只包含安全的只读查询结构。
+
+    Args:
+        cache_size (int): 判定结果缓存的最大条目数
+        name (str, optional): 缓存的注册名称，设置后命中率会出现在监控指标中
+    """
+
+    def __init__(self, cache_size: int = 2048, name: Optional[str] = None):
+        self._cache = LRUCache(max_size=cache_size, name=name)
+
+    @staticmethod
+    def cache_key(
+        query: str, dialect: str, trusted_sources: FrozenSet[str] = frozenset()
+    ) -> str:
+        # 按原文计算，不能折叠空白：换行决定了 `--` 注释的范围，字符串字面量中的空白也有意义
+        payload = "\0".join([dialect or "", query, *sorted(trusted_sources)])
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def analyze(
+        self,
+        query: str,
+        dialect: str = "postgres",
+        trusted_sources: Optional[Iterable[str]] = None,
+    ) -> SQLSafetyVerdict:
+        """
+        分析SQL查询的安全性，结果会被缓存。
+
+        Args:
+            query (str): 待分析的SQL
+            dialect (str): SQL方言
+            trusted_sources (Iterable[str], optional): 允许通过read_parquet等表函数读取的文件路径
+
+        Returns:
+            SQLSafetyVerdict: 判定结果
+        """
+        trusted = frozenset(str(source) for source in trusted_sources or ())
+        key = self.cache_key(query, dialect, trusted)
+        return self._cache.get_or_compute(key, lambda: self._analyze(query, dialect, trusted))
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def _analyze(
+        self, query: str, dialect: str, trusted_sources: FrozenSet[str]
+    ) -> SQLSafetyVerdict:
+        # '%s'(MySQL, Psycopg2) 占位符替换为sqlglot可解析的标识符
+        temp_query = query.replace("%s", PLACEHOLDER)
+        try:
+            statements = [
+                stmt for stmt in sqlglot.parse(temp_query, dialect=dialect) if stmt
+            ]
+        except sqlglot.errors.SqlglotError as e:
+            return SQLSafetyVerdict(False, f"Failed to parse SQL query: {e}")
+
+        if len(statements) != 1:
+            return SQLSafetyVerdict(
+                False, "Exactly one SQL statement is allowed per query."
+            )
+
+        root = statements[0]
+        if not isinstance(root, (exp.Select, exp.SetOperation)):
+            return SQLSafetyVerdict(
+                False, "Only SELECT queries are allowed.", root.key.upper()
+            )
+
+        allowed_functions = ALLOWED_FUNCTIONS.get(dialect, _COMMON_ALLOWED_FUNCTIONS)
+        for node in root.walk():
+            verdict = self._check_node(node, allowed_functions, trusted_sources)
+            if verdict is not None:
+                return verdict
+
+        return SQLSafetyVerdict(True)
+
+    def _check_node(
+        self,
+        node: exp.Expression,
+        allowed_functions: FrozenSet[str],
+        trusted_sources: FrozenSet[str],
+    ) -> Optional[SQLSafetyVerdict]:
+        for comment in node.comments or ():
+            # MySQL可执行注释 /*! ... */ 会被数据库执行
+            if comment.lstrip().startswith("!"):
+                return SQLSafetyVerdict(
+                    False, "Executable comments are not allowed.", comment
+                )
+
+        if isinstance(node, FILE_READER_TYPES) or (
+            isinstance(node, exp.Anonymous) and node.name.lower() in FILE_READER_FUNCTIONS
+        ):
+            return self._check_file_reader(node, trusted_sources)
+
+        if isinstance(node, exp.Func):
+            return self._check_function(node, allowed_functions)
+
+        if isinstance(node, exp.Table):
+            return self._check_table(node)
+
+        if isinstance(node, (exp.Binary, exp.Unary, exp.Predicate, exp.Connector)):
+            return None
+
+        if isinstance(node, ALLOWED_NODE_TYPES):
+            return None
+
+        return SQLSafetyVerdict(
+            False, f"SQL construct '{type(node).__name__}' is not allowed.", node.sql()
+        )
+
+    @staticmethod
+    def _check_function(
+        node: exp.Func, allowed_functions: FrozenSet[str]
+    ) -> Optional[SQLSafetyVerdict]:
+        if isinstance(node, exp.Anonymous):
+            name = node.name.lower()
+            if name in QUERY_FUNCTIONS:
+                return SQLSafetyVerdict(
+                    False, "Executing nested query strings is not allowed.", node.sql()
+                )
+            if name in allowed_functions:
+                return None
+            return SQLSafetyVerdict(False, f"Function '{node.name}' is not allowed.", node.sql())
+
+        if isinstance(node, (ALLOWED_AGGREGATE_TYPES, ALLOWED_SCALAR_TYPES)):
+            return None
+        return SQLSafetyVerdict(
+            False, f"Function '{node.sql_name()}' is not allowed.", node.sql()
+        )
+
+    @staticmethod
+    def _check_table(node: exp.Table) -> Optional[SQLSafetyVerdict]:
+        # FROM '/etc/passwd' 或 FROM "data.csv"：DuckDB会把字符串/带路径的标识符当作文件读取
+        if isinstance(node.this, exp.Literal) or (
+            isinstance(node.this, exp.Identifier)
+            and node.this.quoted
+            and any(char in node.name for char in "/\\.")
+        ):
+            return SQLSafetyVerdict(
+                False, "Reading files outside of the registered datasets is not allowed.", node.sql()
+            )
+        schema_names = {part.lower() for part in (node.db, node.catalog) if part}
+        if schema_names & DENIED_SCHEMAS:
+            return SQLSafetyVerdict(
+                False, "Access to system schemas is not allowed.", node.sql()
+            )
+        # 常见系统视图（pg_user、duckdb_settings等）
+        if node.name and node.name.lower().startswith(DENIED_TABLE_PREFIXES):
+            return SQLSafetyVerdict(
+                False, f"Access to system table '{node.name}' is not allowed.", node.sql()
+            )
+        return None
+
+    @staticmethod
+    def _check_file_reader(
+        node: exp.Expression, trusted_sources: FrozenSet[str]
+    ) -> Optional[SQLSafetyVerdict]:
+        if isinstance(node, exp.Anonymous):
+            arguments = list(node.expressions)
+        else:
+            arguments = [node.this, *node.expressions]
+        path = next(
+            (arg.this for arg in arguments if isinstance(arg, exp.Literal) and arg.is_string),
+            None,
+        )
+        if path is not None and path in trusted_sources:
+            return None
+        return SQLSafetyVerdict(
+            False, "Reading files outside of the registered datasets is not allowed.", node.sql()
+        )
+
+
+_default_analyzer = SQLSafetyAnalyzer(name="sql_safety")
+
+
+def get_sql_safety_analyzer() -> SQLSafetyAnalyzer:
+    return _default_analyzer
+
+
+def analyze_sql_query(
+    query: str,
+    dialect: str = "postgres",
+    trusted_sources: Optional[Iterable[str]] = None,
+) -> SQLSafetyVerdict:
+    """使用默认分析器（带缓存）分析SQL查询"""
+    return _default_analyzer.analyze(query, dialect, trusted_sources)
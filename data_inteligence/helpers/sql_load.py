@@ -1,51 +1,63 @@
+import json
+import uuid
 import pandas as pd
 import warnings
+from dataclasses import dataclass
 from typing import Optional
 from data_inteligence.data_loader.semantic_layer_schema import SQLConnectionConfig
 
 
-def load_from_mysql(
-    connection_info: SQLConnectionConfig, query: str, params: Optional[list] = None
-):
+@dataclass
+class QueryEstimate:
+    """
+    数据库EXPLAIN给出的查询估算。
+
+    rows为计划根节点估算的结果行数，cost为根节点的总代价（各数据库的代价单位不同）。
+    """
+
+    rows: Optional[float] = None
+    cost: Optional[float] = None
+
+
+def _connect_mysql(connection_info: SQLConnectionConfig):
     import pymysql
 
-    conn = pymysql.connect(
+    kwargs = {}
+    if connection_info.statement_timeout:
+        # MAX_EXECUTION_TIME只对SELECT生效，read_timeout兜底网络等待
+        kwargs["read_timeout"] = connection_info.statement_timeout
+        kwargs["init_command"] = (
+            f"SET SESSION MAX_EXECUTION_TIME={connection_info.statement_timeout * 1000}"
+        )
+    return pymysql.connect(
         host=connection_info.host,
         user=connection_info.user,
         password=connection_info.password,
         database=connection_info.database,
         port=connection_info.port,
+        **kwargs,
     )
-    # Suppress warnings of SqlAlchemy
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", category=UserWarning)
-        return pd.read_sql(query, conn, params=params)
 
 
-def load_from_postgres(
-    connection_info: SQLConnectionConfig, query: str, params: Optional[list] = None
-):
+def _connect_postgres(connection_info: SQLConnectionConfig):
     import psycopg2
 
     # 如果没有指定schema，默认使用public schema
     schema = connection_info.schema or "public"
-    conn = psycopg2.connect(
+    options = f"-c search_path={schema}"
+    if connection_info.statement_timeout:
+        options += f" -c statement_timeout={connection_info.statement_timeout * 1000}"
+    return psycopg2.connect(
         host=connection_info.host,
         user=connection_info.user,
         password=connection_info.password,
         dbname=connection_info.database,
         port=connection_info.port,
-        options=f"-c search_path={schema}",
+        options=options,
     )
-    # Suppress warnings of SqlAlchemy
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", category=UserWarning)
-        return pd.read_sql(query, conn, params=params)
 
 
-def load_from_oracle(
-    connection_info: SQLConnectionConfig, query: str, params: Optional[list] = None
-):
+def _connect_oracle(connection_info: SQLConnectionConfig):
     import cx_Oracle
 
     dsn = cx_Oracle.makedsn(
@@ -56,7 +68,99 @@ def load_from_oracle(
         password=connection_info.password,
         dsn=dsn,
     )
-    # Suppress warnings of SqlAlchemy
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", category=UserWarning)
-        return pd.read_sql(query, conn, params=params)
+    if connection_info.statement_timeout:
+        conn.call_timeout = connection_info.statement_timeout * 1000
+    return conn
+
+
+def _read_sql(conn, query: str, params: Optional[list] = None) -> pd.DataFrame:
+    try:
+        # Suppress warnings of SqlAlchemy
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=UserWarning)
+            return pd.read_sql(query, conn, params=params)
+    finally:
+        conn.close()
+
+
+def load_from_mysql(
+    connection_info: SQLConnectionConfig, query: str, params: Optional[list] = None
+):
+    return _read_sql(_connect_mysql(connection_info), query, params)
+
+
+def load_from_postgres(
+    connection_info: SQLConnectionConfig, query: str, params: Optional[list] = None
+):
+    return _read_sql(_connect_postgres(connection_info), query, params)
+
+
+def load_from_oracle(
+    connection_info: SQLConnectionConfig, query: str, params: Optional[list] = None
+):
+    return _read_sql(_connect_oracle(connection_info), query, params)
+
+
+def explain_mysql(
+    connection_info: SQLConnectionConfig, query: str, params: Optional[list] = None
+) -> QueryEstimate:
+    result = load_from_mysql(connection_info, f"EXPLAIN FORMAT=JSON {query}", params)
+    plan = json.loads(result.iloc[0, 0])["query_block"]
+    cost = plan.get("cost_info", {}).get("query_cost")
+
+    # 嵌套循环JOIN中最后一张表的 rows_produced_per_join 即JOIN的估算行数，这里取所有表的最大值
+    rows = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            table = node.get("table")
+            if isinstance(table, dict) and "rows_produced_per_join" in table:
+                rows.append(float(table["rows_produced_per_join"]))
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+    return QueryEstimate(
+        rows=max(rows) if rows else None,
+        cost=float(cost) if cost is not None else None,
+    )
+
+
+def explain_postgres(
+    connection_info: SQLConnectionConfig, query: str, params: Optional[list] = None
+) -> QueryEstimate:
+    result = load_from_postgres(connection_info, f"EXPLAIN (FORMAT JSON) {query}", params)
+    plan = result.iloc[0, 0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    plan = plan[0]["Plan"]
+    return QueryEstimate(rows=float(plan["Plan Rows"]), cost=float(plan["Total Cost"]))
+
+
+def explain_oracle(
+    connection_info: SQLConnectionConfig, query: str, params: Optional[list] = None
+) -> QueryEstimate:
+    # EXPLAIN PLAN把计划写入PLAN_TABLE，需要在同一个连接中读取
+    statement_id = uuid.uuid4().hex[:30]
+    conn = _connect_oracle(connection_info)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {query}", params or [])
+        cursor.execute(
+            "SELECT CARDINALITY, COST FROM PLAN_TABLE WHERE STATEMENT_ID = :1 AND ID = 0",
+            [statement_id],
+        )
+        row = cursor.fetchone()
+        cursor.execute("DELETE FROM PLAN_TABLE WHERE STATEMENT_ID = :1", [statement_id])
+        conn.commit()
+    finally:
+        conn.close()
+
+    if row is None:
+        return QueryEstimate()
+    rows, cost = row
+    return QueryEstimate(
+        rows=float(rows) if rows is not None else None,
+        cost=float(cost) if cost is not None else None,
+    )
@@ -1,10 +1,12 @@
 import os
 import re
+from typing import Iterable, Optional
 
-import sqlglot
 from sqlglot import parse_one
 from sqlglot.optimizer.qualify_columns import quote_identifiers
 
+from .sql_analyzer import analyze_sql_query
+
 
 def sanitize_view_column_name(relation_name: str) -> str:
     return (
@@ -37,78 +39,18 @@ def sanitize_file_name(filepath: str) -> str:
     return sanitize_sql_table_name(file_name).lower()
 
 
-def is_sql_query_safe(query: str, dialect: str = "postgres") -> bool:
-    try:
-        # List of infected keywords to block (you can add more)
-        infected_keywords = [
-            r"\bINSERT\b",
-            r"\bUPDATE\b",
-            r"\bDELETE\b",
-            r"\bDROP\b",
-            r"\bEXEC\b",
-            r"\bALTER\b",
-            r"\bCREATE\b",
-            r"\bMERGE\b",
-            r"\bREPLACE\b",
-            r"\bTRUNCATE\b",
-            r"\bLOAD\b",
-            r"\bGRANT\b",
-            r"\bREVOKE\b",
-            r"\bCALL\b",
-            r"\bEXECUTE\b",
-            r"\bSHOW\b",
-            r"\bDESCRIBE\b",
-            r"\bEXPLAIN\b",
-            r"\bUSE\b",
-            r"\bSET\b",
-            r"\bDECLARE\b",
-            r"\bOPEN\b",
-            r"\bFETCH\b",
-            r"\bCLOSE\b",
-            r"\bSLEEP\b",
-            r"\bBENCHMARK\b",
-            r"\bDATABASE\b",
-            r"\bUSER\b",
-            r"\bCURRENT_USER\b",
-            r"\bSESSION_USER\b",
-            r"\bSYSTEM_USER\b",
-            r"\bVERSION\b",
-            r"\b@@VERSION\b",
-            r"--",
-            r"/\*.*\*/",  # Block comments and inline comments
-        ]
-
-        placeholder = "___PLACEHOLDER___"  # Temporary placeholder for params
-
-        # Replace '%s' (MySQL, Psycopg2) with a unique placeholder
-        temp_query = query.replace("%s", placeholder)
-
-        # Parse the query to extract its structure
-        parsed = sqlglot.parse_one(temp_query, dialect=dialect)
-
-        # Ensure the main query is SELECT
-        if parsed.key.upper() != "SELECT":
-            return False
-
-        # Check for infected keywords in the main query
-        if any(
-            re.search(keyword, query, re.IGNORECASE) for keyword in infected_keywords
-        ):
-            return False
-
-        # Check for infected keywords in subqueries
-        for subquery in parsed.find_all(sqlglot.exp.Subquery):
-            subquery_sql = subquery.sql()  # Get the SQL of the subquery
-            if any(
-                re.search(keyword, subquery_sql, re.IGNORECASE)
-                for keyword in infected_keywords
-            ):
-                return False
-
-        return True
+def is_sql_query_safe(
+    query: str, dialect: str = "postgres", trusted_sources: Optional[Iterable[str]] = None
+) -> bool:
+    """
+    判断SQL查询是否为安全的只读查询，详细的拒绝原因见 `analyze_sql_query`。
 
-    except sqlglot.errors.ParseError:
-        return False
+    Args:
+        query (str): 待检查的SQL
+        dialect (str): SQL方言
+        trusted_sources (Iterable[str], optional): 允许读取的数据集文件路径
+    """
+    return analyze_sql_query(query, dialect, trusted_sources).safe
 
 
 def is_sql_query(query: str) -> bool:
@@ -1,6 +1,5 @@
 from .local_query_builder import LocalQueryBuilder
 from .sql_query_builder import SqlQueryBuilder
-# from .view_query_builder import ViewQueryBuilder
+from .view_query_builder import ViewQueryBuilder
 
-# "ViewQueryBuilder",
-__all__ = ["SqlQueryBuilder", "LocalQueryBuilder"]
\ No newline at end of file
+__all__ = ["SqlQueryBuilder", "LocalQueryBuilder", "ViewQueryBuilder"]
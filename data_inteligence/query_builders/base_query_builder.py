@@ -1,7 +1,7 @@
-from typing import List
+from typing import Any, Callable, Dict, Hashable, List, Optional
 
 import sqlglot
-from sqlglot import select
+from sqlglot import exp, parse_one, select
 from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
 from sqlglot.optimizer.qualify_columns import quote_identifiers
 
@@ -10,14 +10,33 @@ from data_inteligence.query_builders.sql_transformation_manager import SQLTransf
 
 
 class BaseQueryBuilder:
+    """
+    数据集查询的构建器。
+
+    列表达式和转换在schema变化后只编译一次为sqlglot表达式，基础查询、head查询和count查询
+    按schema版本缓存，重复调用不再重新解析和生成SQL。
+    """
+
     def __init__(self, schema: SemanticLayerSchema):
         self.schema = schema
         self.transformation_manager = SQLTransformationManager()
+        self._cache: Dict[Hashable, Any] = {}
+        self._cache_version: Optional[str] = None
+
+    @property
+    def dialect(self) -> Optional[str]:
+        """生成SQL的方言，None为通用方言（执行前由loader转换为数据源方言）"""
+        return None
+
+    @property
+    def source_dialect(self) -> Optional[str]:
+        """实际执行查询的数据源方言，转换函数按它编译"""
+        return self.dialect
 
     def validate_query_builder(self):
         """验证查询构建器生成的查询是否有效"""
         try:
-            sqlglot.parse_one(self.build_query())
+            sqlglot.parse_one(self.build_query(), read=self.dialect)
         except Exception as error:
             raise ValueError(
                 f"Failed to generate a valid SQL query from the provided schema: {error}"
@@ -25,10 +44,34 @@ class BaseQueryBuilder:
 
     def build_query(self) -> str:
         """构建查询"""
-        query = select(*self._get_columns()).from_(self._get_table_expression())
-       
+        return self._cached("query", self._build_query)
+
+    def get_head_query(self, n=5):
+        return self._cached(("head", n), lambda: self._build_head_query(n))
+
+    def get_row_count(self):
+        """获取数据集的行数"""
+        return self._cached("count", self._build_row_count_query)
+
+    def _cached(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        # schema可能在加载后被修改（如更新数据集），以其序列化结果作为版本
+        version = self.schema.model_dump_json()
+        if version != self._cache_version:
+            self._cache.clear()
+            self._cache_version = version
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def _select(self) -> exp.Select:
+        columns = [column.copy() for column in self._cached("columns", self._get_columns)]
+        return select(*columns).from_(self._get_table_expression())
+
+    def _build_query(self) -> str:
+        query = self._select()
+
         if self.schema.group_by:
-            query = query.group_by(*[normalize_identifiers(col) for col in self.schema.group_by])
+            query = query.group_by(*self._get_group_by_columns())
         if self._check_distinct():
             query = query.distinct()
         if self.schema.order_by:
@@ -36,52 +79,70 @@ class BaseQueryBuilder:
         if self.schema.limit:
             query = query.limit(self.schema.limit)
 
-        return query.transform(quote_identifiers).sql(pretty=True)
+        return query.transform(quote_identifiers).sql(dialect=self.dialect, pretty=True)
 
-    def get_head_query(self, n=5):
-        query = select(*self._get_columns()).from_(self._get_table_expression())
+    def _build_head_query(self, n: int) -> str:
+        query = self._select()
 
         if self._check_distinct():
             query = query.distinct()
         # 如果有聚合(group_by)，则添加GROUP BY
         if self.schema.group_by:
-            query = query.group_by(
-                *[normalize_identifiers(col) for col in self.schema.group_by]
-            )
+            query = query.group_by(*self._get_group_by_columns())
         # 添加LIMIT
         query = query.limit(n)
 
-        return query.transform(quote_identifiers).sql(pretty=True)
+        return query.transform(quote_identifiers).sql(dialect=self.dialect, pretty=True)
 
-    def get_row_count(self):
-        """获取数据集的行数"""
-        return select("COUNT(*)").from_(self._get_table_expression()).sql(pretty=True)
+    def _build_row_count_query(self) -> str:
+        return select("COUNT(*)").from_(self._get_table_expression()).sql(
+            dialect=self.dialect, pretty=True
+        )
 
-    def _get_columns(self) -> List[str]:
-        """获取数据集中的所有列名"""
+    def _get_columns(self) -> List[exp.Expression]:
+        """获取数据集中的所有列，编译为sqlglot表达式"""
         if not self.schema.columns:
-            return ["*"]
-
-        columns = []
-        for col in self.schema.columns:
-            if col.expression:
-                column_expr = col.expression
-            else:
-                column_expr = normalize_identifiers(col.name).sql()
-            
-            # 用于针对此列的任何转换
-            if self.schema.transformations:
-                column_expr = self.transformation_manager.apply_column_transformations(
-                    column_expr, col.name, self.schema.transformations
-                )
-                col.alias = col.alias or normalize_identifiers(col.name).sql()
-
-            # 如果指定，则添加别名 
-            if col.alias:
-                column_expr = f"{column_expr} AS {normalize_identifiers(col.alias).sql()}"
-            columns.append(column_expr)
-        
-        return columns
+            return [exp.Star()]
+
+        return [
+            self._compile_column(
+                parse_one(col.expression or normalize_identifiers(col.name).sql()),
+                col.name,
+                col.alias,
+                default_alias=normalize_identifiers(col.name).sql(),
+            )
+            for col in self.schema.columns
+        ]
+
+    def _compile_column(
+        self,
+        expression: exp.Expression,
+        name: str,
+        alias: Optional[str],
+        default_alias: str,
+    ) -> exp.Expression:
+        # 用于针对此列的任何转换
+        if self.schema.transformations:
+            expression = self.transformation_manager.compile_column_transformations(
+                expression, name, self.schema.transformations, self.source_dialect
+            )
+            if isinstance(expression, exp.Alias):
+                # rename转换自带别名
+                alias, expression = expression.alias, expression.this
+            # 转换后的列保留原列名
+            alias = alias or default_alias
+
+        # 如果指定，则添加别名
+        if alias:
+            expression = exp.alias_(expression, normalize_identifiers(alias).sql())
+        return expression
+
+    def get_table_reference(self) -> str:
+        """在LLM生成的SQL中替换数据集表名时使用的表达式"""
+        return self._get_table_expression()
+
+    def _get_group_by_columns(self) -> List:
+        return [normalize_identifiers(col) for col in self.schema.group_by]
 
     def _get_table_expression(self) -> str:
         return normalize_identifiers(self.schema.name).sql(pretty=True)
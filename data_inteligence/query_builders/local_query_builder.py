@@ -9,9 +9,18 @@ class LocalQueryBuilder(BaseQueryBuilder):
         super().__init__(schema)
         self.dataset_path = dataset_path
 
+    @property
+    def dialect(self) -> str:
+        # 本地文件由DuckDB直接执行，生成的SQL不再经过方言转换
+        return "duckdb"
+
+    @property
+    def source_path(self) -> str:
+        """数据集文件的绝对路径"""
+        return str((Path(self.dataset_path) / self.schema.source.path).resolve())
+
     def _get_table_expression(self) -> str:
-        filepath = Path(self.dataset_path) / self.schema.source.path
-        abspath = filepath.resolve()
+        abspath = self.source_path
         source_type = self.schema.source.type
 
         if source_type == "parquet":
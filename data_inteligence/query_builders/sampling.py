@@ -0,0 +1,138 @@
+"""
+近似查询模式下的表采样。
+
+探索性问题往往只需要趋势和量级，近似模式下把数据集的表引用替换为采样后的子查询：
+本地数据集（DuckDB）使用固定行数的蓄水池采样，样本量确定；Postgres/Oracle使用数据库原生的
+TABLESAMPLE/SAMPLE按比例采样；MySQL不支持TABLESAMPLE，退化为按随机数过滤行。
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlglot import ParseError, exp, parse_one
+
+DEFAULT_SAMPLE_PERCENT = 1.0
+DEFAULT_SAMPLE_ROWS = 100_000
+SAMPLED_SUBQUERY_ALIAS = "_sampled"
+
+
+@dataclass
+class TableSample:
+    """
+    一个数据集的采样结果。
+
+    Attributes:
+        reference (str): 替换数据集表名时使用的采样子查询
+        method (str): 采样方式，reservoir/system/bernoulli/random
+        percent (float, optional): 按比例采样时的采样比例（百分比）
+        sample_rows (int, optional): 样本行数，按比例采样时无法预先确定
+        total_rows (int, optional): 数据集总行数
+    """
+
+    reference: str
+    method: str
+    percent: Optional[float] = None
+    sample_rows: Optional[int] = None
+    total_rows: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "percent": self.percent,
+            "sample_rows": self.sample_rows,
+            "total_rows": self.total_rows,
+        }
+
+
+class TableSampler:
+    """
+    Args:
+        percent (float): 远程数据源按比例采样的百分比
+        rows (int): 本地数据集蓄水池采样的行数，行数不超过它的数据集不采样
+    """
+
+    def __init__(
+        self,
+        percent: float = DEFAULT_SAMPLE_PERCENT,
+        rows: int = DEFAULT_SAMPLE_ROWS,
+    ):
+        if not 0 < percent < 100:
+            raise ValueError(f"Sample percent must be between 0 and 100, got {percent}")
+        if rows <= 0:
+            raise ValueError(f"Sample rows must be positive, got {rows}")
+        self.percent = percent
+        self.rows = rows
+
+    def sample(
+        self, reference: str, dialect: str, total_rows: Optional[int] = None
+    ) -> Optional[TableSample]:
+        """
+        为数据集的表引用生成采样子查询。
+
+        Args:
+            reference (str): 数据集的表引用（表名、read_parquet(...)或子查询）
+            dialect (str): 执行查询的数据源类型，本地数据集为duckdb
+            total_rows (int, optional): 数据集总行数，已知时用于判断是否需要采样
+
+        Returns:
+            Optional[TableSample]: 无法或无需采样时返回None，查询按精确结果执行
+        """
+        try:
+            expression = parse_one(reference)
+        except ParseError:
+            return None
+
+        if dialect == "duckdb":
+            if total_rows is not None and total_rows <= self.rows:
+                return None
+            table = self._as_table(expression)
+            table.set(
+                "sample",
+                exp.TableSample(method=exp.var("RESERVOIR"), size=exp.Literal.number(self.rows)),
+            )
+            sample_rows = min(self.rows, total_rows) if total_rows is not None else self.rows
+            return TableSample(
+                reference=exp.select("*").from_(table).sql(),
+                method="reservoir",
+                sample_rows=sample_rows,
+                total_rows=total_rows,
+            )
+
+        # 远程数据源只对物理表采样，聚合后的子查询采样没有统计意义
+        if not isinstance(expression, (exp.Column, exp.Table)):
+            return None
+        table = exp.to_table(reference)
+
+        if dialect == "mysql":
+            query = exp.select("*").from_(table).where(exp.Rand() < self.percent / 100)
+            method = "random"
+        elif dialect in ("postgres", "oracle"):
+            # Oracle的 SAMPLE (p) 为行级采样，Postgres的SYSTEM为块级采样
+            method = "system" if dialect == "postgres" else "bernoulli"
+            table.set(
+                "sample",
+                exp.TableSample(
+                    method=exp.var("SYSTEM") if dialect == "postgres" else None,
+                    percent=exp.Literal.number(self.percent),
+                ),
+            )
+            query = exp.select("*").from_(table)
+        else:
+            return None
+
+        return TableSample(
+            reference=query.sql(),
+            method=method,
+            percent=self.percent,
+            total_rows=total_rows,
+        )
+
+    @staticmethod
+    def _as_table(expression: exp.Expression) -> exp.Expression:
+        if isinstance(expression, exp.Func):
+            return exp.Table(this=expression)
+        if isinstance(expression, (exp.Column, exp.Table)):
+            return exp.to_table(expression.sql())
+        return exp.Subquery(
+            this=expression,
+            alias=exp.TableAlias(this=exp.to_identifier(SAMPLED_SUBQUERY_ALIAS)),
+        )
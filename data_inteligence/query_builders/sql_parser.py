@@ -4,19 +4,34 @@ import sqlglot
 from sqlglot import ParseError, parse_one, exp  
 from sqlglot.optimizer.qualify_columns import quote_identifiers
 
+from data_inteligence.helpers.lru_cache import LRUCache
+
+# 两个方法都是输入的纯函数，head/count等固定查询每次请求都会重复转换，结果按输入缓存
+_TRANSPILE_CACHE = LRUCache(max_size=2048, name="sql_transpile")
+_REWRITE_CACHE = LRUCache(max_size=2048, name="sql_table_rewrite")
+
 
 class SQLParser:
     @staticmethod
-    def replace_table_and_column_names(query, table_mapping):
+    def replace_table_and_column_names(query, table_mapping, dialect=None):
         """
-        通过用新表名或子查询替换表名来转换SQL查询。
+        通过用新表名或子查询替换表名来转换SQL查询，结果按(query, mapping, dialect)缓存。
 
         Args:
             query (str): Original SQL query
             table_mapping (dict): Dictionary mapping original table names to either:
                            - actual table names (str)
                            - subqueries (str)
+            dialect (str, optional): Dialect of the generated SQL, generic SQL by default
         """
+        key = (query, tuple(sorted(table_mapping.items())), dialect)
+        return _REWRITE_CACHE.get_or_compute(
+            key,
+            lambda: SQLParser._replace_table_and_column_names(query, table_mapping, dialect),
+        )
+
+    @staticmethod
+    def _replace_table_and_column_names(query, table_mapping, dialect=None):
         parsed_mapping = {}
         for key, value in table_mapping.items():
             try:
@@ -38,6 +53,11 @@ class SQLParser:
                         )
                     elif isinstance(mapped_value, exp.Column):
                         return exp.Table(this=mapped_value.this, alias=alias)
+                    elif isinstance(mapped_value, exp.Func):
+                        # 表函数（如read_parquet）直接作为表使用，不包裹子查询
+                        return exp.Table(
+                            this=mapped_value, alias=exp.TableAlias(this=exp.to_identifier(alias))
+                        )
                     return exp.Subquery(this=mapped_value, alias=alias)
             return node
 
@@ -49,13 +69,22 @@ class SQLParser:
         transformed = transformed.transform(quote_identifiers)
 
         # 转换为字符串
-        return transformed.sql(pretty=True)
+        return transformed.sql(dialect=dialect, pretty=True)
 
     @staticmethod
     def transpile_sql_dialect(
         query: str, to_dialect: str, from_dialect: Optional[str] = None
     ):
-        """转换sql查询方言"""
+        """转换sql查询方言，结果按(query, to_dialect, from_dialect)缓存"""
+        return _TRANSPILE_CACHE.get_or_compute(
+            (query, to_dialect, from_dialect),
+            lambda: SQLParser._transpile_sql_dialect(query, to_dialect, from_dialect),
+        )
+
+    @staticmethod
+    def _transpile_sql_dialect(
+        query: str, to_dialect: str, from_dialect: Optional[str] = None
+    ):
         placeholder = "___PLACEHOLDER___"
         query = query.replace("%s", placeholder)
         query = (
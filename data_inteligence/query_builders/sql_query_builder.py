@@ -4,5 +4,9 @@ from .base_query_builder import BaseQueryBuilder
 
 
 class SqlQueryBuilder(BaseQueryBuilder):
+    @property
+    def source_dialect(self) -> str:
+        return self.schema.source.type
+
     def _get_table_expression(self) -> str:
         return normalize_identifiers(self.schema.source.table.lower()).sql()
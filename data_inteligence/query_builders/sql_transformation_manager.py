@@ -1,7 +1,12 @@
-from typing import List, Union
+from typing import List, Optional, Union
+
+from sqlglot import exp, parse_one
 
 from data_inteligence.data_loader.semantic_layer_schema import Transformation, TransformationParams
 
+# 编译转换模板时代表被转换表达式的占位列
+EXPRESSION_PLACEHOLDER = "__expr__"
+
 
 class SQLTransformationManager:
     """Manages SQL-based transformations for query expressions."""
@@ -52,13 +57,12 @@ class SQLTransformationManager:
 
     @staticmethod
     def _fill_na(expr: str, params: TransformationParams) -> str:
+        # 不修改params，重复生成时不会多次加引号
         if isinstance(params.value, str):
-            params.value = SQLTransformationManager._quote_str(params.value)
+            value = SQLTransformationManager._quote_str(params.value)
         else:
-            params.value = SQLTransformationManager._validate_numeric(
-                params.value, "value"
-            )
-        return f"COALESCE({expr}, {params.value})"
+            value = SQLTransformationManager._validate_numeric(params.value, "value")
+        return f"COALESCE({expr}, {value})"
 
     @staticmethod
     def _map_values(expr: str, params: TransformationParams) -> str:
@@ -192,7 +196,7 @@ class SQLTransformationManager:
     @staticmethod
     def _validate_email(expr: str, params: TransformationParams) -> str:
         # Basic email validation pattern
-        pattern = "^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
+        pattern = r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
         return f"CASE WHEN {expr} REGEXP '{pattern}' THEN {expr} ELSE NULL END"
 
     @staticmethod
@@ -283,3 +287,55 @@ class SQLTransformationManager:
             column_name, schema_transformations
         )
         return SQLTransformationManager.apply_transformations(expr, transformations)
+
+    @staticmethod
+    def compile_column_transformations(
+        expr: exp.Expression,
+        column_name: str,
+        schema_transformations: List[Transformation],
+        dialect: Optional[str] = None,
+    ) -> exp.Expression:
+        """Compile the transformations of a column into a sqlglot expression.
+
+        模板按MySQL语法书写（DATE_FORMAT、STR_TO_DATE等），解析后是与方言无关的表达式，
+        生成SQL时由sqlglot转换为目标数据源的等价函数。remove_duplicates在查询级别添加DISTINCT。
+
+        Args:
+            expr (exp.Expression): The expression to transform
+            column_name (str): Name of the column
+            schema_transformations (List[Transformation]): List of all transformations in the schema
+            dialect (str, optional): Dialect of the source executing the query
+
+        Returns:
+            exp.Expression: The transformed expression
+        """
+        transformations = SQLTransformationManager.get_column_transformations(
+            column_name, schema_transformations
+        )
+        compiled = expr
+        for transformation in transformations:
+            if transformation.type == "remove_duplicates":
+                continue
+            template = SQLTransformationManager.apply_transformations(
+                EXPRESSION_PLACEHOLDER, [transformation]
+            )
+            current = compiled
+            compiled = parse_one(template, read="mysql").transform(
+                lambda node: current.copy()
+                if isinstance(node, exp.Column)
+                and not node.table
+                and node.name == EXPRESSION_PLACEHOLDER
+                else node
+            )
+
+        if dialect == "mysql":
+            # MySQL没有 AT TIME ZONE，保留原生的CONVERT_TZ
+            compiled = compiled.transform(
+                lambda node: exp.Anonymous(
+                    this="CONVERT_TZ",
+                    expressions=[node.args["timestamp"], node.args["source_tz"], node.args["target_tz"]],
+                )
+                if isinstance(node, exp.ConvertTimezone) and node.args.get("source_tz")
+                else node
+            )
+        return compiled
@@ -0,0 +1,146 @@
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from sqlglot import exp, parse_one, select
+from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
+
+from data_inteligence.constants import LOCAL_SOURCE_TYPES
+from data_inteligence.data_loader.semantic_layer_schema import SemanticLayerSchema
+from data_inteligence.helpers.sql_sanitizer import sanitize_sql_table_name
+from .base_query_builder import BaseQueryBuilder
+
+if TYPE_CHECKING:
+    from data_inteligence.data_loader.loader import DatasetLoader
+
+
+class ViewQueryBuilder(BaseQueryBuilder):
+    """
+    视图的查询构建器。
+
+    视图的列形如 '[dataset_name].[column_name]'，各依赖数据集以其自身的查询作为子查询，
+    按relations拼接成一条JOIN语句，由数据源（同一连接的远程表）或DuckDB（本地文件）执行。
+    """
+
+    def __init__(
+        self,
+        schema: SemanticLayerSchema,
+        schema_dependencies_dict: Dict[str, "DatasetLoader"],
+    ):
+        super().__init__(schema)
+        self.schema_dependencies_dict = schema_dependencies_dict
+
+    @staticmethod
+    def normalize_view_column_name(name: str) -> str:
+        """orders.id -> orders.id（规范化后的限定列名）"""
+        table, column = name.split(".")
+        return normalize_identifiers(
+            exp.column(sanitize_sql_table_name(column), table=sanitize_sql_table_name(table))
+        ).sql()
+
+    @staticmethod
+    def normalize_view_column_alias(name: str) -> str:
+        """orders.id -> orders_id（视图子查询输出的列名）"""
+        return normalize_identifiers(
+            exp.to_identifier(sanitize_sql_table_name(name.replace(".", "_")))
+        ).sql()
+
+    @property
+    def dialect(self) -> Optional[str]:
+        return "duckdb" if self.source_dialect == "duckdb" else None
+
+    @property
+    def source_dialect(self) -> str:
+        source = next(iter(self.schema_dependencies_dict.values())).schema.source
+        return "duckdb" if source.type in LOCAL_SOURCE_TYPES else source.type
+
+    def get_table_reference(self) -> str:
+        # LLM看到的是视图的输出列（含聚合与别名），因此替换为完整的视图查询
+        return self._cached(
+            "reference",
+            lambda: exp.Subquery(
+                this=parse_one(self.build_query(), read=self.dialect),
+                alias=exp.TableAlias(this=exp.to_identifier(self.schema.name)),
+            ).sql(dialect=self.dialect, pretty=True),
+        )
+
+    def _get_columns(self) -> List[exp.Expression]:
+        return [
+            self._compile_column(
+                self._alias_qualified_columns(parse_one(col.expression))
+                if col.expression
+                else parse_one(self.normalize_view_column_alias(col.name)),
+                col.name,
+                col.alias,
+                default_alias=self.normalize_view_column_alias(col.name),
+            )
+            for col in self.schema.columns
+        ]
+
+    def _get_group_by_columns(self) -> List[str]:
+        return [self.normalize_view_column_alias(col) for col in self.schema.group_by]
+
+    def _get_table_expression(self) -> str:
+        relations = self.schema.relations or []
+        first_dataset = (
+            relations[0].from_.split(".")[0]
+            if relations
+            else self.schema.columns[0].name.split(".")[0]
+        )
+
+        query = select(
+            *[
+                f"{self.normalize_view_column_name(name)} AS {self.normalize_view_column_alias(name)}"
+                for name in self._get_referenced_columns()
+            ]
+        ).from_(self._get_dependency_subquery(first_dataset))
+
+        joined = {first_dataset}
+        for relation in relations:
+            condition = (
+                f"{self.normalize_view_column_name(relation.from_)} = "
+                f"{self.normalize_view_column_name(relation.to)}"
+            )
+            from_dataset, to_dataset = relation.from_.split(".")[0], relation.to.split(".")[0]
+            # 关系的方向可以任意书写，每次连接尚未加入的那一侧
+            dataset = to_dataset if to_dataset not in joined else from_dataset
+            if dataset in joined:
+                query = query.where(condition)
+                continue
+            query = query.join(
+                self._get_dependency_subquery(dataset), on=condition, join_type="left"
+            )
+            joined.add(dataset)
+
+        return exp.Subquery(
+            this=query, alias=exp.TableAlias(this=exp.to_identifier(self.schema.name))
+        ).sql(dialect=self.dialect, pretty=True)
+
+    def _get_dependency_subquery(self, dataset: str) -> exp.Subquery:
+        query_builder = self.schema_dependencies_dict[dataset].query_builder
+        return exp.Subquery(
+            this=parse_one(query_builder.build_query(), read=query_builder.dialect),
+            alias=exp.TableAlias(this=exp.to_identifier(dataset)),
+        )
+
+    def _get_referenced_columns(self) -> List[str]:
+        """视图中用到的所有 '[dataset].[column]'（列定义及聚合表达式中引用的列）"""
+        names = [col.name for col in self.schema.columns]
+        for col in self.schema.columns:
+            if not col.expression:
+                continue
+            for column in parse_one(col.expression).find_all(exp.Column):
+                name = f"{column.table}.{column.name}"
+                if column.table and name not in names:
+                    names.append(name)
+        return names
+
+    def _alias_qualified_columns(self, expression: exp.Expression) -> exp.Expression:
+        """将表达式中的 orders.amount 替换为视图子查询中的列 orders_amount"""
+
+        def transform(node):
+            if isinstance(node, exp.Column) and node.table:
+                return exp.column(
+                    self.normalize_view_column_alias(f"{node.table}.{node.name}")
+                )
+            return node
+
+        return expression.transform(transform)
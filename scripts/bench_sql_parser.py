@@ -0,0 +1,37 @@
+"""
+SQLParser缓存基准测试：对比未缓存与LRU缓存下的方言转换和表名替换耗时。
+
+用法: python -m scripts.bench_sql_parser
+"""
+import time
+
+from data_inteligence.helpers.lru_cache import cache_stats
+from data_inteligence.query_builders.sql_parser import SQLParser
+
+# loader每次请求都会发出的head/count查询，以及一条典型的LLM查询
+QUERIES = [
+    'SELECT * FROM "orders" ORDER BY RANDOM() LIMIT 5',
+    'SELECT COUNT(*) FROM "orders"',
+    "SELECT region, SUM(amount) AS total FROM orders o JOIN customers c ON o.customer_id = c.id "
+    "WHERE o.created_at >= '2024-01-01' GROUP BY region ORDER BY total DESC LIMIT 10",
+]
+MAPPING = {"orders": "read_parquet('datasets/orders/data.parquet')", "customers": "crm.customers"}
+
+
+def run(name: str, transpile, rewrite, rounds: int) -> None:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            transpile(query, to_dialect="mysql")
+            rewrite(query, MAPPING, dialect="duckdb")
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / (rounds * len(QUERIES) * 2) * 1e6
+    print(f"{name:<10} {per_call:10.1f} us/call")
+
+
+if __name__ == "__main__":
+    rounds = 200
+    run("uncached", SQLParser._transpile_sql_dialect, SQLParser._replace_table_and_column_names, rounds)
+    run("cached", SQLParser.transpile_sql_dialect, SQLParser.replace_table_and_column_names, rounds)
+    for cache, stats in cache_stats().items():
+        print(f"{cache:<18} hit rate {stats['hit_rate']:.2%} ({stats['hits']} hits, {stats['misses']} misses)")
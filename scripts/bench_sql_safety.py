@@ -0,0 +1,72 @@
+"""
+SQL安全检查基准测试：对比旧的正则黑名单实现与基于AST的SQLSafetyAnalyzer。
+
+用法: python -m scripts.bench_sql_safety
+"""
+import re
+import time
+
+import sqlglot
+
+from data_inteligence.helpers.sql_analyzer import SQLSafetyAnalyzer
+
+LEGACY_KEYWORDS = [
+    r"\bINSERT\b", r"\bUPDATE\b", r"\bDELETE\b", r"\bDROP\b", r"\bEXEC\b",
+    r"\bALTER\b", r"\bCREATE\b", r"\bMERGE\b", r"\bREPLACE\b", r"\bTRUNCATE\b",
+    r"\bLOAD\b", r"\bGRANT\b", r"\bREVOKE\b", r"\bCALL\b", r"\bEXECUTE\b",
+    r"\bSHOW\b", r"\bDESCRIBE\b", r"\bEXPLAIN\b", r"\bUSE\b", r"\bSET\b",
+    r"\bDECLARE\b", r"\bOPEN\b", r"\bFETCH\b", r"\bCLOSE\b", r"\bSLEEP\b",
+    r"\bBENCHMARK\b", r"\bDATABASE\b", r"\bUSER\b", r"\bCURRENT_USER\b",
+    r"\bSESSION_USER\b", r"\bSYSTEM_USER\b", r"\bVERSION\b", r"\b@@VERSION\b",
+    r"--", r"/\*.*\*/",
+]
+
+# (query, dialect, expected_safe)
+CORPUS = [
+    ("SELECT region, SUM(amount) AS total FROM orders GROUP BY region ORDER BY total DESC LIMIT 10", "postgres", True),
+    ("SELECT user, COUNT(*) FROM logins GROUP BY user", "postgres", True),
+    ("SELECT version, released_at FROM releases", "mysql", True),
+    ("SELECT o.id, c.name FROM orders o JOIN customers c ON o.customer_id = c.id WHERE o.amount > 100", "mysql", True),
+    ("WITH m AS (SELECT date_trunc('month', created_at) AS m, SUM(amount) AS s FROM orders GROUP BY 1) SELECT * FROM m ORDER BY m", "postgres", True),
+    ("SELECT a, ROW_NUMBER() OVER (PARTITION BY b ORDER BY c) AS rn FROM t -- rank rows", "duckdb", True),
+    ("SELECT * FROM t FETCH FIRST 5 ROWS ONLY", "postgres", True),
+    ("SELECT updated_at, replace(name, 'a', 'b') FROM products", "postgres", True),
+    ("DROP TABLE orders", "postgres", False),
+    ("SELECT 1; DELETE FROM orders", "postgres", False),
+    ("SELECT pg_sleep(10)", "postgres", False),
+    ("SELECT * FROM information_schema.tables", "postgres", False),
+    ("SELECT a INTO b FROM t", "postgres", False),
+]
+
+
+def legacy_is_sql_query_safe(query: str, dialect: str) -> bool:
+    try:
+        parsed = sqlglot.parse_one(query.replace("%s", "___PLACEHOLDER___"), dialect=dialect)
+        if parsed.key.upper() != "SELECT":
+            return False
+        if any(re.search(k, query, re.IGNORECASE) for k in LEGACY_KEYWORDS):
+            return False
+        for subquery in parsed.find_all(sqlglot.exp.Subquery):
+            if any(re.search(k, subquery.sql(), re.IGNORECASE) for k in LEGACY_KEYWORDS):
+                return False
+        return True
+    except sqlglot.errors.ParseError:
+        return False
+
+
+def run(name: str, check, rounds: int) -> None:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        results = [check(query, dialect) for query, dialect, _ in CORPUS]
+    elapsed = time.perf_counter() - start
+    wrong = sum(bool(result) != expected for result, (_, _, expected) in zip(results, CORPUS))
+    per_query = elapsed / (rounds * len(CORPUS)) * 1e6
+    print(f"{name:<22} {per_query:10.1f} us/query   misclassified: {wrong}/{len(CORPUS)}")
+
+
+if __name__ == "__main__":
+    rounds = 200
+    run("legacy regex", legacy_is_sql_query_safe, rounds)
+    run("ast analyzer (cold)", lambda q, d: SQLSafetyAnalyzer(cache_size=0).analyze(q, d), rounds)
+    analyzer = SQLSafetyAnalyzer()
+    run("ast analyzer (cached)", analyzer.analyze, rounds)
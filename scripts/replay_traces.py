@@ -0,0 +1,79 @@
+"""
+重放录制的执行轨迹，对比各阶段的耗时。
+
+轨迹由设置了 TRACE_DIRECTORY（Config.trace_directory）的服务录制；LLM回复使用录制的内容，
+其余阶段在本地数据上按当前代码运行。
+
+用法: python -m scripts.replay_traces traces/ --fixtures fixtures/ [--sandbox 1]
+"""
+import argparse
+import asyncio
+from pathlib import Path
+from typing import List
+
+from agent_core.agent.replay import ReplayResult, replay_trace
+from agent_core.agent.trace import ExecutionTrace, TraceRecorder, load_trace
+
+
+def collect(paths: List[str]) -> List[ExecutionTrace]:
+    traces = []
+    for path in map(Path, paths):
+        traces.extend(TraceRecorder(path).load() if path.is_dir() else [load_trace(path)])
+    return traces
+
+
+def report(result: ReplayResult) -> None:
+    recorded = result.recorded
+    print(f"\n{recorded.trace_id}  {recorded.query[:60]!r}")
+    if result.missing_fixtures:
+        print(f"  missing fixtures (empty tables used): {', '.join(result.missing_fixtures)}")
+    print(f"  {'stage':<10}{'recorded(s)':>14}{'replayed(s)':>14}{'diff(s)':>12}{'ratio':>8}")
+    for timing in result.timings():
+        ratio = f"{timing.replayed / timing.recorded:.2f}" if timing.recorded else "-"
+        print(
+            f"  {timing.stage:<10}{timing.recorded:>14.4f}{timing.replayed:>14.4f}"
+            f"{timing.diff:>+12.4f}{ratio:>8}"
+        )
+    if result.response_changed:
+        print(f"  response type changed: {recorded.response_type} -> {result.replayed.response_type}")
+    if result.replayed.error and result.replayed.error != recorded.error:
+        print(f"  replay error: {result.replayed.error.strip().splitlines()[-1]}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="+", help="轨迹文件或目录")
+    parser.add_argument("--fixtures", help="本地数据目录，文件名为 <表名>.parquet 或 <表名>.csv")
+    parser.add_argument("--sandbox", type=int, default=0, help="子进程沙箱的进程数，0表示在当前进程内执行")
+    args = parser.parse_args()
+
+    sandbox = None
+    if args.sandbox:
+        from agent_core.sandbox import SubprocessSandbox
+
+        # 先启动worker，进程启动时间不计入执行阶段
+        sandbox = SubprocessSandbox(pool_size=args.sandbox)
+        sandbox.start()
+
+    totals = {}
+    changed = 0
+    try:
+        for trace in collect(args.traces):
+            result = await replay_trace(trace, args.fixtures, sandbox)
+            report(result)
+            changed += result.response_changed
+            for timing in result.timings():
+                recorded, replayed = totals.get(timing.stage, (0.0, 0.0))
+                totals[timing.stage] = (recorded + timing.recorded, replayed + timing.replayed)
+    finally:
+        if sandbox is not None:
+            sandbox.stop()
+
+    print(f"\ntotal{'':<5}{'recorded(s)':>14}{'replayed(s)':>14}{'diff(s)':>12}")
+    for stage, (recorded, replayed) in totals.items():
+        print(f"  {stage:<10}{recorded:>12.4f}{replayed:>14.4f}{replayed - recorded:>+12.4f}")
+    print(f"response type changes: {changed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, Query
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Path, Query
+from fastapi.responses import FileResponse
 
 from server.app.controllers.chat import ChatController
 from server.core.fastapi.dependencies.authentication import AuthenticationRequired
 from server.app.schemas.requests.chat import ChatRequest
 from server.app.schemas.responses import APIResponse
-from server.app.schemas.responses.chat import ChatResponse
+from server.app.schemas.responses.chat import ChatResponse, ResultPageResponse
 from server.app.schemas.responses.users import UserInfo
 from server.core.factory import Factory, app_logger
 from server.core.fastapi.dependencies.current_user import get_current_user
@@ -15,11 +18,12 @@ chat_router = APIRouter()
 @chat_router.post("/")
 async def chat(
     chat_request: ChatRequest,
+    background_tasks: BackgroundTasks,
     chat_controller: ChatController = Depends(Factory().get_chat_controller),
     user: UserInfo = Depends(get_current_user),
 ) -> APIResponse[ChatResponse]:
     app_logger.info(f"Into chat interface. Request params: {chat_request}")
-    response = await chat_controller.chat(user, chat_request)
+    response = await chat_controller.chat(user, chat_request, background_tasks)
     return APIResponse(data=response, message="Chat response returned successfully!")
 
 
@@ -41,4 +45,32 @@ async def clarification_questions(
 ):
     app_logger.info(f"Into clarification questions interface. Request params: {workspace_id}")
     response = await chat_controller.get_clarification_questions(workspace_id)
-    return APIResponse(data=response, message="Get clarification questions returned successfully.")
\ No newline at end of file
+    return APIResponse(data=response, message="Get clarification questions returned successfully.")
+
+
+@chat_router.get("/results/{result_id}")
+async def get_result_page(
+    result_id: str = Path(..., description="Result ID"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(100, ge=1, le=1000, description="Number of rows per page"),
+    sort_by: Optional[str] = Query(None, description="Column to sort by"),
+    descending: bool = Query(False, description="Sort in descending order"),
+    chat_controller: ChatController = Depends(Factory().get_chat_controller),
+    user: UserInfo = Depends(get_current_user),
+) -> APIResponse[ResultPageResponse]:
+    app_logger.info(f"Into result page interface. Request params: {result_id}, page={page}")
+    response = await chat_controller.get_result_page(
+        user, result_id, page, page_size, sort_by, descending
+    )
+    return APIResponse(data=response, message="Result page returned successfully!")
+
+
+@chat_router.get("/charts/{chart_id}")
+async def get_chart(
+    chart_id: str = Path(..., description="Chart ID"),
+    chat_controller: ChatController = Depends(Factory().get_chat_controller),
+    user: UserInfo = Depends(get_current_user),
+):
+    # 图表是用户数据，需要登录（<img>加载时通过session_id cookie认证），只能读取自己的图表
+    path, media_type = chat_controller.get_chart(user, chart_id)
+    return FileResponse(path, media_type=media_type, headers={"Cache-Control": "private, max-age=31536000, immutable"})
@@ -74,10 +74,11 @@ async def delete_datasets(
 async def update_datasets(
         dataset_update: DatasetUpdateRequestModel,
         dataset_id: UUID = Path(..., description="ID of the dataset"),
+        user: UserInfo = Depends(get_current_user),
         datasets_controller: DatasetController = Depends(Factory().get_datasets_controller)
     ):
     app_logger.info(f"Into update dataset interface. Request params: dataset_id={dataset_id}, {dataset_update}")
-    return await datasets_controller.update_dataset(dataset_id, dataset_update)
+    return await datasets_controller.update_dataset(dataset_id, dataset_update, user)
 
 
 @dataset_router.get("/download/{dataset_id}", response_class=FileResponse, status_code=status.HTTP_200_OK)
@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
 from .health import health_router
+from .metrics import metrics_router
 
 monitoring_router = APIRouter()
 monitoring_router.include_router(health_router)
+monitoring_router.include_router(metrics_router)
 
 __all__ = ["monitoring_router"]
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+
+from data_inteligence.helpers.lru_cache import cache_stats
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics/caches")
+def cache_metrics():
+    """返回进程内各LRU缓存的命中统计"""
+    return cache_stats()
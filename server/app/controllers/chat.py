@@ -1,7 +1,9 @@
+import asyncio
 import os
 import time
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
+from fastapi import BackgroundTasks
 from loguru import logger
 
 from agent_core.agent.dataframe_agent import DataFrameAgent
@@ -9,6 +11,7 @@ from data_inteligence.helpers.path import find_project_root
 from data_inteligence.data_loader.semantic_layer_schema import SemanticLayerSchema
 from data_inteligence.data_loader.sql_loader import SQLDatasetLoader
 from data_inteligence.data_loader.loader import DatasetLoader
+from data_inteligence.data_loader.workspace_catalog import WorkspaceCatalog
 from agent_core.llm.oai import OpenAIChatModel
 
 from server.setting import config as app_config
@@ -18,13 +21,16 @@ from server.app.repositories.conversation import ConversationRepository
 from server.app.repositories.workspace import WorkspaceRepository
 from server.app.repositories.logs import LogsRepository
 from server.app.schemas.requests.chat import ChatRequest
-from server.app.schemas.responses.chat import ChatResponse
+from server.app.schemas.responses.chat import ChatResponse, ResultPageResponse
 from server.app.schemas.responses.users import UserInfo
-from server.app.utils.memory import prepare_conv_memory
+from server.app.utils.memory import compact_conversation_memory, prepare_conv_memory
+from server.app.utils.sandbox import get_sandbox
 from server.core.controller import BaseController
 from server.core.database.transactional import Propagation, Transactional
+from server.core.utils.chart_store import ChartStore
 from server.core.utils.json_encoder import jsonable_encoder
 from server.core.utils.response_parser import JsonResponseParser
+from server.core.utils.result_store import ResultStore
 
 
 class ChatController(BaseController[User]):
@@ -82,12 +88,17 @@ class ChatController(BaseController[User]):
         )
 
     @Transactional(propagation=Propagation.REQUIRED)
-    async def chat(self, user: UserInfo, chat_request: ChatRequest) -> ChatResponse:
+    async def chat(
+        self,
+        user: UserInfo,
+        chat_request: ChatRequest,
+        background_tasks: Optional[BackgroundTasks] = None,
+    ) -> ChatResponse:
         datasets: List[Dataset] = await self.space_repository.get_space_datasets(
             chat_request.workspace_id
         )
         conversation_id = chat_request.conversation_id
-        conversation_messages = []
+        conversation_state = None
         memory = None
 
         if not chat_request.conversation_id:
@@ -95,12 +106,10 @@ class ChatController(BaseController[User]):
             conversation_id = user_conversation.id
             logger.bind(name="fastapi_app").info(f"new conversation id created. conversation_id: {conversation_id}")
         else:
-            conversation_messages = (
-                await self.conversation_repository.get_conversation_messages(
-                    conversation_id
-                )
+            conversation_state = await self.conversation_repository.get_conversation_state(
+                conversation_id
             )
-            memory = prepare_conv_memory(conversation_messages)
+            memory = prepare_conv_memory(conversation_state, app_config.MEMORY_TOKEN_BUDGET or None)
 
         connectors = []
         for dataset in datasets:
@@ -118,11 +127,34 @@ class ChatController(BaseController[User]):
                     df = loader.load()
             connectors.append(df)
 
-        config = {"llm": self.llm}
-        agent = DataFrameAgent(connectors, config=config, response_parser=JsonResponseParser())
+        config = {
+            "llm": self.llm,
+            "catalog": WorkspaceCatalog.for_workspace(chat_request.workspace_id),
+            "approximate": chat_request.approximate,
+            "chart_format": app_config.CHART_FORMAT,
+            "chart_dpi": app_config.CHART_DPI,
+            "plot_max_points": app_config.PLOT_MAX_POINTS,
+            "max_cpu_time": app_config.SANDBOX_CPU_TIME or None,
+            "max_memory_mb": app_config.SANDBOX_MEMORY_MB or None,
+            "max_result_rows": app_config.RESULT_MAX_ROWS or None,
+            "max_result_bytes": app_config.RESULT_MAX_BYTES or None,
+            "trace_directory": app_config.TRACE_DIRECTORY or None,
+        }
+        response_parser = JsonResponseParser(
+            result_store=ResultStore(user.id),
+            page_size=app_config.RESULT_PAGE_SIZE,
+            max_rows=app_config.RESULT_MAX_INLINE_ROWS,
+            chart_store=ChartStore(user.id) if app_config.CHART_STORE_ENABLED else None,
+        )
+        agent = DataFrameAgent(
+            connectors, config=config, response_parser=response_parser, sandbox=get_sandbox()
+        )
         
         if memory:
             agent._state.memory = memory
+        if conversation_state is not None:
+            # 追问时提示词中带上上一轮生成的代码
+            agent._state.last_code_generated = conversation_state.last_code
 
         start_time = time.time()
         if app_config.USE_CACHE:
@@ -135,7 +167,8 @@ class ChatController(BaseController[User]):
                 except Exception:
                     logger.bind(name="fastapi_app").error(f"cache hit but failed to execute. query: {chat_request.query}")
         if not response: 
-            response = await agent.follow_up(chat_request.query)
+            # 未指定output_type时不限制结果类型，提示词中会给出chart_spec等全部类型
+            response = await agent.follow_up(chat_request.query, output_type=chat_request.output_type)
 
         if isinstance(response, str) and (
             response.startswith("抱歉，我无法回答")
@@ -158,6 +191,14 @@ class ChatController(BaseController[User]):
             code_generated=agent.last_code_executed,
             log_id=log.id
         )
+        if app_config.MEMORY_TOKEN_BUDGET > 0 and background_tasks is not None:
+            # 摘要在响应发送后计算，不增加本轮的响应时间
+            background_tasks.add_task(
+                compact_conversation_memory,
+                conversation_id,
+                self.llm if app_config.MEMORY_SUMMARY_USE_LLM else None,
+                self.conversation_repository,
+            )
 
         return ChatResponse(
             response=response,
@@ -165,3 +206,29 @@ class ChatController(BaseController[User]):
             message_id = str(conversation_message.id),
             query = str(conversation_message.query)
         )
+
+    async def get_result_page(
+        self,
+        user: UserInfo,
+        result_id: str,
+        page: int = 1,
+        page_size: int = 100,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> ResultPageResponse:
+        """分页读取保存在服务端的大结果集，只能读取当前用户自己的结果"""
+        df, total_rows = await asyncio.to_thread(
+            ResultStore(user.id).get_page, result_id, page, page_size, sort_by, descending
+        )
+        return ResultPageResponse(
+            result_id=result_id,
+            page=page,
+            page_size=page_size,
+            total_rows=total_rows,
+            **JsonResponseParser.dataframe_to_json(df),
+        )
+
+    def get_chart(self, user: UserInfo, chart_id: str) -> Tuple[Path, str]:
+        """返回用户图表的文件路径和媒体类型"""
+        store = ChartStore(user.id)
+        return store.get_path(chart_id), store.media_type(chart_id)
@@ -22,13 +22,16 @@ from server.app.schemas.requests.datasets import (
     DatabaseConnectionRequestModel,
 )
 from server.app.schemas.responses.users import UserInfo
-from server.core.utils.dataframe import read_csv, read_excel, convert_dataframe_to_dict
+from server.core.utils.dataframe import convert_dataframe_to_dict
 from server.core.database.transactional import Propagation, Transactional
 from server.setting import config
 from data_inteligence.constants import DEFAULT_STORGE_PATH, REMOTE_SOURCE_TYPES
 from data_inteligence.helpers.path import calculate_md5
 from data_inteligence.data_loader.semantic_layer_schema import Source, SemanticLayerSchema
 from data_inteligence.data_loader.loader import DatasetLoader
+from data_inteligence.data_loader.local_loader import LocalDatasetLoader
+from data_inteligence.data_loader.ingestion import ingest_local_file
+from data_inteligence.data_loader.workspace_catalog import WorkspaceCatalog
 from data_inteligence.data_loader.sql_loader import SQLDatasetLoader
 from agent_core.agent.dataframe_agent import DataFrameAgent
 from agent_core.llm.oai import OpenAIChatModel
@@ -72,8 +75,9 @@ class DatasetController(BaseController[Dataset]):
     
     @Transactional(propagation=Propagation.REQUIRED)
     async def delete_datasets(self, dataset_id, user):
-        # dataset = await self.get_dataset_by_id(dataset_id)
+        dataset = await self.get_dataset_by_id(dataset_id)
         await self.space_repository.delete_datasetspace(dataset_id, user.space.id)
+        self._sync_catalog(dataset, user.space.id, drop=True)
 
         # if dataset.connector.type == "CSV":
         #     file_path = dataset.connector.config["file_path"]
@@ -89,7 +93,7 @@ class DatasetController(BaseController[Dataset]):
 
         return {"message": "Dataset deleted successfully"}
     
-    async def update_dataset(self, dataset_id: str, dataset_update: DatasetUpdateRequestModel):
+    async def update_dataset(self, dataset_id: str, dataset_update: DatasetUpdateRequestModel, user: UserInfo):
         dataset = await self.get_dataset_by_id(dataset_id)
 
         dataset.name = dataset_update.name
@@ -97,6 +101,7 @@ class DatasetController(BaseController[Dataset]):
         dataset.field_descriptions = {"columns": dataset_update.field_descriptions}
         dataset.filterable_columns = {"columns": dataset_update.filterable_columns}
         dataset = await self.dataset_repository.update_dataset(dataset=dataset)
+        self._sync_catalog(dataset, user.space.id)
 
         return {"message": "Dataset updated successfully"}
     
@@ -122,22 +127,18 @@ class DatasetController(BaseController[Dataset]):
                 shutil.copyfileobj(file.file, buffer)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
+        suffix_name = filename.split(".")[-1].lower()
+        if suffix_name not in ["csv", "xlsx", "xls"]:
+            raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV or Excel file.")
         try:
-            # 读取文件内容
-            suffix_name = filename.split(".")[-1].lower()
-            if suffix_name == "csv":
-                df = read_csv(file_path)
-            elif suffix_name in ['xlsx', 'xls']:
-                df = read_excel(file_path)
-            else:
-                raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV or Excel file.")
-            df.schema.source = Source(type=suffix_name, path=filename)
-            column_list = df.schema.columns
-            field_descriptions = [column.model_dump() for column in column_list]
-            # 将DataFrame中的schema写入schema.yaml
+            # 转换为带类型的parquet文件，原始文件保留用于下载
+            schema = ingest_local_file(file_path, source_type=suffix_name)
+            field_descriptions = [column.model_dump() for column in schema.columns]
+            # 将schema写入schema.yaml，后续查询直接读取parquet文件
             with open(store_path / "schema.yaml", "w", encoding="utf-8") as f:
-                f.write(df.schema.to_yaml())
-            head = convert_dataframe_to_dict(df)
+                f.write(schema.to_yaml())
+            loader = LocalDatasetLoader(schema, str(store_path))
+            head = convert_dataframe_to_dict(loader.load_head())
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
         
@@ -152,6 +153,7 @@ class DatasetController(BaseController[Dataset]):
             filterable_columns=[],
         )
         await self.space_repository.add_dataset_to_space(workspace_id=user.space.id,dataset_id=dataset.id)
+        self._sync_catalog(dataset, user.space.id)
 
         return DatasetsDetailsResponseModel(dataset=dataset)
     
@@ -294,6 +296,23 @@ class DatasetController(BaseController[Dataset]):
 
         return FileResponse(file_path, filename=f"{dataset_id}.csv", media_type='text/csv')
 
+    def _sync_catalog(self, dataset: Dataset, workspace_id, drop: bool = False):
+        """维护工作空间DuckDB catalog中数据集对应的视图，catalog只是缓存，失败不影响数据集操作"""
+        connector = dataset.connector
+        if not connector or connector.type != ConnectorType.CSV.value:
+            return
+        try:
+            dataset_path = Path(find_project_root()) / Path(connector.config["file_path"]).parent
+            schema = DatasetLoader._read_schema_file(str(dataset_path))
+            catalog = WorkspaceCatalog.for_workspace(workspace_id)
+            if drop:
+                catalog.drop_dataset(schema, str(dataset_path))
+            elif not catalog.register_dataset(schema, str(dataset_path)):
+                # 列结构相同的数据集视图同名，视图保留给先注册的数据集，本数据集查询时直接读取文件
+                app_logger.info(f"catalog视图 {schema.name} 已属于其他数据集: {dataset.id}")
+        except Exception as e:
+            app_logger.warning(f"更新工作空间catalog失败: {dataset.id}, {str(e)}")
+
     async def _check_duplicate_file(self, user_id: int, file_md5: str):
         datasets = await self.dataset_repository.get_user_datasets(
             user_id, connector_type=ConnectorType.CSV
@@ -139,6 +139,9 @@ class UserConversation(Base):
     type_id = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.now)
     valid = Column(Boolean, default=True)
+    # 记忆压缩的滚动摘要，以及摘要覆盖的消息条数
+    memory_summary = Column(String, nullable=True)
+    memory_summarized = Column(Integer, default=0)
 
     workspace = relationship("Workspace")
     user = relationship("User")
@@ -1,8 +1,11 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Type
 
-from sqlalchemy import and_, asc, desc, func
+from sqlalchemy import and_, asc, desc, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from server.app.models import ConversationMessage, UserConversation
+from server.app.utils.conversation_cache import get_conversation_cache
 from server.core.repository import BaseRepository
+from server.core.utils.conversation_cache import ConversationState, ConversationStateCache
 from sqlalchemy.sql.expression import select
 from sqlalchemy.orm import selectinload
 from server.core.database.transactional import Propagation, Transactional
@@ -12,6 +15,16 @@ class ConversationRepository(BaseRepository[UserConversation]):
     """
     UserConversation repository provides all the database operations for the UserConversation model.
     """
+
+    def __init__(
+        self,
+        model: Type[UserConversation],
+        db_session: AsyncSession,
+        state_cache: Optional[ConversationStateCache] = None,
+    ) -> None:
+        super().__init__(model, db_session)
+        self.state_cache = state_cache or get_conversation_cache()
+
     @Transactional(propagation=Propagation.REQUIRED)
     async def add_conversation_message(
         self,
@@ -30,9 +43,65 @@ class ConversationRepository(BaseRepository[UserConversation]):
         )
 
         self.session.add(conversation_message)
+        # 同步更新会话状态缓存，下一轮追问不需要再从数据库读取历史
+        message = response[0].get("message") if response and isinstance(response[0], dict) else None
+        await self.state_cache.append(conversation_id, query, message, code_generated)
 
         return conversation_message
 
+    async def get_conversation_state(self, conversation_id: str) -> ConversationState:
+        """
+        会话最近的记忆消息和最后生成的代码。
+
+        缓存的状态与数据库中的消息条数一致时直接使用；否则只查询最近几条消息的问题、代码和回答摘要，
+        不读取response中的数据和图表，并恢复会话保存的记忆摘要。
+        """
+        total = await self.get_messages_count(conversation_id)
+        state = await self.state_cache.get(conversation_id, total)
+        if state is None:
+            state = await self._load_conversation_state(conversation_id, total)
+            await self.state_cache.put(conversation_id, state)
+        return state
+
+    async def _load_conversation_state(self, conversation_id: str, total: int) -> ConversationState:
+        max_messages = self.state_cache.max_messages
+        # 每条消息对应一问一答两条记忆
+        query = (
+            select(
+                ConversationMessage.query,
+                ConversationMessage.code_generated,
+                ConversationMessage.response[(0, "message")].as_string().label("message"),
+                UserConversation.memory_summary,
+                UserConversation.memory_summarized,
+            )
+            .join(ConversationMessage.user_conversation)
+            .where(ConversationMessage.conversation_id == conversation_id)
+            .order_by(desc(ConversationMessage.created_at))
+            .limit((max_messages + 1) // 2)
+        )
+        rows = (await self.session.execute(query)).all()
+        if not rows:
+            return ConversationState(total=total)
+
+        # 已经折叠进摘要的消息不再作为原始消息加载
+        summary, summarized = rows[0].memory_summary, rows[0].memory_summarized or 0
+        rows = rows[: max(total - summarized, 0)]
+        state = ConversationState(
+            total=total - len(rows), summary=summary, summarized=min(summarized, total)
+        )
+        for row in reversed(rows):
+            state = state.append(row.query, row.message, row.code_generated, max_messages)
+        return state
+
+    @Transactional(propagation=Propagation.REQUIRED)
+    async def save_memory_summary(self, conversation_id: str, summary: str, summarized: int) -> None:
+        """保存记忆压缩的摘要，会话状态缓存未命中时据此恢复较早的上下文"""
+        await self.session.execute(
+            update(UserConversation)
+            .where(UserConversation.id == conversation_id)
+            .values(memory_summary=summary, memory_summarized=summarized)
+        )
+
     async def get_conversation_messages(
         self, conversation_id: str, skip: int = 0, limit: int = 100, order: str = "asc"
     ):
@@ -1,8 +1,12 @@
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel
 
 
 class ChatRequest(BaseModel):
     workspace_id: str
     query: str
-    conversation_id: Optional[str] = None
\ No newline at end of file
+    conversation_id: Optional[str] = None
+    # 近似模式：在采样数据上回答探索性问题，响应中标记approximate及样本量
+    approximate: bool = False
+    # 期望的结果类型，未指定时由模型按问题选择（图表优先使用chart_spec）；其他取值返回422
+    output_type: Optional[Literal["string", "number", "dataframe", "chart_spec", "plot"]] = None
@@ -1,4 +1,4 @@
-from typing import Any, List
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -7,10 +7,22 @@ class ChatResponseBase(BaseModel):
     type: str
     value: Any
     message: str
+    # 近似模式下结果基于采样数据计算，samples为各数据集的样本量
+    approximate: bool = False
+    samples: Optional[Dict[str, Any]] = None
 
 
 class ChatResponse(BaseModel):
     response: List[ChatResponseBase]
     conversation_id: str
     message_id: str
-    query: str
\ No newline at end of file
+    query: str
+
+
+class ResultPageResponse(BaseModel):
+    result_id: str
+    headers: List[Any]
+    rows: List[List[Any]]
+    page: int
+    page_size: int
+    total_rows: int
@@ -0,0 +1,22 @@
+import asyncio
+
+from loguru import logger
+
+from server.core.utils.chart_store import ChartStore
+from server.setting import config
+
+app_logger = logger.bind(name="fastapi_app")
+
+
+async def run_chart_gc(interval: int) -> None:
+    """按固定间隔清理图表目录，删除过期文件并把目录控制在容量上限以内"""
+    store = ChartStore()
+    max_age = config.CHART_MAX_AGE_DAYS * 24 * 3600
+    while True:
+        try:
+            removed = await asyncio.to_thread(store.gc, max_age, config.CHART_MAX_BYTES)
+            if removed:
+                app_logger.info(f"chart gc removed {removed} files")
+        except Exception as e:
+            app_logger.error(f"图表清理失败: {str(e)}")
+        await asyncio.sleep(interval)
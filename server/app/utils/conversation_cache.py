@@ -0,0 +1,28 @@
+from typing import Optional
+
+from server.core.utils.conversation_cache import ConversationStateCache, RedisStateBackend
+from server.setting import config
+
+_cache: Optional[ConversationStateCache] = None
+
+
+def get_conversation_cache() -> ConversationStateCache:
+    """进程内共享的会话状态缓存，CONVERSATION_CACHE_BACKEND为redis时同时写入Redis供多个worker共用"""
+    global _cache
+    if _cache is None:
+        backend = None
+        if config.CONVERSATION_CACHE_BACKEND == "redis":
+            backend = RedisStateBackend(
+                ttl=config.CONVERSATION_CACHE_TTL, **config.REDIS.get_connection_params()
+            )
+        _cache = ConversationStateCache(
+            max_conversations=config.CONVERSATION_CACHE_SIZE,
+            max_messages=config.CONVERSATION_MEMORY_MESSAGES,
+            backend=backend,
+        )
+    return _cache
+
+
+async def close_conversation_cache() -> None:
+    if _cache is not None:
+        await _cache.close()
@@ -1,20 +1,61 @@
-from typing import List
+from typing import TYPE_CHECKING, Any, Optional
 
+from loguru import logger
+
+from agent_core.llm.base import BaseChatModel
 from agent_core.memory.memory import Memory
-from server.app.models import ConversationMessage
-
-
-def prepare_conv_memory(messages: List[ConversationMessage]) -> Memory:
-    memory = Memory()
-    for message in messages:
-        if message.response:
-            memory.add(message.query, is_user=True)
-            if message.code_generated:
-                memory.add(f"```python\n{message.code_generated}\n```", is_user=False)
-            else:
-                memory.add(
-                    "\n".join([str(item["message"]) for item in message.response]),
-                    is_user=False,
-                )
-
-    return memory
\ No newline at end of file
+from agent_core.memory.summarizer import MemorySummarizer
+from server.app.utils.conversation_cache import get_conversation_cache
+from server.core.utils.conversation_cache import ConversationState
+from server.setting import config
+
+if TYPE_CHECKING:
+    from server.app.repositories.conversation import ConversationRepository
+
+
+def prepare_conv_memory(state: ConversationState, token_budget: Optional[int] = None) -> Memory:
+    memory = Memory(token_budget=token_budget)
+    memory.summary = state.summary
+    for message in state.messages:
+        memory.add(message["message"], is_user=message["is_user"])
+
+    return memory
+
+
+async def compact_conversation_memory(
+    conversation_id: Any,
+    llm: Optional[BaseChatModel] = None,
+    repository: Optional["ConversationRepository"] = None,
+) -> None:
+    """
+    响应返回后在后台运行：把会话中放不进 MEMORY_TOKEN_BUDGET 的较早消息折叠为摘要，写回会话状态缓存，
+    并通过 repository 保存到会话表中，缓存未命中时从数据库恢复。
+    期间会话有新消息写入时放弃本次结果，下一轮结束后重新计算。
+    """
+    cache = get_conversation_cache()
+    state = await cache.get(conversation_id)
+    if state is None:
+        return
+    budget = config.MEMORY_TOKEN_BUDGET
+    pending = prepare_conv_memory(state, budget).pending_messages()
+    if not pending:
+        return
+
+    try:
+        summary = await MemorySummarizer(llm).summarize(
+            state.summary, pending, min(config.MEMORY_SUMMARY_TOKENS, budget // 2)
+        )
+    except Exception as e:
+        logger.bind(name="fastapi_app").warning(f"conversation summarization failed: {e}")
+        return
+
+    current = await cache.get(conversation_id, state.total)
+    if current is None:
+        return
+    folded = current.fold(summary, len(pending))
+    await cache.put(conversation_id, folded)
+    if repository is not None:
+        try:
+            await repository.save_memory_summary(conversation_id, folded.summary, folded.summarized)
+        except Exception as e:
+            logger.bind(name="fastapi_app").warning(f"saving conversation summary failed: {e}")
@@ -0,0 +1,21 @@
+import asyncio
+
+from loguru import logger
+
+from server.core.utils.result_store import ResultStore
+from server.setting import config
+
+app_logger = logger.bind(name="fastapi_app")
+
+
+async def run_result_gc(interval: int) -> None:
+    """按固定间隔清理服务端结果集，删除过期文件并把目录控制在容量上限以内"""
+    max_age = config.RESULT_MAX_AGE_DAYS * 24 * 3600
+    while True:
+        try:
+            removed = await asyncio.to_thread(ResultStore.gc, max_age, config.RESULT_STORE_MAX_BYTES)
+            if removed:
+                app_logger.info(f"result gc removed {removed} files")
+        except Exception as e:
+            app_logger.error(f"结果集清理失败: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,112 @@
+import asyncio
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from data_inteligence.constants import DEFAULT_STORGE_PATH
+from data_inteligence.data_loader.loader import DatasetLoader
+from data_inteligence.data_loader.rollup import DEFAULT_ROLLUP_DIRECTORY, remove_superseded_files
+from data_inteligence.data_loader.semantic_layer_schema import SemanticLayerSchema
+from data_inteligence.data_loader.snapshot import DEFAULT_SNAPSHOT_DIRECTORY
+from data_inteligence.data_loader.sql_loader import SQLDatasetLoader
+from data_inteligence.helpers.file_lock import FileLock
+from data_inteligence.helpers.path import find_project_root
+from server.app.models import Dataset
+from server.app.repositories import DatasetRepository
+from server.core.database.session import reset_session_context, session, set_session_context
+
+app_logger = logger.bind(name="fastapi_app")
+
+# 每个API worker都会启动调度，只有持有该锁的worker执行刷新
+REFRESH_LEADER_LOCK = DEFAULT_STORGE_PATH / "locks" / "dataset_refresh.lock"
+
+
+def get_dataset_loader(dataset: Dataset) -> Optional[DatasetLoader]:
+    """根据数据集的connector配置创建loader"""
+    config = dataset.connector.config if dataset.connector else None
+    if not isinstance(config, dict):
+        return None
+    if dataset.connector.type == "CSV":
+        file_path = Path(find_project_root()) / config["file_path"]
+        return DatasetLoader.create_loader_from_path(str(file_path.parent))
+    if dataset.connector.type == "DB" and "source" in config:
+        return SQLDatasetLoader(SemanticLayerSchema(**config), "")
+    return None
+
+
+def refresh_snapshot(loader: DatasetLoader) -> bool:
+    """远程表快照不存在或已超过update_frequency时重新同步，返回是否刷新"""
+    snapshot = loader.snapshot if isinstance(loader, SQLDatasetLoader) else None
+    if snapshot is None or not snapshot.is_stale():
+        return False
+    rows = snapshot.refresh()
+    app_logger.info(f"数据集快照已同步: {loader.schema.name}, rows={rows}")
+    return True
+
+
+def refresh_rollup(loader: DatasetLoader) -> bool:
+    """rollup不存在或已超过update_frequency时重新物化，返回是否刷新"""
+    rollup = loader.rollup
+    if rollup is None or not rollup.is_stale():
+        return False
+    rows = rollup.refresh()
+    app_logger.info(f"数据集rollup已刷新: {loader.schema.name}, rows={rows}")
+    return True
+
+
+async def refresh_stale_datasets() -> int:
+    """刷新所有数据集中过期的rollup和远程表快照，返回刷新的数量"""
+    context = set_session_context(str(uuid.uuid4()))
+    try:
+        datasets = await DatasetRepository(Dataset, db_session=session).get_all(limit=None)
+    finally:
+        await session.remove()
+        reset_session_context(context)
+
+    refreshed = 0
+    # 所有数据集当前引用的rollup和快照文件；有数据集无法解析时不清理，避免误删其文件
+    referenced, complete = set(), True
+    for dataset in datasets:
+        try:
+            loader = get_dataset_loader(dataset)
+            if loader is None:
+                continue
+            if loader.rollup is not None:
+                referenced.add(loader.rollup.path)
+            if isinstance(loader, SQLDatasetLoader) and loader.snapshot is not None:
+                referenced.update(loader.snapshot.files)
+            for refresh in (refresh_snapshot, refresh_rollup):
+                if await asyncio.to_thread(refresh, loader):
+                    refreshed += 1
+        except Exception as e:
+            complete = False
+            app_logger.error(f"刷新数据集失败: {dataset.id}, {str(e)}")
+
+    if complete:
+        for directory in (DEFAULT_ROLLUP_DIRECTORY, DEFAULT_SNAPSHOT_DIRECTORY):
+            removed = await asyncio.to_thread(remove_superseded_files, directory, referenced)
+            if removed:
+                app_logger.info(f"已删除不再使用的rollup/快照文件: {directory}, {removed}")
+    return refreshed
+
+
+async def run_refresh_scheduler(interval: int) -> None:
+    """
+    按固定间隔检查rollup和快照是否过期，过期时间由各数据集的update_frequency决定。
+
+    多个worker中只有取得leader锁的一个执行刷新，其余worker每个间隔重试一次；
+    leader进程退出后锁随之释放，由其他worker接手。
+    """
+    leader = FileLock(REFRESH_LEADER_LOCK)
+    try:
+        while True:
+            try:
+                if leader.acquire(blocking=False):
+                    await refresh_stale_datasets()
+            except Exception as e:
+                app_logger.error(f"数据集刷新调度失败: {str(e)}")
+            await asyncio.sleep(interval)
+    finally:
+        leader.release()
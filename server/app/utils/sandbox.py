@@ -0,0 +1,39 @@
+import threading
+from typing import Optional
+
+from loguru import logger
+
+from agent_core.sandbox import SubprocessSandbox
+from server.setting import config
+
+app_logger = logger.bind(name="fastapi_app")
+
+_sandbox: Optional[SubprocessSandbox] = None
+_lock = threading.Lock()
+
+
+def get_sandbox() -> Optional[SubprocessSandbox]:
+    """进程内共享的沙箱worker池，SANDBOX_POOL_SIZE为0时在API进程内执行代码"""
+    global _sandbox
+    if config.SANDBOX_POOL_SIZE <= 0:
+        return None
+    with _lock:
+        if _sandbox is None:
+            _sandbox = SubprocessSandbox(
+                pool_size=config.SANDBOX_POOL_SIZE,
+                timeout=config.SANDBOX_TIMEOUT,
+            )
+    return _sandbox
+
+
+def start_sandbox() -> None:
+    """服务启动时预热worker，第一个请求不承担进程启动和导入开销"""
+    sandbox = get_sandbox()
+    if sandbox is not None:
+        sandbox.start()
+        app_logger.info(f"sandbox started with {sandbox.pool_size} workers")
+
+
+def stop_sandbox() -> None:
+    if _sandbox is not None:
+        _sandbox.stop()
@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 from typing import List
 
@@ -15,6 +16,11 @@ from server.app.controllers.workspace import WorkspaceController
 from server.app.controllers.user import UserController
 from server.app.models import Dataset, Workspace, User
 from server.app.repositories import UserRepository, DatasetRepository, WorkspaceRepository
+from server.app.utils.charts import run_chart_gc
+from server.app.utils.conversation_cache import close_conversation_cache
+from server.app.utils.results import run_result_gc
+from server.app.utils.rollups import run_refresh_scheduler
+from server.app.utils.sandbox import start_sandbox, stop_sandbox
 from server.setting import config
 from server.core.database.session import session
 from server.core.exceptions import CustomException
@@ -155,6 +161,20 @@ def create_app() -> FastAPI:
         app_.state.logger = logger.bind(name="fastapi_app")
         # await init_database()
         await init_user()
+        if config.DATASET_REFRESH_INTERVAL > 0:
+            app_.state.refresh_scheduler = asyncio.create_task(
+                run_refresh_scheduler(config.DATASET_REFRESH_INTERVAL)
+            )
+        if config.CHART_GC_INTERVAL > 0:
+            app_.state.chart_gc = asyncio.create_task(run_chart_gc(config.CHART_GC_INTERVAL))
+        if config.RESULT_GC_INTERVAL > 0:
+            app_.state.result_gc = asyncio.create_task(run_result_gc(config.RESULT_GC_INTERVAL))
+        await asyncio.to_thread(start_sandbox)
+
+    @app_.on_event("shutdown")
+    async def on_shutdown():
+        stop_sandbox()
+        await close_conversation_cache()
 
     return app_
 
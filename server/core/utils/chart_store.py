@@ -0,0 +1,86 @@
+import hashlib
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Optional, Union
+
+from data_inteligence.code_core.code_execution.charts import CHART_MIME_TYPES
+from data_inteligence.constants import DEFAULT_CHART_DIRECTORY
+from server.core.exceptions import NotFoundException
+from server.core.utils.file_gc import remove_expired_files
+
+_CHART_ID_RE = re.compile(r"^[0-9a-f]{64}\.(%s)$" % "|".join(CHART_MIME_TYPES))
+
+
+class ChartStore:
+    """
+    按内容寻址的图表存储。
+
+    图表以内容的sha256命名，按用户隔离保存，同一用户相同的图表只保存一份；响应和会话历史中只保存
+    图表地址，不再内嵌base64，读取图表需要登录且只能读取自己的图表。
+
+    目录中的文件（包括旧版本生成代码写出的temp_chart文件）由gc按最近使用时间和总大小清理，
+    读取图表会更新其使用时间。超过 CHART_MAX_AGE_DAYS 未被查看的图表会被删除，会话历史中
+    对应的图表地址随之失效。
+
+    Args:
+        user_id (str, optional): 图表所属用户，为空时表示整个图表目录（用于gc）
+        root (str | Path): 图表文件根目录
+    """
+
+    def __init__(
+        self,
+        user_id: Optional[Union[str, uuid.UUID]] = None,
+        root: Union[str, Path] = DEFAULT_CHART_DIRECTORY,
+    ):
+        self.directory = Path(root) / str(user_id) if user_id is not None else Path(root)
+
+    def save(self, data: bytes, chart_format: str) -> str:
+        """保存图表并返回chart_id"""
+        chart_id = f"{hashlib.sha256(data).hexdigest()}.{chart_format}"
+        path = self._path(chart_id)
+        if self._touch(path):
+            # 重复的图表只更新时间，gc按最近使用时间清理
+            return chart_id
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.tmp")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+        return chart_id
+
+    def get_path(self, chart_id: str) -> Path:
+        path = self._path(chart_id)
+        # 读取也算作使用，仍在被查看的历史图表不会被gc删除
+        if not self._touch(path):
+            raise NotFoundException(f"Chart not found: {chart_id}")
+        return path
+
+    @staticmethod
+    def media_type(chart_id: str) -> str:
+        return CHART_MIME_TYPES[chart_id.rsplit(".", 1)[-1]]
+
+    def gc(self, max_age: float, max_bytes: int, now: Optional[float] = None) -> int:
+        """
+        删除超过max_age（秒）未使用的文件，总大小仍超过max_bytes时从最旧的文件开始删除。
+
+        Returns:
+            int: 删除的文件数
+        """
+        return remove_expired_files(self.directory, max_age, max_bytes, now)
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        """更新文件的使用时间，文件不存在（或已被gc删除）时返回False"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _path(self, chart_id: str) -> Path:
+        # chart_id来自请求参数，只接受内容哈希格式，防止路径穿越
+        if not _CHART_ID_RE.match(chart_id):
+            raise NotFoundException(f"Chart not found: {chart_id}")
+        return self.directory / chart_id
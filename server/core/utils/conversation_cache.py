@@ -0,0 +1,203 @@
+"""
+会话状态缓存。
+
+追问时只需要最近几轮的问题、回答摘要和最后生成的代码，不需要每轮从数据库读取完整的历史消息
+（response中内嵌的数据和图表）。状态保存在进程内的LRU缓存中，可选地同时写入Redis等共享存储，
+供多个worker共用；新消息写入数据库时同步更新缓存。记忆压缩的摘要同时保存在会话表中，
+缓存未命中时连同摘要未覆盖的消息一起从数据库恢复。
+"""
+import json
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from data_inteligence.helpers.lru_cache import LRUCache
+
+
+@dataclass
+class ConversationState:
+    """
+    会话中用于构建Agent记忆的精简状态。
+
+    Attributes:
+        messages (list): Memory格式的消息 `{"message": str, "is_user": bool}`，只保留最近的部分
+        last_code (str, optional): 最近一次生成的代码
+        total (int): 状态对应的数据库消息条数，用于判断缓存是否落后于数据库
+        summary (str, optional): 记忆压缩模式下较早消息的滚动摘要
+        summarized (int): 摘要覆盖的数据库消息条数，从数据库恢复时只加载之后的消息
+        turns (list): messages中每条记忆对应的数据库消息序号
+    """
+
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    last_code: Optional[str] = None
+    total: int = 0
+    summary: Optional[str] = None
+    summarized: int = 0
+    turns: List[int] = field(default_factory=list)
+
+    def append(
+        self, query: str, message: Optional[str], code: Optional[str], max_messages: int
+    ) -> "ConversationState":
+        """追加一轮问答，返回新的状态"""
+        messages, turns = list(self.messages), list(self.turns)
+        if message is not None or code:
+            messages.append({"message": query, "is_user": True})
+            answer = f"```python\n{code}\n```" if code else str(message)
+            messages.append({"message": answer, "is_user": False})
+            turns.extend([self.total, self.total])
+        state = replace(
+            self, messages=messages, turns=turns, last_code=code or self.last_code, total=self.total + 1
+        )
+        return state.truncate(max_messages)
+
+    def truncate(self, max_messages: int) -> "ConversationState":
+        """只保留最近 max_messages 条记忆"""
+        return replace(
+            self,
+            messages=self.messages[-max_messages:] if max_messages > 0 else [],
+            turns=self.turns[-max_messages:] if max_messages > 0 else [],
+        )
+
+    def fold(self, summary: str, count: int) -> "ConversationState":
+        """用新的摘要替换开头 count 条消息，返回新的状态"""
+        if count >= len(self.messages):
+            summarized = self.total
+        elif len(self.turns) == len(self.messages):
+            summarized = self.turns[count]
+        else:
+            # 旧版本缓存中没有turns，按每轮一问一答估算
+            summarized = self.total - (len(self.messages) - count) // 2
+        return replace(
+            self,
+            messages=self.messages[count:],
+            turns=self.turns[count:],
+            summary=summary,
+            summarized=max(summarized, self.summarized),
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data: str) -> "ConversationState":
+        return cls(**json.loads(data))
+
+
+class ConversationStateBackend(ABC):
+    """多个worker共享的会话状态存储"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisStateBackend(ConversationStateBackend):
+    """
+    Args:
+        ttl (int): 状态的过期时间（秒）
+        **connection_params: redis连接参数（host、port、db、password）
+    """
+
+    def __init__(self, ttl: int = 24 * 3600, prefix: str = "conversation_state:", **connection_params):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "The redis conversation cache backend requires the `redis` package, install it with `uv add redis`."
+            ) from e
+        self.client = redis.Redis(**connection_params)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(self.prefix + key)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str) -> None:
+        await self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class ConversationStateCache:
+    """
+    两级会话状态缓存：进程内LRU，以及可选的共享存储。
+
+    共享存储读写失败时只使用进程内缓存，调用方在缓存未命中时从数据库加载。
+
+    Args:
+        max_conversations (int): 进程内缓存的会话数
+        max_messages (int): 每个会话保留的记忆消息数
+        backend (ConversationStateBackend, optional): 共享存储
+    """
+
+    def __init__(
+        self,
+        max_conversations: int = 1024,
+        max_messages: int = 20,
+        backend: Optional[ConversationStateBackend] = None,
+    ):
+        self.max_messages = max_messages
+        self.backend = backend
+        self._local = LRUCache(max_conversations, name="conversation_state")
+
+    async def get(self, conversation_id: Any, total: Optional[int] = None) -> Optional[ConversationState]:
+        """
+        读取会话状态。
+
+        Args:
+            conversation_id: 会话ID
+            total (int, optional): 数据库中的消息条数，缓存的状态与之不一致（其他worker写入了新消息，
+                或写入的事务已回滚）时视为未命中
+        """
+        key = str(conversation_id)
+        state = self._local.get(key)
+        if (state is None or not _current(state, total)) and self.backend is not None:
+            try:
+                data = await self.backend.get(key)
+            except Exception as e:
+                logger.bind(name="fastapi_app").warning(f"conversation state backend read failed: {e}")
+                data = None
+            if data is not None:
+                state = ConversationState.from_json(data)
+                self._local.put(key, state)
+        return state if state is not None and _current(state, total) else None
+
+    async def put(self, conversation_id: Any, state: ConversationState) -> None:
+        key = str(conversation_id)
+        if len(state.messages) > self.max_messages:
+            state = state.truncate(self.max_messages)
+        self._local.put(key, state)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, state.to_json())
+            except Exception as e:
+                logger.bind(name="fastapi_app").warning(f"conversation state backend write failed: {e}")
+
+    async def append(
+        self, conversation_id: Any, query: str, message: Optional[str], code: Optional[str]
+    ) -> None:
+        """
+        写入新消息后同步更新状态。会话不在缓存中时不做处理，下次读取时从数据库加载。
+        """
+        state = await self.get(conversation_id)
+        if state is not None:
+            await self.put(conversation_id, state.append(query, message, code, self.max_messages))
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+
+def _current(state: ConversationState, total: Optional[int]) -> bool:
+    return total is None or state.total == total
@@ -0,0 +1,44 @@
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+
+def remove_expired_files(
+    directory: Union[str, Path], max_age: float, max_bytes: int, now: Optional[float] = None
+) -> int:
+    """
+    清理目录（包括子目录）中的文件：删除超过max_age（秒）未使用的文件，总大小仍超过max_bytes时
+    从最旧的文件开始删除。文件的修改时间即最近使用时间，由存储在读写时更新。
+
+    多个worker可能同时清理同一目录，其他进程已删除的文件直接跳过。
+
+    Returns:
+        int: 删除的文件数
+    """
+    directory = Path(directory)
+    if not directory.exists():
+        return 0
+    now = now if now is not None else time.time()
+
+    files = []
+    for path in directory.rglob("*"):
+        try:
+            if path.is_file():
+                stat = path.stat()
+                files.append((stat.st_mtime, stat.st_size, path))
+        except FileNotFoundError:
+            continue
+    files.sort()
+
+    removed = 0
+    total_bytes = sum(size for _, size, _ in files)
+    for mtime, size, path in files:
+        if mtime + max_age > now and total_bytes <= max_bytes:
+            break
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+    return removed
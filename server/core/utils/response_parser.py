@@ -1,11 +1,40 @@
-import base64
 import json
-from typing import Any
+from pathlib import Path
+from typing import Any, Optional
 
+import pandas as pd
+
+from data_inteligence.code_core.code_execution.charts import RenderedChart
+from data_inteligence.code_core.response.chart_spec import normalize_chart_spec
 from data_inteligence.helpers.response_parser import IResponseParser
+from server.core.utils.chart_store import ChartStore
+from server.core.utils.result_store import ResultStore
 
 
 class JsonResponseParser(IResponseParser):
+    """
+    Args:
+        result_store (ResultStore, optional): 超过max_rows的结果保存到服务端，响应只携带第一页
+        page_size (int): 结果分页时每页的行数
+        max_rows (int): 响应中直接返回的最大行数
+        chart_store (ChartStore, optional): 设置后图表保存到服务端，响应只返回图表地址
+        chart_url_prefix (str): 图表地址的路由前缀
+    """
+
+    def __init__(
+        self,
+        result_store: Optional[ResultStore] = None,
+        page_size: int = 100,
+        max_rows: int = 1000,
+        chart_store: Optional[ChartStore] = None,
+        chart_url_prefix: str = "/chat/charts",
+    ):
+        self.result_store = result_store
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.chart_store = chart_store
+        self.chart_url_prefix = chart_url_prefix
+
     def parse(self, result: dict) -> Any:
         """
         Parses result from the chat input
@@ -25,27 +54,58 @@ class JsonResponseParser(IResponseParser):
         if result["type"] == "plot":
             return self.format_plot(result)
         elif result["type"] == "dataframe":
-            json_data = json.loads(
-                result["value"].to_json(
-                    orient="split",
-                    date_format="iso",
-                    default_handler=str,
-                    force_ascii=False,
-                )
-            )
+            return self.format_dataframe(result)
+        elif result["type"] == "chart_spec":
             return {
-                "type": "dataframe",
-                "message": "Dataframe created: <dataframe>",
-                "value": {
-                    "headers": json_data["columns"],
-                    "rows": json_data["data"],
-                },
+                "type": "chart_spec",
+                "message": "Chart specification generated: <chart_spec>",
+                "value": normalize_chart_spec(result["value"]),
             }
 
         result["message"] = result["value"]
 
         return result
 
+    def format_dataframe(self, result: dict) -> Any:
+        df = result["value"]
+        if isinstance(df, dict):
+            df = pd.DataFrame(df)
+        elif isinstance(df, pd.Series):
+            df = df.to_frame()
+
+        value = {}
+        if self.result_store is not None and len(df) > self.max_rows:
+            # 大结果集保存为parquet，其余页通过 result_id 分页读取；无法保存时返回完整结果
+            result_id = self.result_store.save(df)
+            if result_id is not None:
+                value = {
+                    "result_id": result_id,
+                    "total_rows": len(df),
+                    "page_size": self.page_size,
+                }
+                df = df.head(self.page_size)
+
+        return {
+            "type": "dataframe",
+            "message": "Dataframe created: <dataframe>",
+            "value": {**self.dataframe_to_json(df), **value},
+        }
+
+    @staticmethod
+    def dataframe_to_json(df: pd.DataFrame) -> dict:
+        json_data = json.loads(
+            df.to_json(
+                orient="split",
+                date_format="iso",
+                default_handler=str,
+                force_ascii=False,
+            )
+        )
+        return {
+            "headers": json_data["columns"],
+            "rows": json_data["data"],
+        }
+
     def format_plot(self, result: dict) -> Any:
         """
         Display matplotlib plot against a user query.
@@ -57,17 +117,20 @@ class JsonResponseParser(IResponseParser):
         Returns:
             Any: Returns depending on the user input
         """
-        if "data:image/png;base64" not in result["value"]:
-            with open(result["value"], "rb") as image_file:
-                image_data = image_file.read()
-            # Encode the image data to Base64
-            base64_image = (
-                f"data:image/png;base64,{base64.b64encode(image_data).decode()}"
-            )
-            result = {
-                "type": result["type"],
-                "value": base64_image,
-            }
+        value = result["value"]
+        if value.startswith("data:image/"):
+            chart = RenderedChart.from_data_uri(value)
+        else:
+            # 图表未在内存中捕获时，读取代码写出的图表文件
+            path = Path(value)
+            chart = RenderedChart(path.read_bytes(), path.suffix.lstrip(".").lower() or "png")
+
+        if chart is not None:
+            if self.chart_store is not None:
+                value = f"{self.chart_url_prefix}/{self.chart_store.save(chart.data, chart.format)}"
+            else:
+                value = chart.data_uri
+        result = {"type": result["type"], "value": value}
 
         result["message"] = "Plot generated: <plot>"
 
@@ -0,0 +1,149 @@
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_inteligence.constants import DEFAULT_STORGE_PATH
+from server.core.exceptions import BadRequestException, NotFoundException
+from server.core.utils.file_gc import remove_expired_files
+
+DEFAULT_RESULT_DIRECTORY = DEFAULT_STORGE_PATH / "results"
+
+_RESULT_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ResultStore:
+    """
+    大结果集的服务端存储。
+
+    结果以parquet文件按用户隔离保存，聊天响应只携带第一页和result_id，其余数据通过分页接口读取。
+    读取结果会更新其使用时间，长时间未读取的结果由gc按时间和总大小清理。
+
+    Args:
+        user_id (str): 结果所属用户，只能读取自己的结果
+        root (str | Path): 结果文件根目录
+    """
+
+    def __init__(
+        self, user_id: Union[str, uuid.UUID], root: Union[str, Path] = DEFAULT_RESULT_DIRECTORY
+    ):
+        self.directory = Path(root) / str(user_id)
+
+    def save(self, df: pd.DataFrame) -> Optional[str]:
+        """
+        保存结果并返回result_id。
+
+        Arrow无法表示的对象列（混合类型、非字符串键的dict等）按字符串保存；列名重复的结果
+        无法按列名分页排序，不保存并返回None，由调用方直接返回完整结果。
+        """
+        if df.columns.has_duplicates:
+            return None
+        table = _to_arrow_table(df)
+
+        result_id = uuid.uuid4().hex
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(result_id)
+        temp_path = path.with_name(f".{path.name}.tmp")
+        pq.write_table(table, temp_path, compression="zstd")
+        os.replace(temp_path, path)
+        return result_id
+
+    def total_rows(self, result_id: str) -> int:
+        return pq.ParquetFile(self._existing_path(result_id)).metadata.num_rows
+
+    def get_page(
+        self,
+        result_id: str,
+        page: int = 1,
+        page_size: int = 100,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        读取一页结果。
+
+        Args:
+            result_id (str): 结果ID
+            page (int): 页码，从1开始
+            page_size (int): 每页行数
+            sort_by (str, optional): 排序列，必须是结果中的列
+            descending (bool): 是否降序
+
+        Returns:
+            Tuple[pd.DataFrame, int]: 当前页数据以及结果总行数
+        """
+        path = self._existing_path(result_id)
+        parquet_file = pq.ParquetFile(path)
+        total_rows = parquet_file.metadata.num_rows
+
+        query = f"SELECT * FROM read_parquet('{path}')"
+        if sort_by is not None:
+            if sort_by not in parquet_file.schema_arrow.names:
+                raise BadRequestException(f"Unknown sort column: {sort_by}")
+            column = sort_by.replace('"', '""')
+            query += f' ORDER BY "{column}" {"DESC" if descending else "ASC"} NULLS LAST'
+        query += " LIMIT ? OFFSET ?"
+
+        connection = duckdb.connect()
+        try:
+            df = connection.execute(query, [page_size, (page - 1) * page_size]).df()
+        finally:
+            connection.close()
+        return df, total_rows
+
+    @staticmethod
+    def gc(
+        max_age: float,
+        max_bytes: int,
+        root: Union[str, Path] = DEFAULT_RESULT_DIRECTORY,
+        now: Optional[float] = None,
+    ) -> int:
+        """
+        删除所有用户超过max_age（秒）未读取的结果，总大小仍超过max_bytes时从最旧的结果开始删除。
+
+        Returns:
+            int: 删除的文件数
+        """
+        return remove_expired_files(root, max_age, max_bytes, now)
+
+    def _path(self, result_id: str) -> Path:
+        # result_id来自请求参数，只接受uuid格式，防止路径穿越
+        if not _RESULT_ID_RE.match(result_id):
+            raise NotFoundException(f"Result not found: {result_id}")
+        return self.directory / f"{result_id}.parquet"
+
+    def _existing_path(self, result_id: str) -> Path:
+        path = self._path(result_id)
+        try:
+            # 读取也算作使用，仍在翻页的结果不会被gc删除
+            os.utime(path)
+        except FileNotFoundError:
+            raise NotFoundException(f"Result not found: {result_id}")
+        return path
+
+
+_ARROW_CONVERSION_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+
+
+def _to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except _ARROW_CONVERSION_ERRORS:
+        pass
+
+    df = df.copy()
+    for position, dtype in enumerate(df.dtypes):
+        if dtype != object:
+            continue
+        column = df.iloc[:, position]
+        try:
+            pa.array(column, from_pandas=True)
+        except _ARROW_CONVERSION_ERRORS:
+            df.isetitem(position, column.map(str).where(column.notna(), None))
+    return pa.Table.from_pandas(df, preserve_index=False)
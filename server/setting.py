@@ -25,12 +25,12 @@ class RedisConfig(BaseSettings):
     def get_connection_params(self) -> Dict[str, Any]:
         """获取Redis连接参数字典"""
         params = {
-            'host': self.host,
-            'port': self.port,
-            'db': self.db,
+            'host': self.HOST,
+            'port': self.PORT,
+            'db': self.DB,
         }
-        if self.password:
-            params['password'] = self.password
+        if self.PASSWORD:
+            params['password'] = self.PASSWORD
         return params
 
 
@@ -61,6 +61,51 @@ class Config(BaseConfig):
     USE_CACHE: int = 1
     # 用户空间下的数据集文件夹容量大小限制
     MAX_DATASET_SIZE: int = 1024 * 1024 * 1024  # 1GB
+    # 检查group_by数据集rollup和远程表快照是否过期的间隔（秒），0表示不启动调度
+    DATASET_REFRESH_INTERVAL: int = 300
+    # 结果集超过该行数时保存到服务端，聊天响应只返回第一页
+    RESULT_MAX_INLINE_ROWS: int = 1000
+    RESULT_PAGE_SIZE: int = 100
+    # 服务端结果集的清理间隔（秒，0表示不清理）、保留时间（天）和目录容量上限；
+    # 超过保留时间未被读取的结果会被删除，其分页接口返回404
+    RESULT_GC_INTERVAL: int = 3600
+    RESULT_MAX_AGE_DAYS: int = 7
+    RESULT_STORE_MAX_BYTES: int = 10 * 1024 * 1024 * 1024  # 10GB
+    # 生成代码在预热的子进程池中执行，0表示在API进程内执行
+    SANDBOX_POOL_SIZE: int = 2
+    # 单次代码执行的最长时间（秒）
+    SANDBOX_TIMEOUT: int = 60
+    # 单次代码执行可使用的CPU时间（秒）和新增内存（MB），0表示不限制
+    SANDBOX_CPU_TIME: int = 60
+    SANDBOX_MEMORY_MB: int = 2048
+    # 代码返回结果的最大行数和字节数，0表示不限制
+    RESULT_MAX_ROWS: int = 1_000_000
+    RESULT_MAX_BYTES: int = 256 * 1024 * 1024  # 256MB
+    # 图表在内存中渲染的格式（png/webp/svg）和分辨率
+    CHART_FORMAT: str = "png"
+    CHART_DPI: int = 100
+    # 单条序列绘图的最大点数，超过时绘图前先降采样
+    PLOT_MAX_POINTS: int = 5000
+    # 图表保存到按内容寻址的存储中，响应只返回图表地址；0表示响应中内嵌base64
+    CHART_STORE_ENABLED: int = 0
+    # 图表目录的清理间隔（秒，0表示不清理）、文件保留时间（天）和目录容量上限；
+    # 超过保留时间未被查看的图表会被删除，会话历史中的图表随之失效
+    CHART_GC_INTERVAL: int = 3600
+    CHART_MAX_AGE_DAYS: int = 7
+    CHART_MAX_BYTES: int = 1024 * 1024 * 1024  # 1GB
+    # 每轮对话的执行轨迹（提示词、LLM回复、SQL及耗时）保存目录，为空表示不记录；可用 scripts/replay_traces.py 重放
+    TRACE_DIRECTORY: str = ""
+    # 会话状态（最近的记忆消息和最后生成的代码）缓存：进程内缓存的会话数、每个会话保留的消息数，
+    # 后端为memory（仅进程内）或redis（多个worker共享，使用REDIS配置），以及Redis中的过期时间（秒）
+    CONVERSATION_CACHE_SIZE: int = 1024
+    CONVERSATION_MEMORY_MESSAGES: int = 20
+    CONVERSATION_CACHE_BACKEND: str = "memory"
+    CONVERSATION_CACHE_TTL: int = 24 * 3600
+    # 记忆压缩：提示词中历史消息的token预算，较早的消息在响应返回后折叠为摘要；0表示不压缩
+    MEMORY_TOKEN_BUDGET: int = 0
+    MEMORY_SUMMARY_TOKENS: int = 300
+    # 摘要由LLM生成，0表示使用抽取式摘要（不调用LLM）
+    MEMORY_SUMMARY_USE_LLM: int = 1
 
 
 config: Config = Config()
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from agent_core.agent.dataframe_agent import DataFrameAgent
+from agent_core.agent.replay import replay_trace
+from agent_core.agent.trace import TraceRecorder
+from agent_core.llm.replay import ReplayChatModel
+from data_inteligence.dataframe import DataFrame
+
+TABLE = "sales"
+CODE = f"""```python
+df = execute_sql_query("SELECT region, SUM(amount) AS total FROM {TABLE} GROUP BY region ORDER BY region")
+result = {{"type": "dataframe", "value": df}}
+```"""
+
+
+def sales(rows: int = 3) -> DataFrame:
+    frame = pd.DataFrame({"region": ["n", "s", "w"] * rows, "amount": [1.0, 2.0, 3.0] * rows})
+    return DataFrame(frame, table_name=TABLE)
+
+
+@pytest.mark.asyncio
+async def test_records_each_stage_of_a_turn(tmp_path):
+    agent = DataFrameAgent(
+        [sales()], config={"llm": ReplayChatModel([CODE]), "trace_directory": str(tmp_path)}
+    )
+    response = await agent.chat("total by region", output_type="dataframe")
+
+    (path,) = tmp_path.glob("*.json")
+    trace = TraceRecorder(tmp_path).load()[0]
+    assert path.stem == trace.trace_id
+    assert [event["stage"] for event in trace.events] == ["llm", "clean", "execute", "sql", "parse"]
+    assert trace.completions() == [CODE]
+    assert "SUM(amount)" in trace.events[1]["code"]
+    assert trace.events[3]["rows"] == 3
+    assert trace.response_type == response.type == "dataframe"
+    assert trace.datasets == [{"name": TABLE, "columns": {"region": "string", "amount": "float"}}]
+
+
+@pytest.mark.asyncio
+async def test_tracing_is_off_by_default(tmp_path):
+    agent = DataFrameAgent([sales()], config={"llm": ReplayChatModel([CODE])})
+    await agent.chat("total by region", output_type="dataframe")
+    assert agent.last_trace is None
+
+
+@pytest.mark.asyncio
+async def test_replay_against_fixtures(tmp_path):
+    agent = DataFrameAgent(
+        [sales()], config={"llm": ReplayChatModel([CODE]), "trace_directory": str(tmp_path / "traces")}
+    )
+    await agent.chat("total by region", output_type="dataframe")
+    recorded = agent.last_trace
+
+    fixtures = tmp_path / "fixtures"
+    fixtures.mkdir()
+    sales(rows=1000).to_parquet(fixtures / f"{TABLE}.parquet")
+
+    result = await replay_trace(recorded, fixtures)
+    assert not result.missing_fixtures and not result.response_changed
+    assert [timing.stage for timing in result.timings()] == ["llm", "clean", "sql", "execute", "parse"]
+    assert result.replayed.events[3]["rows"] == 3
+
+    # 没有本地数据时以空表代替，录制的回复用完后不再调用LLM
+    result = await replay_trace(recorded)
+    assert result.missing_fixtures == [TABLE]
+    assert result.replayed.events[3]["rows"] == 0
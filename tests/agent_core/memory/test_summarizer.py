@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from agent_core.agent.dataframe_agent import DataFrameAgent
+from agent_core.llm.replay import ReplayChatModel
+from agent_core.memory.memory import Memory, estimate_tokens
+from agent_core.memory.summarizer import MemorySummarizer, extractive_summary
+from data_inteligence.dataframe import DataFrame
+
+
+def code_answer(month: int) -> str:
+    return f'```python\ndf = execute_sql_query("SELECT region, SUM(amount) FROM sales WHERE month = {month} GROUP BY region")\n```'
+
+
+def test_estimate_tokens_counts_cjk_characters():
+    assert estimate_tokens("销售额") == 3
+    assert estimate_tokens("abcdefgh") == 2
+
+
+@pytest.mark.asyncio
+async def test_prompt_size_stays_flat_as_conversation_grows():
+    memory = Memory(10, token_budget=150)
+    summarizer = MemorySummarizer(max_tokens=80)
+    sizes = []
+    for month in range(1, 31):
+        memory.add(f"What were the sales by region in month {month}?", is_user=True)
+        memory.add(code_answer(month), is_user=False)
+        await summarizer.compact(memory)
+        sizes.append(estimate_tokens(memory.get_conversation()))
+
+    assert max(sizes[5:]) <= 150 + 10
+    assert max(sizes[5:]) - min(sizes[5:]) < 20
+    assert "month = 28" in memory.summary
+    assert memory.get_messages()[-1].startswith("### ANSWER")
+    assert not memory.pending_messages()
+
+
+def test_extractive_summary_keeps_recent_turns():
+    messages = [
+        {"message": "Total sales?", "is_user": True},
+        {"message": code_answer(1), "is_user": False},
+        {"message": "And the average?", "is_user": True},
+        {"message": "The average is 42\nmore details", "is_user": False},
+    ]
+    summary = extractive_summary("- Earlier question", messages, max_tokens=100)
+    assert summary.splitlines() == [
+        "- Earlier question",
+        "- Total sales? -> SQL: SELECT region, SUM(amount) FROM sales WHERE month = 1 GROUP BY region",
+        "- And the average? -> The average is 42",
+    ]
+    assert extractive_summary(None, messages, max_tokens=10).splitlines()[0].startswith("- And the average?")
+
+
+@pytest.mark.asyncio
+async def test_agent_summarizes_in_background_between_turns():
+    table = "sales"
+    code = f'```python\ndf = execute_sql_query("SELECT * FROM {table}")\nresult = {{"type": "dataframe", "value": df}}\n```'
+    llm = ReplayChatModel([code, code, "User looked at sales twice.", code])
+    agent = DataFrameAgent(
+        [DataFrame(pd.DataFrame({"amount": [1.0]}), table_name=table)],
+        config={"llm": llm, "memory_token_budget": 30},
+    )
+    await agent.chat("show me every row of the sales table including the amount column", output_type="dataframe")
+    await agent.follow_up("show me every row of the sales table once again, sorted by amount", output_type="dataframe")
+    assert agent._compaction is not None
+
+    await agent.follow_up("and once more", output_type="dataframe")
+    assert agent._state.memory.summary == "User looked at sales twice."
+    assert "User looked at sales twice." in agent.last_prompt_used.to_string()
+    assert not llm.completions
@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+
+from agent_core.sandbox import SubprocessSandbox
+from agent_core.sandbox.ipc import SHARED_MEMORY_MIN_BYTES, ArrowFrame, decode, encode
+from data_inteligence.code_core.code_execution.limits import EXECUTION_LIMITS_NAME, ExecutionLimits
+from data_inteligence.exceptions import CodeExecutionError, ExecutionTimeoutError, MemoryLimitError
+
+
+@pytest.fixture(scope="module")
+def sandbox():
+    sandbox = SubprocessSandbox(pool_size=1, timeout=10)
+    sandbox.start()
+    yield sandbox
+    sandbox.stop()
+
+
+def test_large_dataframes_are_transferred_through_shared_memory():
+    df = pd.DataFrame({"id": range(50_000), "name": ["row"] * 50_000})
+    frame = encode(df)
+
+    assert isinstance(frame, ArrowFrame) and frame.shm_name is not None
+    assert frame.size >= SHARED_MEMORY_MIN_BYTES
+    pd.testing.assert_frame_equal(decode(frame), df)
+
+
+def test_sql_queries_are_proxied_to_host(sandbox):
+    queries = []
+
+    def execute_sql_query(query):
+        queries.append(query)
+        return pd.DataFrame({"region": ["north", "south"], "amount": [10.0, 5.5]})
+
+    code = (
+        "df = execute_sql_query('SELECT region, amount FROM sales')\n"
+        "result = {'type': 'dataframe', 'value': df[df['amount'] > threshold]}"
+    )
+    result = sandbox.execute(code, {"execute_sql_query": execute_sql_query, "threshold": 6})
+
+    assert queries == ["SELECT region, amount FROM sales"]
+    assert result["type"] == "dataframe"
+    assert result["value"].to_dict("list") == {"region": ["north"], "amount": [10.0]}
+
+
+def test_worker_errors_carry_traceback(sandbox):
+    with pytest.raises(CodeExecutionError, match="ZeroDivisionError"):
+        sandbox.execute("result = {'type': 'number', 'value': 1 / 0}", {})
+
+    result = sandbox.execute("result = {'type': 'number', 'value': pd.Series([1, 2]).sum()}", {})
+    assert result["value"] == 3
+
+
+def test_timed_out_worker_is_replaced():
+    sandbox = SubprocessSandbox(pool_size=1, timeout=1)
+    try:
+        with pytest.raises(CodeExecutionError, match="timed out"):
+            sandbox.execute("while True: pass", {})
+        sandbox.timeout = 30
+        result = sandbox.execute("result = {'type': 'string', 'value': 'ok'}", {})
+        assert result["value"] == "ok"
+    finally:
+        sandbox.stop()
+
+
+def test_failed_replacement_worker_is_retried(monkeypatch):
+    from agent_core.sandbox import subprocess_sandbox
+
+    starts = []
+
+    class FlakyWorker(subprocess_sandbox._Worker):
+        def wait_ready(self, timeout):
+            starts.append(timeout)
+            # 初始worker正常启动，第一个替换worker启动失败
+            if len(starts) == 2:
+                self.close()
+                raise CodeExecutionError("Sandbox worker failed to start")
+            return super().wait_ready(timeout)
+
+    monkeypatch.setattr(subprocess_sandbox, "_Worker", FlakyWorker)
+    sandbox = SubprocessSandbox(pool_size=1, timeout=1)
+    sandbox.replenish_retry_delay = 0.1
+    try:
+        with pytest.raises(CodeExecutionError, match="timed out"):
+            sandbox.execute("while True: pass", {})
+        sandbox.timeout = 30
+        result = sandbox.execute("result = {'type': 'string', 'value': 'ok'}", {})
+        assert result["value"] == "ok"
+        assert len(starts) == 3
+    finally:
+        sandbox.stop()
+
+
+def test_resource_limits_raise_typed_errors(sandbox):
+    limits = {EXECUTION_LIMITS_NAME: ExecutionLimits(cpu_time=1, memory_mb=200)}
+    with pytest.raises(MemoryLimitError, match="memory limit of 200 MB"):
+        sandbox.execute("x = np.ones(10 ** 9)", limits)
+    with pytest.raises(ExecutionTimeoutError, match="CPU time limit"):
+        sandbox.execute("while True: pass", limits)
+
+    # 触发限制的worker被替换，新worker不受之前限制的影响
+    result = sandbox.execute("result = {'type': 'number', 'value': float(np.ones(10 ** 7).sum())}", {})
+    assert result["value"] == 10 ** 7
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from server.core.exceptions import NotFoundException
+from server.core.utils.chart_store import ChartStore
+
+
+def test_charts_are_content_addressed(tmp_path):
+    store = ChartStore("user-1", root=tmp_path)
+    chart_id = store.save(b"\x89PNG chart", "png")
+
+    assert store.save(b"\x89PNG chart", "png") == chart_id
+    assert store.get_path(chart_id).read_bytes() == b"\x89PNG chart"
+    assert store.media_type(chart_id) == "image/png"
+    with pytest.raises(NotFoundException):
+        store.get_path("../secret.png")
+    with pytest.raises(NotFoundException):
+        ChartStore("user-2", root=tmp_path).get_path(chart_id)
+
+
+def test_reading_a_chart_keeps_it_from_expiring(tmp_path):
+    store = ChartStore("user-1", root=tmp_path)
+    chart_id = store.save(b"chart", "png")
+    os.utime(store.get_path(chart_id), (1000, 1000))
+
+    store.get_path(chart_id)
+    assert ChartStore(root=tmp_path).gc(max_age=3600, max_bytes=1024) == 0
+
+
+def test_gc_removes_expired_files_and_enforces_capacity(tmp_path):
+    store = ChartStore("user-1", root=tmp_path)
+    old = store.save(b"old", "png")
+    legacy = tmp_path / "temp_chart_1234.png"
+    legacy.write_bytes(b"legacy")
+    for path in (store.directory / old, legacy):
+        os.utime(path, (1000, 1000))
+    first = store.save(b"a" * 10, "png")
+    os.utime(store.directory / first, (5000, 5000))
+    second = store.save(b"b" * 10, "png")
+    os.utime(store.directory / second, (6000, 6000))
+
+    assert ChartStore(root=tmp_path).gc(max_age=3600, max_bytes=15, now=6000) == 3
+    assert [path.name for path in store.directory.iterdir()] == [second]
+    assert not legacy.exists()
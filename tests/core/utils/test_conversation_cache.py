@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from agent_core.memory.memory import estimate_tokens
+from server.app.models import UserConversation
+from server.app.repositories.conversation import ConversationRepository
+from server.core.utils.conversation_cache import (
+    ConversationState,
+    ConversationStateBackend,
+    ConversationStateCache,
+)
+
+
+class DictBackend(ConversationStateBackend):
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value):
+        self.data[key] = value
+
+
+def test_state_keeps_recent_messages_and_last_code():
+    state = ConversationState()
+    state = state.append("q1", "Dataframe created: <dataframe>", "df = 1", max_messages=4)
+    state = state.append("q2", "42", None, max_messages=4)
+    state = state.append("q3", None, None, max_messages=4)
+
+    assert state.total == 3
+    assert state.last_code == "df = 1"
+    assert [m["message"] for m in state.messages] == ["q1", "```python\ndf = 1\n```", "q2", "42"]
+    assert ConversationState.from_json(state.to_json()) == state
+
+
+@pytest.mark.asyncio
+async def test_shared_backend_and_stale_local_state():
+    backend = DictBackend()
+    worker_a = ConversationStateCache(max_messages=4, backend=backend)
+    worker_b = ConversationStateCache(max_messages=4, backend=backend)
+
+    await worker_a.put("c1", ConversationState(total=1))
+    assert (await worker_b.get("c1", total=1)).total == 1
+
+    # worker_b写入新消息后，worker_a进程内的状态落后于数据库，从共享存储读取
+    await worker_b.append("c1", "q", "answer", "code")
+    assert (await worker_a.get("c1", total=2)).last_code == "code"
+    assert await worker_a.get("c1", total=3) is None
+
+
+def message_row(query, code, message, summary=None, summarized=0):
+    return SimpleNamespace(
+        query=query, code_generated=code, message=message, memory_summary=summary, memory_summarized=summarized
+    )
+
+
+@pytest.fixture
+def repository():
+    session = MagicMock(add=MagicMock(), execute=AsyncMock())
+    repository = ConversationRepository(
+        UserConversation, session, state_cache=ConversationStateCache(max_messages=4)
+    )
+    repository.get_messages_count = AsyncMock(return_value=5)
+    return repository
+
+
+@pytest.mark.asyncio
+async def test_state_loaded_from_recent_rows_then_written_through(repository):
+    rows = [
+        message_row("q5", None, "Plot generated: <plot>"),
+        message_row("q4", "code4", "Dataframe created: <dataframe>"),
+    ]
+    repository.session.execute.return_value = MagicMock(all=MagicMock(return_value=rows))
+
+    state = await repository.get_conversation_state("c1")
+    assert state.total == 5 and state.last_code == "code4"
+    assert [m["message"] for m in state.messages][::2] == ["q4", "q5"]
+    assert repository.session.execute.await_count == 1
+
+    # 跳过Transactional，直接调用写入消息的方法
+    await ConversationRepository.add_conversation_message.__wrapped__(
+        repository, "c1", "q6", [{"type": "number", "value": 1, "message": 1}], None
+    )
+    repository.get_messages_count.return_value = 6
+    state = await repository.get_conversation_state("c1")
+    assert state.messages[-2:] == [{"message": "q6", "is_user": True}, {"message": "1", "is_user": False}]
+    assert repository.session.execute.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_summary_restored_from_database_on_cache_miss(repository):
+    # q1..q3 已经折叠进摘要，缓存丢失后只把摘要之后的 q4、q5 作为原始消息加载
+    repository.session.execute.return_value = MagicMock(
+        all=MagicMock(
+            return_value=[message_row(f"q{i}", None, f"a{i}", "earlier turns", 3) for i in (5, 4, 3)]
+        )
+    )
+
+    state = await repository.get_conversation_state("c1")
+    assert state.summary == "earlier turns" and state.summarized == 3 and state.total == 5
+    assert [m["message"] for m in state.messages] == ["q4", "a4", "q5", "a5"]
+    assert state.turns == [3, 3, 4, 4]
+
+
+@pytest.mark.asyncio
+async def test_background_compaction_folds_old_messages(monkeypatch):
+    from server.app.utils import memory as memory_utils
+
+    cache = ConversationStateCache(max_messages=20)
+    monkeypatch.setattr(memory_utils, "get_conversation_cache", lambda: cache)
+    monkeypatch.setattr(memory_utils.config, "MEMORY_TOKEN_BUDGET", 40)
+
+    state = ConversationState()
+    for turn in range(6):
+        state = state.append(f"question number {turn}", f"answer number {turn}", None, max_messages=20)
+    await cache.put("c1", state)
+
+    repository = MagicMock(save_memory_summary=AsyncMock())
+    await memory_utils.compact_conversation_memory("c1", repository=repository)
+    compacted = await cache.get("c1", total=6)
+    assert "question number 3 -> answer number 3" in compacted.summary
+    assert compacted.messages == state.messages[-len(compacted.messages):]
+    assert len(compacted.messages) < len(state.messages)
+    # 摘要和覆盖的消息条数保存到数据库
+    assert compacted.summarized == 6 - len(compacted.messages) // 2
+    repository.save_memory_summary.assert_awaited_once_with("c1", compacted.summary, compacted.summarized)
+
+    memory = memory_utils.prepare_conv_memory(compacted, token_budget=40)
+    assert memory.get_messages()[0].startswith("### SUMMARY")
+    assert estimate_tokens(memory.get_conversation()) <= 40
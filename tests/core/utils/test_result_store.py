@@ -0,0 +1,88 @@
+import os
+
+import pandas as pd
+import pytest
+
+from server.core.exceptions import BadRequestException, NotFoundException
+from server.core.utils.response_parser import JsonResponseParser
+from server.core.utils.result_store import ResultStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore("user-1", root=tmp_path)
+
+
+def test_large_dataframe_is_stored_behind_result_handle(store):
+    parser = JsonResponseParser(result_store=store, page_size=2, max_rows=3)
+    df = pd.DataFrame({"id": range(10), "value": [i * 1.5 for i in range(10)]})
+
+    response = parser.parse({"type": "dataframe", "value": df})
+
+    value = response["value"]
+    assert value["total_rows"] == 10
+    assert value["page_size"] == 2
+    assert value["rows"] == [[0, 0.0], [1, 1.5]]
+    assert store.total_rows(value["result_id"]) == 10
+
+
+def test_small_dataframe_is_returned_inline(store):
+    parser = JsonResponseParser(result_store=store, max_rows=3)
+
+    response = parser.parse({"type": "dataframe", "value": pd.DataFrame({"id": [1, 2]})})
+
+    assert response["value"] == {"headers": ["id"], "rows": [[1], [2]]}
+
+
+def test_get_page_sorts_and_paginates(store):
+    result_id = store.save(pd.DataFrame({"id": range(5), "score": [3, 1, 4, 1, 5]}))
+
+    df, total_rows = store.get_page(result_id, page=2, page_size=2, sort_by="score", descending=True)
+
+    assert total_rows == 5
+    assert df["score"].tolist() == [3, 1]
+
+
+def test_results_are_isolated_per_user(store, tmp_path):
+    result_id = store.save(pd.DataFrame({"id": [1]}))
+
+    with pytest.raises(NotFoundException):
+        ResultStore("user-2", root=tmp_path).get_page(result_id)
+    with pytest.raises(NotFoundException):
+        store.get_page("../user-2/x")
+    with pytest.raises(BadRequestException):
+        store.get_page(result_id, sort_by="missing")
+
+
+def test_gc_removes_results_not_read_recently(store, tmp_path):
+    kept = store.save(pd.DataFrame({"id": [1]}))
+    expired = ResultStore("user-2", root=tmp_path).save(pd.DataFrame({"id": [2]}))
+    for path in tmp_path.rglob("*.parquet"):
+        os.utime(path, (1000, 1000))
+
+    # 读取过的结果更新了使用时间
+    store.get_page(kept)
+    assert ResultStore.gc(max_age=3600, max_bytes=1 << 30, root=tmp_path) == 1
+    assert store.total_rows(kept) == 1
+    with pytest.raises(NotFoundException):
+        ResultStore("user-2", root=tmp_path).get_page(expired)
+
+
+def test_mixed_type_columns_are_stored_as_strings(store):
+    df = pd.DataFrame({"id": range(4), "value": [1, "x", {1: 2}, None]})
+
+    result_id = store.save(df)
+
+    page, _ = store.get_page(result_id, page_size=10)
+    assert page["value"].tolist()[:3] == ["1", "x", "{1: 2}"]
+    assert pd.isna(page["value"].iloc[3])
+
+
+def test_duplicate_columns_fall_back_to_inline_response(store):
+    parser = JsonResponseParser(result_store=store, page_size=2, max_rows=3)
+    df = pd.DataFrame([[i, i * 2] for i in range(5)], columns=["a", "a"])
+
+    response = parser.parse({"type": "dataframe", "value": df})
+
+    assert "result_id" not in response["value"]
+    assert len(response["value"]["rows"]) == 5
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from data_inteligence.code_core.response import ChartSpecResponse, ResponseParser
+from data_inteligence.code_core.response.chart_spec import MAX_CHART_SPEC_POINTS
+
+
+def spec(data, field="total"):
+    return {
+        "mark": "bar",
+        "encoding": {
+            "x": {"field": "region", "type": "nominal"},
+            "y": {"field": field, "type": "quantitative"},
+        },
+        "data": data,
+    }
+
+
+def test_chart_spec_inlines_aggregated_data():
+    df = pd.DataFrame({"region": ["north", "south"], "total": [30.0, 5.5]})
+    response = ResponseParser().parse({"type": "chart_spec", "value": spec(df)})
+
+    assert isinstance(response, ChartSpecResponse)
+    assert response.value["data"] == {
+        "values": [{"region": "north", "total": 30.0}, {"region": "south", "total": 5.5}]
+    }
+    assert response.value["$schema"].startswith("https://vega.github.io/schema/vega-lite/")
+
+
+@pytest.mark.parametrize(
+    "value, message",
+    [
+        (spec(pd.DataFrame({"region": ["a"], "total": [1]}), field="amount"), "not in the data columns"),
+        ({**spec([{"region": "a", "total": 1}]), "mark": "pie3d"}, "mark must be one of"),
+        (spec(pd.DataFrame({"region": range(MAX_CHART_SPEC_POINTS + 1), "total": 1})), "aggregate the data in SQL"),
+    ],
+)
+def test_invalid_chart_specs_are_rejected(value, message):
+    with pytest.raises(ValueError, match=message):
+        ResponseParser().parse({"type": "chart_spec", "value": value})
@@ -0,0 +1,58 @@
+import base64
+from types import SimpleNamespace
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from data_inteligence.code_core.code_execution import CodeExecutor
+from data_inteligence.code_core.code_generation import CodeCleaner
+from data_inteligence.code_core.response.chart import ChartResponse
+from data_inteligence.dataframe import DataFrame
+
+CODE = """
+import matplotlib.pyplot as plt
+df = execute_sql_query("SELECT region, amount FROM {table}")
+fig, ax = plt.subplots()
+ax.bar(df["region"], df["amount"])
+fig.savefig("sales.png", bbox_inches="tight")
+plt.show()
+result = {{"type": "plot", "value": "sales.png"}}
+"""
+
+
+def run(code, chart_format, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = DataFrame(pd.DataFrame({"region": ["north", "south"], "amount": [10.0, 5.5]}))
+    cleaned = CodeCleaner(SimpleNamespace(dfs=[df], skills=[])).clean_code(
+        code.format(table=df.schema.name)
+    )
+    executor = CodeExecutor(config=SimpleNamespace(chart_format=chart_format, chart_dpi=50))
+    executor.add_to_env("execute_sql_query", lambda query: df)
+    return executor.execute_and_return_result(cleaned)
+
+
+def test_charts_are_rendered_in_memory_and_figures_closed(tmp_path, monkeypatch):
+    open_figures = plt.get_fignums()
+    result = run(CODE, "png", tmp_path, monkeypatch)
+
+    assert result["value"].startswith("data:image/png;base64,")
+    assert base64.b64decode(result["value"].split(",", 1)[1]).startswith(b"\x89PNG")
+    assert not any(tmp_path.rglob("*.png"))
+    assert plt.get_fignums() == open_figures
+
+
+def test_chart_format_is_configurable(tmp_path, monkeypatch):
+    result = run(CODE, "svg", tmp_path, monkeypatch)
+
+    assert result["value"].startswith("data:image/svg+xml;base64,")
+    assert b"<svg" in base64.b64decode(result["value"].split(",", 1)[1])
+
+
+def test_svg_chart_response_skips_pil(tmp_path, monkeypatch):
+    result = run(CODE, "svg", tmp_path, monkeypatch)
+    response = ChartResponse(result["value"])
+
+    assert str(response) == result["value"]
+    assert b"<svg" in base64.b64decode(response.get_base64_image())
+    response.save(tmp_path / "chart.svg")
+    assert b"<svg" in (tmp_path / "chart.svg").read_bytes()
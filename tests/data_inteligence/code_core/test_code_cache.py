@@ -0,0 +1,36 @@
+import pytest
+
+from data_inteligence.code_core.code_execution import CodeArtifactCache, CodeExecutor
+
+CODE = """
+sql_query = "SELECT region, SUM(amount) AS total FROM sales GROUP BY region"
+df = execute_sql_query(sql_query)
+result = {"type": "number", "value": len(df)}
+"""
+
+
+def test_artifact_holds_static_analysis_and_is_reused():
+    cache = CodeArtifactCache(max_size=4)
+    artifact = cache.get(CODE)
+
+    assert artifact.sql_queries == (
+        "SELECT region, SUM(amount) AS total FROM sales GROUP BY region",
+    )
+    assert {"execute_sql_query", "len"} <= artifact.function_calls
+    assert cache.get(CODE) is artifact
+    assert cache.get(CODE + "\n") is not artifact
+
+
+def test_syntax_errors_are_not_cached():
+    cache = CodeArtifactCache(max_size=4)
+    with pytest.raises(SyntaxError):
+        cache.get("result = (")
+    with pytest.raises(SyntaxError):
+        cache.get("result = (")
+
+
+def test_executor_runs_cached_code_in_a_fresh_environment():
+    for rows in ([1, 2], [1, 2, 3]):
+        executor = CodeExecutor(config=None)
+        executor.add_to_env("execute_sql_query", lambda query, rows=rows: rows)
+        assert executor.execute_and_return_result(CODE) == {"type": "number", "value": len(rows)}
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from data_inteligence.code_core.code_execution import code_artifact_cache
+from data_inteligence.code_core.code_generation import CodeCleaner
+from data_inteligence.dataframe import DataFrame
+from data_inteligence.exceptions import MaliciousQueryError
+
+
+@pytest.fixture
+def cleaner():
+    df = DataFrame(pd.DataFrame({"region": ["north"], "amount": [1.0]}))
+    return CodeCleaner(SimpleNamespace(dfs=[df], skills=[])), df.schema.name
+
+
+def test_analysis_cleans_code_and_collects_results_in_one_pass(cleaner):
+    cleaner, table = cleaner
+    code = f'''
+import matplotlib.pyplot as plt
+def execute_sql_query(query):
+    pass
+df = execute_sql_query("SELECT region, amount FROM {table};")
+for column in df.columns:
+    plt.show()
+plt.savefig(f"chart_{{column}}.png")
+plt.show()
+result = {{"type": "plot", "value": "chart.png"}}
+'''
+    analysis = cleaner.analyze(code)
+
+    assert "def execute_sql_query" not in analysis.code
+    assert "plt.show" not in analysis.code
+    assert f"FROM {table}'" in analysis.code
+    assert [(sql.query, sql.lineno) for sql in analysis.sql_queries] == [
+        (f"SELECT region, amount FROM {table}", 5)
+    ]
+    assert {"execute_sql_query", "plt.savefig"} <= analysis.function_calls
+    assert len(analysis.chart_paths) == 1
+    assert analysis.code.count(analysis.chart_paths[0]) == 2
+    # 清洗后的代码已登记到编译缓存
+    artifact = code_artifact_cache.get(analysis.code)
+    assert artifact.sql_queries == (f"SELECT region, amount FROM {table}",)
+
+
+def test_unauthorized_tables_are_rejected(cleaner):
+    cleaner, _ = cleaner
+    with pytest.raises(MaliciousQueryError):
+        cleaner.clean_code('df = execute_sql_query("SELECT * FROM users")')
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agent_core.skills import SkillType
+from agent_core.skills.manager import SkillsManager
+from data_inteligence.code_core.code_execution import CodeExecutor
+from data_inteligence.code_core.code_execution.environment import get_base_environment
+from data_inteligence.exceptions import CodeExecutionError, ResultTooLargeError
+
+
+def test_executions_do_not_leak_into_the_base_environment():
+    base = get_base_environment()
+    assert get_base_environment() is base
+
+    executor = CodeExecutor(config=None)
+    executor.add_to_env("factor", 2)
+    result = executor.execute_and_return_result(
+        "pd = None\nresult = {'type': 'number', 'value': 21 * factor}"
+    )
+
+    assert result["value"] == 42
+    assert base["pd"] is not None and "factor" not in base and "result" not in base
+    assert CodeExecutor(config=None).environment["pd"] is base["pd"]
+
+
+def test_skills_are_bound_when_registered():
+    def double(value):
+        """Doubles a value"""
+        return value * 2
+
+    SkillsManager.add_skills(SkillType(double))
+    try:
+        functions = SkillsManager.get_functions()
+        executor = CodeExecutor(config=None, base_environment={**get_base_environment(), **functions})
+        result = executor.execute_and_return_result("result = {'type': 'number', 'value': double(4)}")
+        assert result["value"] == 8
+    finally:
+        SkillsManager.clear_skills()
+    assert "double" not in SkillsManager.get_functions()
+
+
+def test_execution_errors_are_typed():
+    executor = CodeExecutor(config=SimpleNamespace(max_result_rows=10))
+    with pytest.raises(ResultTooLargeError, match="100 rows"):
+        executor.execute_and_return_result(
+            "result = {'type': 'dataframe', 'value': pd.DataFrame({'a': range(100)})}"
+        )
+    with pytest.raises(CodeExecutionError, match="ZeroDivisionError"):
+        executor.execute_and_return_result("result = {'type': 'number', 'value': 1 / 0}")
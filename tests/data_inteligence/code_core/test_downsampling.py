@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_inteligence.code_core.code_execution import CodeExecutor
+from data_inteligence.code_core.code_execution.downsampling import PlotGuard, downsample, lttb_indices
+from data_inteligence.code_core.code_generation import CodeCleaner
+from data_inteligence.dataframe import DataFrame
+
+
+@pytest.fixture
+def series():
+    values = np.sin(np.arange(100_000) / 1000)
+    values[12_345] = 50.0
+    values[54_321] = np.nan
+    return pd.Series(values, index=pd.date_range("2024-01-01", periods=len(values), freq="min"))
+
+
+def test_lttb_keeps_endpoints_and_peaks(series):
+    indices = lttb_indices(series.index, series.to_numpy(), 500)
+
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == len(series) - 1
+    assert 12_345 in indices
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_downsample_frame_and_scatter(series):
+    df = series.rename("value").rename_axis("ts").reset_index().assign(other=np.random.rand(len(series)))
+
+    line = downsample(df, max_points=1000, x="ts", y=["value", "other"])
+    assert len(line) <= 1000
+    assert line["value"].max() == 50.0
+
+    scatter = downsample(df, max_points=400, x="value", y="other", kind="scatter")
+    assert len(scatter) <= 400
+    with pytest.raises(ValueError):
+        downsample(df, kind="bar")
+
+
+def test_guard_reduces_plotted_points_and_keeps_histogram(series):
+    guard = PlotGuard(max_points=1000)
+    fig, ax = plt.subplots()
+    try:
+        (line,) = guard.plot(ax, series)
+        assert len(line.get_xdata()) == 1000
+
+        collection = guard.scatter(ax, series.to_numpy(), np.arange(len(series)), c=np.arange(len(series)))
+        assert len(collection.get_offsets()) <= 1000
+        assert len(collection.get_array()) == len(collection.get_offsets())
+
+        values = np.random.randn(100_000)
+        counts, _, _ = guard.hist(ax, values, bins=20)
+        assert np.array_equal(counts, np.histogram(values, bins=20)[0])
+    finally:
+        plt.close(fig)
+
+
+def test_cleaned_code_plots_through_guard(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    df = DataFrame(pd.DataFrame({"x": [1.0], "y": [1.0]}))
+    code = f"""
+import matplotlib.pyplot as plt
+df = execute_sql_query("SELECT x, y FROM {df.schema.name}")
+fig, ax = plt.subplots()
+df.plot(x="x", y="y", ax=ax)
+df.plot.scatter("x", "y", ax=ax)
+result = {{"type": "number", "value": sum(len(line.get_xdata()) for line in ax.get_lines())}}
+"""
+    cleaned = CodeCleaner(SimpleNamespace(dfs=[df], skills=[])).clean_code(code)
+    assert "_plot_guard.plot(df" in cleaned
+    assert "_plot_guard.plot_kind(df, 'scatter'" in cleaned
+
+    large = pd.DataFrame({"x": np.arange(50_000.0), "y": np.random.rand(50_000)})
+    executor = CodeExecutor(config=SimpleNamespace(plot_max_points=500))
+    executor.add_to_env("execute_sql_query", lambda query: large)
+    assert executor.execute_and_return_result(cleaned)["value"] == 500
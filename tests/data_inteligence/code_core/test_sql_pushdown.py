@@ -0,0 +1,140 @@
+import ast
+from types import SimpleNamespace
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_inteligence.code_core.code_generation import CodeCleaner
+from data_inteligence.code_core.code_generation.sql_pushdown import SQLPushdown
+from data_inteligence.dataframe import DataFrame
+
+
+@pytest.fixture(scope="module")
+def execute_sql_query():
+    rng = np.random.default_rng(0)
+    sales = pd.DataFrame(
+        {
+            "id": np.arange(500),
+            "region": rng.choice(["north", "south", "west", None], 500),
+            "amount": np.where(rng.random(500) < 0.1, np.nan, rng.random(500) * 100),
+        }
+    )
+    connection = duckdb.connect()
+    connection.register("sales", sales)
+    yield lambda query: connection.execute(query).df()
+    connection.close()
+
+
+SALES_TYPES = {"id": "integer", "region": "string", "amount": "float"}
+
+
+def rewrite(code, tables={"sales": SALES_TYPES}):
+    return ast.unparse(SQLPushdown("duckdb", tables).rewrite(ast.parse(code).body))
+
+
+def run(code, execute_sql_query):
+    variables = {}
+    exec(code, {"execute_sql_query": execute_sql_query}, variables)
+    return variables
+
+
+@pytest.mark.parametrize(
+    "reduction",
+    [
+        'df[(df["amount"] > 50) & (df.region != "west")].sort_values("amount", ascending=False).head(10)',
+        'df.groupby("region")["amount"].sum().reset_index()',
+        'df.groupby("region", as_index=False).agg(total=("amount", "sum"), n=("id", "nunique"))',
+        'df[~df.region.isin(["north"])][["id", "region"]].nsmallest(3, "id")',
+    ],
+)
+def test_reductions_are_folded_into_sql(execute_sql_query, reduction):
+    code = f'df = execute_sql_query("SELECT * FROM sales")\ntop = {reduction}\n'
+    folded = rewrite(code)
+
+    assert folded.count("execute_sql_query") == 1
+    assert "df" not in folded
+    expected, actual = run(code, execute_sql_query), run(folded, execute_sql_query)
+    # top之后不再使用，行标签不影响结果
+    pd.testing.assert_frame_equal(expected["top"].reset_index(drop=True), actual["top"].reset_index(drop=True))
+
+
+@pytest.mark.parametrize("method", ["nlargest", "nsmallest"])
+def test_nlargest_pads_with_missing_values(execute_sql_query, method):
+    code = f'df = execute_sql_query("SELECT * FROM sales")\ntop = df[df.region == "north"].{method}(1000, "amount")\n'
+    folded = rewrite(code)
+
+    assert "df" not in folded
+    expected, actual = run(code, execute_sql_query), run(folded, execute_sql_query)
+    assert expected["top"]["amount"].isna().any()
+    # 空值行之间的顺序不确定，按id比较
+    pd.testing.assert_frame_equal(
+        expected["top"].sort_values("id").reset_index(drop=True),
+        actual["top"].sort_values("id").reset_index(drop=True),
+    )
+
+
+@pytest.mark.parametrize(
+    "reduction",
+    [
+        'df.groupby("region", as_index=False)["id"].sum()',
+        'df[df.amount > 50].sort_values("amount").head(5).reset_index(drop=True)',
+    ],
+)
+def test_folded_results_keep_index_and_dtypes(execute_sql_query, reduction):
+    code = f'df = execute_sql_query("SELECT * FROM sales")\ntop = {reduction}\nlabels = list(top.index)\n'
+    folded = rewrite(code)
+
+    assert folded.count("execute_sql_query") == 1
+    expected, actual = run(code, execute_sql_query), run(folded, execute_sql_query)
+    pd.testing.assert_frame_equal(expected["top"], actual["top"])
+    assert expected["labels"] == actual["labels"]
+
+
+def test_row_labels_used_downstream_keep_original_code():
+    code = 'df = execute_sql_query("SELECT * FROM sales")\ntop = df[df.amount > 50].head(5)\n'
+    # 只作为dataframe结果返回时响应中不包含行标签
+    returned = code + 'result = {"type": "dataframe", "value": top}'
+    assert rewrite(returned).count("execute_sql_query") == 1
+
+    for use in ("top.index", "top.loc[3]", "top.plot()"):
+        labelled = code + f"x = {use}"
+        assert rewrite(labelled) == ast.unparse(ast.parse(labelled))
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        # 原始结果之后仍被使用
+        'df = execute_sql_query("SELECT * FROM sales")\ntop = df.head(3)\ntotal = len(df)',
+        # 修改了原始结果
+        'df = execute_sql_query("SELECT * FROM sales")\ndf["x"] = 1\ndf = df.head(3)',
+        # 分组结果以分组键为索引，与SQL结果形状不同
+        'df = execute_sql_query("SELECT * FROM sales")\ntop = df.groupby("region")["amount"].sum()',
+        # 无法翻译的条件
+        'df = execute_sql_query("SELECT * FROM sales")\ntop = df[df["region"].str.startswith("n")]',
+        # 列类型未知，无法保证求和结果的类型
+        'df = execute_sql_query("SELECT * FROM orders")\ntop = df.groupby("region", as_index=False)["id"].sum()',
+    ],
+)
+def test_unsupported_patterns_keep_original_code(code):
+    assert rewrite(code) == ast.unparse(ast.parse(code))
+
+
+def test_cleaner_validates_folded_sql():
+    df = DataFrame(pd.DataFrame({"region": ["north"], "amount": [1.0]}))
+    cleaner = CodeCleaner(SimpleNamespace(dfs=[df], skills=[]))
+    code = f"""
+sql_query = "SELECT * FROM {df.schema.name}"
+df = execute_sql_query(sql_query)
+df = df.groupby("region", as_index=False)["amount"].sum()
+result = {{"type": "dataframe", "value": df}}
+"""
+    analysis = cleaner.analyze(code)
+
+    assert [sql.query for sql in analysis.sql_queries] == [
+        f"SELECT * FROM {df.schema.name}",
+        f'SELECT "region", CAST(COALESCE(SUM("amount"), 0) AS DOUBLE) AS "amount" FROM {df.schema.name} '
+        'WHERE NOT "region" IS NULL GROUP BY "region" ORDER BY "region" ASC',
+    ]
@@ -0,0 +1,123 @@
+import duckdb
+import pandas as pd
+import pytest
+import sqlglot
+import yaml
+
+from data_inteligence.data_loader.duck_db_connection_manager import DuckDBConnectionManager
+from data_inteligence.data_loader.federated_query import FederatedQueryPlanner
+from data_inteligence.data_loader.loader import DatasetLoader
+from data_inteligence.data_loader.semantic_layer_schema import SemanticLayerSchema
+from data_inteligence.data_loader.sql_loader import SQLDatasetLoader
+from data_inteligence.query_builders.sampling import TableSampler
+
+
+@pytest.fixture
+def remote_queries(monkeypatch):
+    """用内存DuckDB模拟远程postgres数据库，并记录下发到数据库的查询"""
+    database = duckdb.connect()
+    database.execute(
+        "CREATE TABLE orders AS SELECT * FROM (VALUES (1, 1, 10.0), (2, 1, 20.0), (3, 2, 5.5), (4, 3, 7.0)) "
+        "AS t(id, customer_id, amount)"
+    )
+    queries = []
+
+    def load_from_database(connection_info, query, params=None):
+        queries.append(query)
+        return database.sql(sqlglot.transpile(query, read="postgres", write="duckdb")[0]).df()
+
+    monkeypatch.setattr(SQLDatasetLoader, "_get_load_function", staticmethod(lambda _: load_from_database))
+    return queries
+
+
+@pytest.fixture
+def datasets(tmp_path):
+    customers_path = tmp_path / "customers"
+    customers_path.mkdir()
+    pd.DataFrame({"id": [1, 2, 3], "region": ["north", "south", "north"]}).to_parquet(
+        customers_path / "data.parquet"
+    )
+    (customers_path / "schema.yaml").write_text(
+        yaml.safe_dump({"name": "customers", "source": {"type": "parquet", "path": "data.parquet"}})
+    )
+    orders = SQLDatasetLoader(
+        SemanticLayerSchema(
+            name="orders",
+            source={
+                "type": "postgres",
+                "table": "orders",
+                "connection": {"host": "db", "port": 5432, "database": "shop", "user": "u", "password": "p"},
+            },
+            columns=[{"name": "id"}, {"name": "customer_id"}, {"name": "amount"}],
+        ),
+        "",
+    ).load()
+    customers = DatasetLoader.create_loader_from_path(str(customers_path)).load()
+    return {"orders": orders, "customers": customers}
+
+
+class TestFederatedQueryPlanner:
+    def test_single_source_query_runs_on_source(self, datasets, remote_queries):
+        planner = FederatedQueryPlanner(datasets, DuckDBConnectionManager())
+
+        result = planner.execute("SELECT SUM(amount) AS total FROM orders")
+
+        assert result["total"][0] == 42.5
+        assert len(remote_queries) == 1
+
+    def test_join_pushes_projection_and_filters_to_remote(self, datasets, remote_queries):
+        planner = FederatedQueryPlanner(datasets, DuckDBConnectionManager())
+
+        result = planner.execute(
+            "SELECT c.region, SUM(o.amount) AS total FROM orders o "
+            "JOIN customers c ON o.customer_id = c.id "
+            "WHERE o.amount > 6 GROUP BY c.region ORDER BY c.region"
+        )
+
+        assert result.to_dict("list") == {"region": ["north"], "total": [37.0]}
+        (remote_query,) = remote_queries
+        assert '"id"' not in remote_query
+        assert '"amount" > 6' in remote_query
+
+    def test_aggregating_subquery_is_pushed_down_whole(self, datasets, remote_queries):
+        planner = FederatedQueryPlanner(datasets, DuckDBConnectionManager())
+
+        result = planner.execute(
+            "WITH spend AS (SELECT customer_id, SUM(amount) AS total FROM orders GROUP BY customer_id) "
+            "SELECT c.region, SUM(s.total) AS total FROM spend s JOIN customers c ON s.customer_id = c.id "
+            "GROUP BY c.region ORDER BY c.region"
+        )
+
+        assert result.to_dict("list") == {"region": ["north", "south"], "total": [37.0, 5.5]}
+        (remote_query,) = remote_queries
+        assert "GROUP BY" in remote_query.upper()
+
+    def test_approximate_mode_samples_each_source(self, datasets, remote_queries):
+        planner = FederatedQueryPlanner(
+            datasets, DuckDBConnectionManager(), sampler=TableSampler(percent=50, rows=2)
+        )
+
+        result = planner.execute(
+            "SELECT COUNT(*) AS n FROM orders o JOIN customers c ON o.customer_id = c.id"
+        )
+
+        (remote_query,) = remote_queries
+        assert "TABLESAMPLE SYSTEM (50)" in remote_query
+        assert result["n"][0] <= 4
+        assert planner.samples["orders"].percent == 50
+        assert planner.samples["customers"].to_dict() == {
+            "method": "reservoir",
+            "percent": None,
+            "sample_rows": 2,
+            "total_rows": 3,
+        }
+
+    def test_approximate_mode_skips_small_local_tables(self, datasets):
+        planner = FederatedQueryPlanner(
+            datasets, DuckDBConnectionManager(), sampler=TableSampler(rows=10)
+        )
+
+        result = planner.execute("SELECT COUNT(*) AS n FROM customers")
+
+        assert result["n"][0] == 3
+        assert planner.samples == {}
@@ -0,0 +1,55 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from data_inteligence.data_loader.ingestion import ingest_local_file
+from data_inteligence.data_loader.local_loader import LocalDatasetLoader
+
+
+class TestIngestLocalFile:
+    def test_csv_is_converted_to_typed_sorted_parquet(self, tmp_path):
+        csv_path = tmp_path / "orders.csv"
+        pd.DataFrame(
+            {
+                "order_date": ["2024-01-03", "2024-01-01", "2024-01-02"],
+                "amount": [1.5, 2.0, 3.0],
+                "quantity": [1, 2, 3],
+                "region": ["a", "b", "c"],
+            }
+        ).to_csv(csv_path, index=False)
+
+        schema = ingest_local_file(csv_path)
+
+        assert csv_path.exists()
+        assert schema.source.type == "parquet"
+        assert schema.source.path == "data.parquet"
+        assert {c.name: c.type for c in schema.columns} == {
+            "order_date": "datetime",
+            "amount": "float",
+            "quantity": "integer",
+            "region": "string",
+        }
+
+        statistics = pq.ParquetFile(tmp_path / "data.parquet").metadata.row_group(0).column(0).statistics
+        assert statistics.has_min_max
+
+        head = LocalDatasetLoader(schema, str(tmp_path)).load_head()
+        assert list(head["quantity"]) == [2, 3, 1]
+
+    def test_excel_is_converted_to_parquet(self, tmp_path):
+        excel_path = tmp_path / "customers.xlsx"
+        pd.DataFrame({"id": [1, 2], "name": ["x", "y"]}).to_excel(excel_path, index=False)
+
+        schema = ingest_local_file(excel_path, name="customers")
+
+        assert schema.name == "customers"
+        assert LocalDatasetLoader(schema, str(tmp_path)).get_row_count() == 2
+
+    def test_values_outside_the_sniffing_sample_fall_back_to_full_scan(self, tmp_path):
+        csv_path = tmp_path / "events.csv"
+        rows = [f"{i},12:00:00" for i in range(30000)] + ["n/a,13:00:00"]
+        csv_path.write_text("id,at\n" + "\n".join(rows) + "\n")
+
+        schema = ingest_local_file(csv_path)
+
+        assert {c.name: c.type for c in schema.columns} == {"id": "string", "at": "string"}
+        assert LocalDatasetLoader(schema, str(tmp_path)).get_row_count() == 30001
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+import yaml
+
+from data_inteligence.data_loader.loader import DatasetLoader
+from data_inteligence.dataframe import VirtualDataFrame
+from data_inteligence.exceptions import MaliciousQueryError
+
+
+@pytest.fixture
+def parquet_dataset(tmp_path):
+    dataset_path = tmp_path / "orders"
+    dataset_path.mkdir()
+    pd.DataFrame(
+        {"id": [1, 2, 3], "customer_id": [1, 1, 2], "amount": [10.0, 20.0, 5.5]}
+    ).to_parquet(dataset_path / "data.parquet")
+    (dataset_path / "schema.yaml").write_text(
+        yaml.safe_dump({"name": "orders", "source": {"type": "parquet", "path": "data.parquet"}})
+    )
+    return dataset_path
+
+
+class TestLocalDatasetLoader:
+    def test_load_returns_lazy_virtual_dataframe(self, parquet_dataset):
+        df = DatasetLoader.create_loader_from_path(str(parquet_dataset)).load()
+
+        assert isinstance(df, VirtualDataFrame)
+        assert len(pd.DataFrame(df)) == 0
+        assert df.rows_count == 3
+        assert df.columns_count == 3
+        assert list(df.head()["amount"]) == [10.0, 20.0, 5.5]
+
+    def test_execute_sql_query_runs_on_file_in_place(self, parquet_dataset):
+        loader = DatasetLoader.create_loader_from_path(str(parquet_dataset))
+        table = loader.query_builder._get_table_expression()
+
+        result = loader.execute_query(
+            f"SELECT customer_id, SUM(amount) AS total FROM {table} GROUP BY 1 ORDER BY 1"
+        )
+
+        assert result.to_dict("list") == {"customer_id": [1, 2], "total": [30.0, 5.5]}
+
+    def test_rejects_reading_other_files(self, parquet_dataset):
+        loader = DatasetLoader.create_loader_from_path(str(parquet_dataset))
+
+        with pytest.raises(MaliciousQueryError):
+            loader.execute_query("SELECT * FROM read_csv('/etc/passwd')")
@@ -0,0 +1,108 @@
+import os
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+import yaml
+
+from data_inteligence.data_loader.loader import DatasetLoader
+from data_inteligence.data_loader.rollup import DatasetRollup, parse_update_frequency, remove_superseded_files
+
+
+@pytest.fixture
+def sales_loader(tmp_path):
+    dataset_path = tmp_path / "sales"
+    dataset_path.mkdir()
+    pd.DataFrame(
+        {"region": ["north", "south", "north"], "amount": [10.0, 5.5, 20.0]}
+    ).to_parquet(dataset_path / "data.parquet")
+    (dataset_path / "schema.yaml").write_text(
+        yaml.safe_dump(
+            {
+                "name": "sales",
+                "source": {"type": "parquet", "path": "data.parquet"},
+                "columns": [
+                    {"name": "region"},
+                    {"name": "amount", "expression": "SUM(amount)", "alias": "total"},
+                ],
+                "group_by": ["region"],
+                "update_frequency": "daily",
+            }
+        )
+    )
+    loader = DatasetLoader.create_loader_from_path(str(dataset_path))
+    loader._rollup = DatasetRollup(loader, tmp_path / "rollups")
+    return loader
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("daily", timedelta(days=1)),
+        ("Hourly", timedelta(hours=1)),
+        ("30m", timedelta(minutes=30)),
+        ("6h", timedelta(hours=6)),
+        ("sometimes", None),
+        (None, None),
+    ],
+)
+def test_parse_update_frequency(value, expected):
+    assert parse_update_frequency(value) == expected
+
+
+class TestDatasetRollup:
+    def test_queries_are_answered_from_rollup_once_materialized(self, sales_loader):
+        rollup = sales_loader.rollup
+        assert rollup.is_stale()
+        assert sales_loader.get_table_reference().startswith("read_parquet(")
+        assert str(rollup.path) not in sales_loader.local_sources
+
+        assert rollup.refresh() == 2
+        assert not rollup.is_stale()
+        assert sales_loader.get_table_reference() == rollup.table_expression
+        assert str(rollup.path) in sales_loader.local_sources
+        assert sales_loader.get_row_count() == 2
+        head = sales_loader.load_head().sort_values("region")
+        assert head.to_dict("list") == {"region": ["north", "south"], "total": [30.0, 5.5]}
+
+    def test_rollup_expires_after_update_frequency(self, sales_loader):
+        rollup = sales_loader.rollup
+        rollup.refresh()
+        two_days_ago = rollup.path.stat().st_mtime - timedelta(days=2).total_seconds()
+        os.utime(rollup.path, (two_days_ago, two_days_ago))
+
+        assert rollup.is_stale()
+
+    def test_rollup_is_bypassed_once_source_changes(self, sales_loader, tmp_path):
+        rollup = sales_loader.rollup
+        rollup.refresh()
+        source = tmp_path / "sales" / "data.parquet"
+        pd.DataFrame({"region": ["east"], "amount": [1.0]}).to_parquet(source)
+        later = rollup.path.stat().st_mtime + 10
+        os.utime(source, (later, later))
+
+        assert rollup.is_stale()
+        assert sales_loader.get_table_reference() != rollup.table_expression
+        assert sales_loader.get_row_count() == 1
+
+    def test_remote_rollup_requires_update_frequency(self, sales_loader):
+        schema = sales_loader.schema
+        remote = schema.model_copy(
+            update={"source": schema.source.model_copy(update={"type": "postgres"})}
+        )
+
+        assert DatasetRollup.is_supported(schema.model_copy(update={"update_frequency": None}))
+        assert DatasetRollup.is_supported(remote)
+        assert not DatasetRollup.is_supported(remote.model_copy(update={"update_frequency": None}))
+
+    def test_superseded_rollups_are_removed(self, sales_loader, tmp_path):
+        rollup = sales_loader.rollup
+        rollup.refresh()
+        superseded = rollup.path.with_name("sales-0123456789abcdef.parquet")
+        superseded.write_bytes(b"")
+        abandoned = rollup.path.with_name(f".{rollup.path.name}.abc.tmp")
+        abandoned.write_bytes(b"")
+        os.utime(abandoned, (0, 0))
+
+        assert remove_superseded_files(tmp_path / "rollups", [rollup.path]) == 2
+        assert [path.name for path in (tmp_path / "rollups").iterdir()] == [rollup.path.name]
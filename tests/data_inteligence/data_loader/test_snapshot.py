@@ -0,0 +1,89 @@
+import duckdb
+import pytest
+import sqlglot
+
+from data_inteligence.data_loader.rollup import remove_superseded_files
+from data_inteligence.data_loader.semantic_layer_schema import SemanticLayerSchema
+from data_inteligence.data_loader.snapshot import TableSnapshot
+from data_inteligence.data_loader.sql_loader import SQLDatasetLoader
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """用内存DuckDB模拟远程postgres数据库"""
+    database = duckdb.connect()
+    database.execute(
+        "CREATE TABLE orders AS SELECT * FROM (VALUES (1, 10.0, 1), (2, 20.0, 2)) AS t(id, amount, version)"
+    )
+    queries = []
+
+    def load_from_database(connection_info, query, params=None):
+        queries.append(query)
+        return database.sql(sqlglot.transpile(query, read="postgres", write="duckdb")[0]).df()
+
+    monkeypatch.setattr(SQLDatasetLoader, "_get_load_function", staticmethod(lambda _: load_from_database))
+    return database, queries
+
+
+@pytest.fixture
+def loader(tmp_path):
+    loader = SQLDatasetLoader(
+        SemanticLayerSchema(
+            name="orders",
+            source={
+                "type": "postgres",
+                "table": "orders",
+                "connection": {"host": "db", "port": 5432, "database": "shop", "user": "u", "password": "p"},
+                "watermark": "version",
+                "primary_key": "id",
+            },
+            update_frequency="1h",
+        ),
+        "",
+    )
+    loader._snapshot = TableSnapshot(loader, tmp_path / "snapshots")
+    return loader
+
+
+class TestTableSnapshot:
+    def test_fresh_snapshot_answers_queries_locally(self, loader, database):
+        database, queries = database
+        assert loader.local_sources == []
+
+        assert loader.snapshot.refresh() == 2
+        assert loader.snapshot.watermark == 2
+        assert loader.local_sources == [str(loader.snapshot.path)]
+        assert loader.get_table_reference() == loader.snapshot.table_expression
+
+        queries.clear()
+        assert loader.get_row_count() == 2
+        assert queries == []
+
+    def test_incremental_refresh_replaces_updated_rows(self, loader, database):
+        database, queries = database
+        loader.snapshot.refresh()
+        database.execute("UPDATE orders SET amount = 15.0, version = 3 WHERE id = 1")
+        database.execute("INSERT INTO orders VALUES (3, 7.0, 4)")
+
+        assert loader.snapshot.refresh() == 2
+        assert "version > 2" in queries[-1]
+
+        result = loader.snapshot.execute("SELECT id, amount FROM orders ORDER BY id")
+        assert result.to_dict("list") == {"id": [1, 2, 3], "amount": [15.0, 20.0, 7.0]}
+        assert loader.snapshot.watermark == 4
+
+    def test_superseded_snapshots_are_removed(self, loader, database, tmp_path):
+        loader.snapshot.refresh()
+        directory = tmp_path / "snapshots"
+        (directory / "orders-0123456789abcdef.parquet").write_bytes(b"")
+        (directory / "orders-0123456789abcdef.parquet.json").write_text("{}")
+
+        assert remove_superseded_files(directory, loader.snapshot.files) == 2
+        assert sorted(path.name for path in directory.iterdir()) == sorted(
+            path.name for path in loader.snapshot.files
+        )
+
+    def test_only_remote_tables_with_update_frequency_are_snapshotted(self, loader):
+        schema = loader.schema.model_copy(update={"update_frequency": None})
+        assert TableSnapshot.is_supported(loader.schema)
+        assert not TableSnapshot.is_supported(schema)
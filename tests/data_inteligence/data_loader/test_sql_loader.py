@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from data_inteligence.data_loader.semantic_layer_schema import SemanticLayerSchema
+from data_inteligence.data_loader.sql_loader import SQLDatasetLoader
+from data_inteligence.exceptions import QueryCostExceededError
+from data_inteligence.helpers.sql_load import QueryEstimate
+
+
+def make_loader(monkeypatch, estimate, **guard):
+    loader = SQLDatasetLoader(
+        SemanticLayerSchema(
+            name="orders",
+            source={
+                "type": "postgres",
+                "table": "orders",
+                "connection": {"host": "db", "port": 5432, "database": "shop", "user": "u", "password": "p"},
+                "guard": guard,
+            },
+        ),
+        "",
+    )
+    executed = []
+
+    def load(connection_info, query, params=None):
+        executed.append(query)
+        return pd.DataFrame({"n": [1]})
+
+    monkeypatch.setattr(SQLDatasetLoader, "_get_load_function", staticmethod(lambda _: load))
+    monkeypatch.setattr(
+        SQLDatasetLoader, "_get_explain_function", staticmethod(lambda _: lambda *args: estimate)
+    )
+    return loader, executed
+
+
+class TestQueryGuard:
+    def test_cheap_query_runs_unchanged(self, monkeypatch):
+        loader, executed = make_loader(monkeypatch, QueryEstimate(rows=10, cost=50), max_rows=1000, max_cost=1e6)
+
+        loader.execute_sql_query("SELECT * FROM orders WHERE id = 1")
+
+        assert "LIMIT" not in executed[0]
+
+    def test_expensive_query_is_rejected(self, monkeypatch):
+        loader, executed = make_loader(monkeypatch, QueryEstimate(rows=1, cost=5e7), max_cost=1e6)
+
+        with pytest.raises(QueryCostExceededError, match="estimated cost"):
+            loader.execute_sql_query("SELECT SUM(amount) FROM orders")
+        assert executed == []
+
+    def test_large_result_gets_limit(self, monkeypatch):
+        loader, executed = make_loader(
+            monkeypatch, QueryEstimate(rows=1e9, cost=10), max_rows=1000, action="limit", limit=500
+        )
+
+        loader.execute_sql_query("SELECT * FROM orders a CROSS JOIN orders b")
+
+        assert executed[0].rstrip().endswith("LIMIT 500")
+
+    def test_internal_queries_are_not_guarded(self, monkeypatch):
+        loader, executed = make_loader(monkeypatch, QueryEstimate(rows=1e9, cost=5e7), max_cost=1)
+
+        assert loader.get_row_count() == 1
+        assert len(executed) == 1
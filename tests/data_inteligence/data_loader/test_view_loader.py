@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+import sqlglot
+import yaml
+from sqlglot import exp
+
+from data_inteligence.data_loader.loader import DatasetLoader
+from data_inteligence.data_loader.semantic_layer_schema import SemanticLayerSchema
+from data_inteligence.data_loader.sql_loader import SQLDatasetLoader
+from data_inteligence.data_loader.view_loader import ViewDatasetLoader
+
+VIEW_SCHEMA = {
+    "name": "sales",
+    "view": True,
+    "columns": [
+        {"name": "customers.name"},
+        {"name": "orders.amount", "expression": "SUM(orders.amount)", "alias": "total"},
+    ],
+    "group_by": ["customers.name"],
+    "relations": [{"from": "orders.customer_id", "to": "customers.id"}],
+}
+
+
+@pytest.fixture
+def local_view(tmp_path):
+    datasets = {
+        "orders": pd.DataFrame({"id": [1, 2, 3], "customer_id": [1, 1, 2], "amount": [10.0, 20.0, 5.5]}),
+        "customers": pd.DataFrame({"id": [1, 2], "name": ["a", "b"]}),
+    }
+    for name, df in datasets.items():
+        dataset_path = tmp_path / name
+        dataset_path.mkdir()
+        df.to_parquet(dataset_path / "data.parquet")
+        (dataset_path / "schema.yaml").write_text(
+            yaml.safe_dump({"name": name, "source": {"type": "parquet", "path": "data.parquet"}})
+        )
+    view_path = tmp_path / "sales"
+    view_path.mkdir()
+    (view_path / "schema.yaml").write_text(yaml.safe_dump(VIEW_SCHEMA))
+    return view_path
+
+
+class TestViewDatasetLoader:
+    def test_local_view_is_joined_by_duckdb(self, local_view):
+        loader = DatasetLoader.create_loader_from_path(str(local_view))
+
+        assert isinstance(loader, ViewDatasetLoader)
+        assert len(loader.local_sources) == 2
+        df = loader.load()
+        assert df.head().sort_values("customers_name").to_dict("list") == {
+            "customers_name": ["a", "b"],
+            "total": [30.0, 5.5],
+        }
+
+    def test_remote_view_compiles_to_single_statement(self):
+        connection = {
+            "host": "localhost", "port": 5432, "database": "shop",
+            "user": "user", "password": "password",
+        }
+        dependencies = {
+            name: SQLDatasetLoader(
+                SemanticLayerSchema(
+                    name=name,
+                    source={"type": "postgres", "connection": connection, "table": name},
+                ),
+                "",
+            )
+            for name in ("orders", "customers")
+        }
+
+        loader = ViewDatasetLoader(SemanticLayerSchema(**VIEW_SCHEMA), "", dependencies)
+        query = sqlglot.parse_one(loader.query_builder.build_query(), dialect="postgres")
+
+        assert loader.source.type == "postgres"
+        assert loader.local_sources == []
+        assert {table.name for table in query.find_all(exp.Table)} == {"orders", "customers"}
+        assert len(list(query.find_all(exp.Join))) == 1
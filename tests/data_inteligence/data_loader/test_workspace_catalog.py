@@ -0,0 +1,101 @@
+import multiprocessing
+
+import pandas as pd
+import pytest
+
+from data_inteligence.data_loader.local_loader import execute_local_query
+from data_inteligence.data_loader.duck_db_connection_manager import DuckDBConnectionManager
+from data_inteligence.data_loader.semantic_layer_schema import SemanticLayerSchema, Source
+from data_inteligence.data_loader.workspace_catalog import WorkspaceCatalog
+
+
+@pytest.fixture
+def orders_dataset(tmp_path):
+    dataset_path = tmp_path / "orders"
+    dataset_path.mkdir()
+    pd.DataFrame({"id": [1, 2, 3], "amount": [10.0, 20.0, 5.5]}).to_parquet(
+        dataset_path / "data.parquet"
+    )
+    schema = SemanticLayerSchema(
+        name="orders", source=Source(type="parquet", path="data.parquet")
+    )
+    return schema, str(dataset_path)
+
+
+class TestWorkspaceCatalog:
+    def test_empty_catalog(self, tmp_path):
+        catalog = WorkspaceCatalog(tmp_path / "catalog")
+
+        assert catalog.connect() is None
+        assert catalog.view_names() == frozenset()
+
+    def test_registered_dataset_is_queryable_read_only(self, tmp_path, orders_dataset):
+        catalog = WorkspaceCatalog(tmp_path / "catalog")
+        catalog.register_dataset(*orders_dataset)
+
+        assert catalog.view_names() == {"orders"}
+        db_manager = DuckDBConnectionManager(connection=catalog.cursor())
+        result = execute_local_query("SELECT SUM(amount) AS total FROM orders", [], db_manager=db_manager)
+        assert result["total"][0] == 35.5
+
+    def test_updates_are_visible_to_attached_readers(self, tmp_path, orders_dataset):
+        catalog = WorkspaceCatalog(tmp_path / "catalog")
+        catalog.register_dataset(*orders_dataset)
+        cursor = catalog.cursor()
+
+        catalog.register_view("numbers", "range(3)")
+        assert catalog.view_names() == {"orders", "numbers"}
+        # 已有游标仍然可以在旧版本上完成查询
+        assert cursor.sql("SELECT COUNT(*) FROM orders").fetchone()[0] == 3
+
+        catalog.drop_view("orders")
+        assert catalog.view_names() == {"numbers"}
+        assert len(list((tmp_path / "catalog").glob("catalog-*"))) == 1
+
+    def test_same_named_datasets_do_not_share_a_view(self, tmp_path, orders_dataset):
+        schema, orders_path = orders_dataset
+        copy_path = tmp_path / "orders_copy"
+        copy_path.mkdir()
+        pd.DataFrame({"id": [4], "amount": [1.0]}).to_parquet(copy_path / "data.parquet")
+        catalog = WorkspaceCatalog(tmp_path / "catalog")
+        orders_file = str((tmp_path / "orders" / "data.parquet").resolve())
+        copy_file = str((copy_path / "data.parquet").resolve())
+
+        assert catalog.register_dataset(schema, orders_path)
+        assert not catalog.register_dataset(schema, str(copy_path))
+        assert catalog.view_sources() == {"orders": orders_file}
+        assert catalog.dataset_views({"orders": [orders_file]}) == {"orders"}
+        assert catalog.dataset_views({"orders": [copy_file]}) == frozenset()
+
+        # 删除未拥有视图的数据集不影响另一个数据集
+        catalog.drop_dataset(schema, str(copy_path))
+        assert catalog.view_names() == {"orders"}
+        catalog.drop_dataset(schema, orders_path)
+        assert catalog.view_names() == frozenset()
+
+    def test_view_of_deleted_dataset_can_be_taken_over(self, tmp_path, orders_dataset):
+        schema, orders_path = orders_dataset
+        copy_path = tmp_path / "orders_copy"
+        copy_path.mkdir()
+        pd.DataFrame({"id": [4], "amount": [1.0]}).to_parquet(copy_path / "data.parquet")
+        catalog = WorkspaceCatalog(tmp_path / "catalog")
+        catalog.register_dataset(schema, orders_path)
+
+        (tmp_path / "orders" / "data.parquet").unlink()
+
+        assert catalog.register_dataset(schema, str(copy_path))
+        assert catalog.view_sources() == {"orders": str((copy_path / "data.parquet").resolve())}
+
+    def test_concurrent_writers_keep_all_views(self, tmp_path):
+        root = tmp_path / "catalog"
+        with multiprocessing.get_context("spawn").Pool(4) as pool:
+            pool.starmap(_register_numbers, [(str(root), worker) for worker in range(4)])
+
+        catalog = WorkspaceCatalog(root)
+        assert catalog.view_names() == {f"numbers_{worker}_{i}" for worker in range(4) for i in range(3)}
+        assert [path.name for path in root.glob("catalog-*")] == [catalog.current_path.name]
+
+
+def _register_numbers(root, worker):
+    for i in range(3):
+        WorkspaceCatalog(root).register_view(f"numbers_{worker}_{i}", f"range({i})")
@@ -0,0 +1,13 @@
+from data_inteligence.helpers.file_lock import FileLock
+
+
+def test_second_holder_cannot_acquire_without_blocking(tmp_path):
+    leader, follower = FileLock(tmp_path / "leader.lock"), FileLock(tmp_path / "leader.lock")
+
+    assert leader.acquire(blocking=False)
+    assert not follower.acquire(blocking=False)
+
+    # leader释放后其他进程可以接手
+    leader.release()
+    assert follower.acquire(blocking=False)
+    follower.release()
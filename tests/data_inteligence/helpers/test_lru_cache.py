@@ -0,0 +1,41 @@
+from data_inteligence.helpers.lru_cache import LRUCache, cache_stats
+from data_inteligence.query_builders.sql_parser import SQLParser
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (3, 1, 1, 2)
+    assert stats.hit_rate == 0.75
+
+
+def test_named_caches_are_reported_in_metrics():
+    cache = LRUCache(max_size=4, name="test_cache")
+    assert cache.get_or_compute("key", lambda: "value") == "value"
+    assert cache.get_or_compute("key", lambda: "other") == "value"
+
+    assert cache_stats()["test_cache"]["hit_rate"] == 0.5
+
+
+def test_sql_parser_results_are_memoized(monkeypatch):
+    query = "SELECT COUNT(*) FROM memoized_orders"
+    first = SQLParser.transpile_sql_dialect(query, to_dialect="mysql")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("query was transpiled again")
+
+    monkeypatch.setattr(SQLParser, "_transpile_sql_dialect", staticmethod(fail))
+    assert SQLParser.transpile_sql_dialect(query, to_dialect="mysql") == first
+
+    mapping = {"memoized_orders": "read_parquet('orders.parquet')"}
+    rewritten = SQLParser.replace_table_and_column_names(query, mapping, dialect="duckdb")
+    monkeypatch.setattr(SQLParser, "_replace_table_and_column_names", staticmethod(fail))
+    assert SQLParser.replace_table_and_column_names(query, dict(mapping), dialect="duckdb") == rewritten
+    assert "sql_transpile" in cache_stats() and "sql_table_rewrite" in cache_stats()
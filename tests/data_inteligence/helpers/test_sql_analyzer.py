@@ -0,0 +1,103 @@
+import pytest
+
+from data_inteligence.helpers.sql_analyzer import SQLSafetyAnalyzer
+from data_inteligence.helpers.sql_sanitizer import is_sql_query_safe
+
+
+@pytest.fixture
+def analyzer():
+    return SQLSafetyAnalyzer(cache_size=8)
+
+
+class TestSQLSafetyAnalyzer:
+    @pytest.mark.parametrize(
+        "query, dialect",
+        [
+            ("SELECT user, version FROM accounts", "postgres"),
+            ("SELECT region, SUM(amount) AS total FROM orders GROUP BY region ORDER BY total DESC LIMIT 10", "mysql"),
+            ("WITH m AS (SELECT COUNT(*) AS c FROM t) SELECT * FROM m UNION ALL SELECT 1", "postgres"),
+            ("SELECT a, ROW_NUMBER() OVER (PARTITION BY b ORDER BY c) FROM t -- rank", "duckdb"),
+            ("SELECT * FROM t WHERE a = %s", "mysql"),
+            ("SELECT * FROM t FETCH FIRST 5 ROWS ONLY", "postgres"),
+            ("SELECT DATE_TRUNC('month', d), COALESCE(SUM(x), 0) FROM t GROUP BY 1", "duckdb"),
+            ("SELECT date_part('year', d), MEDIAN(x) FROM t GROUP BY 1", "duckdb"),
+            ("SELECT to_char(d, 'YYYY-MM'), COUNT(DISTINCT u) FROM t GROUP BY 1", "postgres"),
+            ("SELECT DATE_FORMAT(d, '%Y-%m'), AVG(x) FROM t GROUP BY 1", "mysql"),
+        ],
+    )
+    def test_accepts_read_only_queries(self, analyzer, query, dialect):
+        verdict = analyzer.analyze(query, dialect)
+
+        assert verdict.safe, verdict.reason
+
+    @pytest.mark.parametrize(
+        "query, dialect, reason",
+        [
+            ("DROP TABLE t", "postgres", "Only SELECT"),
+            ("SELECT 1; DROP TABLE t", "postgres", "Exactly one"),
+            ("SELECT pg_sleep(5)", "postgres", "pg_sleep"),
+            ("SELECT current_user", "postgres", "not allowed"),
+            ("SELECT * FROM information_schema.tables", "postgres", "system schemas"),
+            ("SELECT a INTO b FROM t", "postgres", "Into"),
+            ("SELECT * FROM t /*!50000 UNION SELECT 1*/", "mysql", "Executable comments"),
+            ("SELECT * FROM read_csv('/etc/passwd')", "duckdb", "Reading files"),
+            ("SELECT * FROM '/etc/passwd'", "duckdb", "Reading files"),
+            ("SELECT * FROM \"data/../secret.csv\"", "duckdb", "Reading files"),
+            ("SELECT * FROM read_json_objects('/etc/passwd')", "duckdb", "read_json_objects"),
+            ("SELECT * FROM query('SELECT * FROM read_csv(''/tmp/x.csv'')')", "duckdb", "nested query"),
+            ("SELECT getenv('HOME')", "duckdb", "getenv"),
+            ("SELECT version()", "postgres", "not allowed"),
+        ],
+    )
+    def test_rejects_with_reason(self, analyzer, query, dialect, reason):
+        verdict = analyzer.analyze(query, dialect)
+
+        assert not verdict.safe
+        assert reason in verdict.reason
+
+    def test_trusted_sources_allow_dataset_files(self, analyzer):
+        query = "SELECT * FROM read_parquet('/data/sales/data.parquet')"
+
+        assert not analyzer.analyze(query, "duckdb").safe
+        assert analyzer.analyze(
+            query, "duckdb", trusted_sources=["/data/sales/data.parquet"]
+        ).safe
+
+    def test_trusted_sources_do_not_extend_to_other_readers(self, analyzer):
+        trusted = ["/data/a.parquet"]
+
+        assert not analyzer.analyze("SELECT * FROM '/data/a.parquet'", "duckdb", trusted).safe
+        assert not analyzer.analyze(
+            "SELECT * FROM query('SELECT * FROM read_parquet(''/data/a.parquet'')')",
+            "duckdb",
+            trusted,
+        ).safe
+
+    def test_verdicts_are_cached_by_exact_query(self, analyzer, monkeypatch):
+        calls = []
+        original = analyzer._analyze
+
+        def counting_analyze(*args):
+            calls.append(args)
+            return original(*args)
+
+        monkeypatch.setattr(analyzer, "_analyze", counting_analyze)
+
+        analyzer.analyze("SELECT a FROM t", "postgres")
+        analyzer.analyze("SELECT a FROM t", "postgres")
+        analyzer.analyze("SELECT a FROM t", "mysql")
+
+        assert len(calls) == 2
+
+    def test_whitespace_variants_are_analyzed_separately(self, analyzer):
+        # 注释内的DROP是安全的，换行后就成了第二条语句，不能命中前者的缓存
+        assert analyzer.analyze("SELECT * FROM t -- ; DROP TABLE x", "duckdb").safe
+        assert not analyzer.analyze("SELECT * FROM t --\n; DROP TABLE x", "duckdb").safe
+
+        trusted = ["/data/a  b.parquet"]
+        assert analyzer.analyze("SELECT * FROM read_parquet('/data/a  b.parquet')", "duckdb", trusted).safe
+        assert not analyzer.analyze("SELECT * FROM read_parquet('/data/a b.parquet')", "duckdb", trusted).safe
+
+    def test_is_sql_query_safe_delegates_to_analyzer(self):
+        assert is_sql_query_safe("SELECT version FROM releases")
+        assert not is_sql_query_safe("UPDATE releases SET version = 2")
@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+import yaml
+
+from data_inteligence.data_loader.loader import DatasetLoader
+from data_inteligence.data_loader.semantic_layer_schema import SemanticLayerSchema
+from data_inteligence.query_builders import SqlQueryBuilder
+from data_inteligence.query_builders.sql_parser import SQLParser
+
+
+def sql_schema(source_type, transformations):
+    return SemanticLayerSchema(
+        name="orders",
+        source={
+            "type": source_type,
+            "table": "orders",
+            "connection": {"host": "db", "port": 5432, "database": "shop", "user": "u", "password": "p"},
+        },
+        columns=[{"name": "created_at"}, {"name": "status"}],
+        transformations=transformations,
+    )
+
+
+@pytest.fixture
+def local_loader(tmp_path):
+    dataset_path = tmp_path / "orders"
+    dataset_path.mkdir()
+    pd.DataFrame(
+        {"created_at": pd.to_datetime(["2024-01-05", "2024-02-10"]), "status": ["paid", None]}
+    ).to_parquet(dataset_path / "data.parquet")
+    (dataset_path / "schema.yaml").write_text(
+        yaml.safe_dump(
+            {
+                "name": "orders",
+                "source": {"type": "parquet", "path": "data.parquet"},
+                "columns": [{"name": "created_at"}, {"name": "status"}],
+                "transformations": [
+                    {"type": "format_date", "params": {"column": "created_at", "format": "%Y-%m"}},
+                    {"type": "fill_na", "params": {"column": "status", "value": "unknown"}},
+                ],
+            }
+        )
+    )
+    return DatasetLoader.create_loader_from_path(str(dataset_path))
+
+
+class TestBaseQueryBuilder:
+    def test_transformations_run_on_duckdb(self, local_loader):
+        head = local_loader.load_head()
+
+        assert head.to_dict("list") == {"created_at": ["2024-01", "2024-02"], "status": ["paid", "unknown"]}
+
+    @pytest.mark.parametrize(
+        "source_type, expected",
+        [
+            ("postgres", "TO_CHAR("),
+            ("mysql", "DATE_FORMAT("),
+            ("oracle", "TO_CHAR("),
+        ],
+    )
+    def test_transformations_are_transpiled_to_source_dialect(self, source_type, expected):
+        transformations = [{"type": "format_date", "params": {"column": "created_at", "format": "%Y-%m"}}]
+        query = SqlQueryBuilder(sql_schema(source_type, transformations)).build_query()
+
+        assert expected in SQLParser.transpile_sql_dialect(query, to_dialect=source_type)
+
+    def test_mysql_keeps_native_timezone_conversion(self):
+        transformations = [
+            {"type": "convert_timezone", "params": {"column": "created_at", "from_tz": "UTC", "to_tz": "Asia/Shanghai"}}
+        ]
+        query = SqlQueryBuilder(sql_schema("mysql", transformations)).build_query()
+
+        assert "CONVERT_TZ(" in SQLParser.transpile_sql_dialect(query, to_dialect="mysql")
+
+    def test_queries_are_compiled_once_per_schema_version(self, local_loader):
+        query_builder = local_loader.query_builder
+        first = query_builder.build_query()
+        assert query_builder.build_query() is first
+        assert query_builder.get_head_query() is query_builder.get_head_query()
+
+        local_loader.schema.limit = 1
+        assert query_builder.build_query() != first
+        assert "LIMIT 1" in query_builder.build_query()